@@ -1,6 +1,9 @@
 #!/usr/bin/env python
 """
 添加更多不同分类的实验室示例数据
+
+通过 reservations/importing.py 批量写入，等价于把列表保存为 JSON 后执行
+python manage.py import_catalogue labs.json。
 """
 import os
 import sys
@@ -10,6 +13,7 @@ import django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'lab_reservation_system.settings')
 django.setup()
 
+from reservations.importing import import_catalogue
 from reservations.models import Laboratory
 
 def add_more_laboratories():
@@ -83,20 +87,11 @@ def add_more_laboratories():
         }
     ]
     
-    created_count = 0
-    
-    for lab_data in new_labs:
-        lab, created = Laboratory.objects.get_or_create(
-            name=lab_data['name'],
-            defaults=lab_data
-        )
-        if created:
-            print(f"创建实验室: {lab.name} ({lab.get_category_display()})")
-            created_count += 1
-        else:
-            print(f"实验室已存在: {lab.name}")
-    
-    print(f"\n新增实验室完成！共创建了 {created_count} 个实验室。")
+    # 按名称批量新增或更新（不修改已有的时间段）
+    report = import_catalogue(enumerate(new_labs, 1))
+    for line in report.diff_lines():
+        print(line)
+    print(f"\n新增实验室完成！{report.summary()}")
     
     # 显示最新的分类统计
     print("\n当前分类统计:")
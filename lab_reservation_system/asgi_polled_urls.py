@@ -0,0 +1,17 @@
+"""
+Opt-in URL configuration for ASGI deployments.
+
+Same as ``lab_reservation_system.asgi_urls`` but also routes the polled JSON
+endpoints (availability check, laboratory list) to their async views. Enable
+with ``ASGI_URLCONF = 'lab_reservation_system.asgi_polled_urls'`` once a
+benchmark on the target server shows a gain over the sync views.
+"""
+from django.contrib import admin
+from django.urls import path, include
+
+from reservations import asgi_urls
+
+urlpatterns = [
+    path('admin/', admin.site.urls),
+    path('', include((asgi_urls.polled_urlpatterns, asgi_urls.app_name))),
+]
@@ -0,0 +1,15 @@
+"""
+URL configuration used for requests served through ASGI.
+
+Identical to ``lab_reservation_system.urls`` except that the reservations app
+is included from ``reservations.asgi_urls``, where the streaming endpoints
+(occupancy event stream, reservation export) are routed to their async views.
+Selected per request by ``reservations.middleware.AsyncURLConfMiddleware``.
+"""
+from django.contrib import admin
+from django.urls import path, include
+
+urlpatterns = [
+    path('admin/', admin.site.urls),
+    path('', include('reservations.asgi_urls')),
+]
@@ -41,7 +41,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'reservations.middleware.QueryInstrumentationMiddleware',
+    'reservations.middleware.AsyncURLConfMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'reservations.middleware.StaticAssetsMiddleware',
+    'reservations.middleware.ResponseCompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -52,6 +56,12 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'lab_reservation_system.urls'
 
+# ASGI requests resolve against this URLconf (reservations.middleware.AsyncURLConfMiddleware),
+# which routes the streaming endpoints to their async views. The polled JSON endpoints stay
+# on their sync views: `manage.py benchmark_asgi` measured the async versions as slower on
+# SQLite. Use 'lab_reservation_system.asgi_polled_urls' to route them async as well.
+ASGI_URLCONF = 'lab_reservation_system.asgi_urls'
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -77,9 +87,28 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections open between requests; verify them before reuse.
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Take the write lock at BEGIN so concurrent writers wait on busy_timeout
+            # instead of failing with "database is locked" when upgrading a read lock.
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# PRAGMAs applied to every new SQLite connection (reservations.sqlite_tuning).
+
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,  # ms
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'cache_size': -20000,  # KiB
+    'mmap_size': 128 * 1024 * 1024,
+    'temp_store': 'memory',
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -117,7 +146,50 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# In production collectstatic writes content-hashed filenames plus .gz/.br variants
+# (reservations.staticfiles); development and tests serve the source files directly.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'reservations.staticfiles.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
+
+# Bootstrap / Font Awesome are served from reservations/static/reservations/vendor/
+# (fetched by `manage.py vendor_static` and committed). Those files are not in the tree
+# yet, so pages load the pinned CDN URLs instead; set this to False once they are committed.
+# Missing files are reported by `manage.py check` (a warning here, an error when False).
+VENDOR_STATIC_CDN_FALLBACK = True
+
+# reservations.middleware.StaticAssetsMiddleware serves STATIC_ROOT when DEBUG is off;
+# hashed filenames are cached by browsers for STATIC_CACHE_MAX_AGE seconds.
+STATIC_CACHE_MAX_AGE = 365 * 24 * 3600
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# SQL query instrumentation (reservations.middleware.QueryInstrumentationMiddleware)
+# Adds X-DB-Queries / Server-Timing headers and logs requests slower than the threshold.
+
+SQL_INSTRUMENTATION_ENABLED = DEBUG
+
+SQL_SLOW_REQUEST_MS = 500
+
+SQL_SLOWEST_QUERIES = 5
+
+
+# Reservation status sweeper (reservations.sweeper): marks ended reservations completed and
+# expires unreviewed ones. Set to a number of seconds to run it in a background thread of
+# every process; leave as None and schedule `python manage.py sweep_reservations` instead.
+
+RESERVATION_SWEEP_INTERVAL = None
@@ -1,13 +1,18 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
-from .models import Laboratory, TimeSlot, Reservation, UserProfile
+from django.http import HttpResponseRedirect
+from django.urls import reverse
+from .forms import ReservationAdminForm
+from .models import Laboratory, TimeSlot, ScheduleTemplate, ScheduleTemplateSlot, Reservation, ReservationSeries, UserProfile
+from .services import BookingConflict, save_reservation
 
 
 @admin.register(Laboratory)
 class LaboratoryAdmin(admin.ModelAdmin):
-    list_display = ['name', 'category', 'location', 'capacity', 'is_active', 'created_at']
-    list_filter = ['category', 'is_active', 'created_at']
+    list_display = ['name', 'category', 'location', 'capacity', 'schedule_template', 'is_active', 'created_at']
+    list_filter = ['category', 'is_active', 'schedule_template', 'created_at']
     search_fields = ['name', 'location', 'description']
     list_editable = ['is_active', 'category']
     fieldsets = (
@@ -17,13 +22,34 @@ class LaboratoryAdmin(admin.ModelAdmin):
         ('详细信息', {
             'fields': ('description', 'equipment')
         }),
+        ('开放时间', {
+            'fields': ('schedule_template',)
+        }),
         ('状态', {
             'fields': ('is_active',)
         }),
     )
 
+    actions = ['import_laboratories']
+
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related()
+        return super().get_queryset(request).select_related('schedule_template')
+
+    @admin.action(description='从目录文件批量导入实验室（CSV / JSON）', permissions=['change'])
+    def import_laboratories(self, request, queryset):
+        # 导入按实验室名称 upsert，与勾选的实验室无关
+        return HttpResponseRedirect(reverse('reservations:import_laboratories'))
+
+    def changelist_view(self, request, extra_context=None):
+        # 导入操作不要求先勾选实验室
+        if (
+            request.method == 'POST' and '_save' not in request.POST
+            and request.POST.get('action') == 'import_laboratories'
+            and not request.POST.getlist(helpers.ACTION_CHECKBOX_NAME)
+            and 'import_laboratories' in self.get_actions(request)
+        ):
+            return self.import_laboratories(request, self.get_queryset(request).none())
+        return super().changelist_view(request, extra_context)
 
 
 @admin.register(TimeSlot)
@@ -34,8 +60,21 @@ class TimeSlotAdmin(admin.ModelAdmin):
     ordering = ['laboratory', 'weekday', 'start_time']
 
 
+class ScheduleTemplateSlotInline(admin.TabularInline):
+    model = ScheduleTemplateSlot
+    extra = 0
+
+
+@admin.register(ScheduleTemplate)
+class ScheduleTemplateAdmin(admin.ModelAdmin):
+    list_display = ['name', 'description']
+    search_fields = ['name']
+    inlines = (ScheduleTemplateSlotInline,)
+
+
 @admin.register(Reservation)
 class ReservationAdmin(admin.ModelAdmin):
+    form = ReservationAdminForm
     list_display = ['user', 'laboratory', 'date', 'start_time', 'end_time', 'status', 'created_at']
     list_filter = ['status', 'laboratory', 'date', 'created_at']
     search_fields = ['user__username', 'user__first_name', 'user__last_name', 'laboratory__name']
@@ -57,6 +96,43 @@ class ReservationAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('user', 'laboratory')
 
+    def save_model(self, request, obj, form, change):
+        # 冲突通常已由 ReservationAdminForm 拦下；表单校验与保存之间被抢占时由触发器拒绝，提示错误而不是返回 500
+        try:
+            save_reservation(obj)
+        except BookingConflict:
+            obj._booking_conflict = True
+            self.message_user(request, f'{obj.date} {obj.start_time:%H:%M}-{obj.end_time:%H:%M} 与其他有效预约冲突，未保存。', messages.ERROR)
+
+    def log_addition(self, request, obj, message):
+        if not getattr(obj, '_booking_conflict', False):
+            return super().log_addition(request, obj, message)
+
+    def log_change(self, request, obj, message):
+        if not getattr(obj, '_booking_conflict', False):
+            return super().log_change(request, obj, message)
+
+    def response_add(self, request, obj, post_url_continue=None):
+        if getattr(obj, '_booking_conflict', False):
+            return HttpResponseRedirect(request.path)
+        return super().response_add(request, obj, post_url_continue)
+
+    def response_change(self, request, obj):
+        if getattr(obj, '_booking_conflict', False):
+            return HttpResponseRedirect(request.path)
+        return super().response_change(request, obj)
+
+
+@admin.register(ReservationSeries)
+class ReservationSeriesAdmin(admin.ModelAdmin):
+    list_display = ['user', 'laboratory', 'interval_weeks', 'start_date', 'end_date', 'start_time', 'end_time', 'created_at']
+    list_filter = ['laboratory', 'interval_weeks']
+    search_fields = ['user__username', 'laboratory__name']
+    readonly_fields = ['created_at']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user', 'laboratory')
+
 
 class UserProfileInline(admin.StackedInline):
     model = UserProfile
@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class ReservationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reservations'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .staticfiles import check_vendor_files
+        checks.register(check_vendor_files, checks.Tags.staticfiles)
+        from .sweeper import start_sweeper
+        start_sweeper()
@@ -0,0 +1,36 @@
+"""
+ASGI 下的路由
+
+与 urls.py 相同，只是占用变化事件流和预约导出换成异步视图：事件流长时间保持连接，
+直接在事件循环中等待；同步的流式响应在 ASGI 下会被整体读入内存，导出因此使用异步迭代。
+
+可用性检查和实验室列表接口的异步视图放在 polled_urlpatterns 中，需要时通过
+ASGI_URLCONF = 'lab_reservation_system.asgi_polled_urls' 启用：SQLite 上这两个接口每次请求都很快，
+benchmark_asgi 测得异步视图的吞吐量低于同步视图，默认仍使用同步视图。
+"""
+from django.urls import path
+from . import urls, views
+
+app_name = urls.app_name
+
+STREAMING_VIEWS = {
+    'laboratory_events': views.alaboratory_events,
+    'export_reservations': views.aexport_reservations,
+}
+
+POLLED_VIEWS = {
+    'check_availability': views.acheck_availability,
+    'laboratory_list_ajax': views.alaboratory_list_ajax,
+}
+
+
+def _replace(async_views):
+    return [
+        path(str(pattern.pattern), async_views[pattern.name], name=pattern.name)
+        if pattern.name in async_views else pattern
+        for pattern in urls.urlpatterns
+    ]
+
+
+urlpatterns = _replace(STREAMING_VIEWS)
+polled_urlpatterns = _replace({**STREAMING_VIEWS, **POLLED_VIEWS})
@@ -0,0 +1,78 @@
+"""
+实验室周占用表
+
+把实验室未来若干天的开放时间段（编译后的每周开放时间，见 schedules）与有效预约一次性对齐，
+生成 日期 × 时间段 的占用表，供详情页模板和 JSON 接口共用。
+结果按 (实验室, 起始日期) 缓存，缓存键带上实验室的 updated_at 与 schedule_updated_at：
+预约、时间段或时间表模板变更时在同一事务内更新 schedule_updated_at，提交后所有进程都按新键重新计算，
+不依赖各进程各自的缓存版本号。
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .freshness import laboratory_state
+from .models import Reservation
+from .schedules import weekly_schedule
+
+WEEK_GRID_DAYS = 7
+
+
+def build_week_grid(lab_id, start_date, days=WEEK_GRID_DAYS, state=None):
+    """计算实验室从 start_date 起 days 天的占用表，state 为实验室的 (updated_at, schedule_updated_at)"""
+    dates = [start_date + timedelta(days=i) for i in range(days)]
+
+    slots_by_weekday = weekly_schedule(lab_id, state).slots
+
+    reservations_by_date = {day: [] for day in dates}
+    for day, start_time, end_time, status in Reservation.objects.filter(
+        laboratory_id=lab_id,
+        date__range=(dates[0], dates[-1]),
+        status__in=Reservation.ACTIVE_STATUSES,
+    ).order_by('date', 'start_time').values_list('date', 'start_time', 'end_time', 'status'):
+        reservations_by_date[day].append({'start_time': start_time, 'end_time': end_time, 'status': status})
+
+    grid_days = []
+    for day in dates:
+        reservations = reservations_by_date[day]
+        slots = []
+        # 时间段与预约都按开始时间排序，指针只前进，一次扫描即可完成对齐
+        i = 0
+        for start_time, end_time in slots_by_weekday[day.weekday()]:
+            while i < len(reservations) and reservations[i]['end_time'] <= start_time:
+                i += 1
+            reserved = i < len(reservations) and reservations[i]['start_time'] < end_time
+            slots.append({'start_time': start_time, 'end_time': end_time, 'reserved': reserved})
+        grid_days.append({
+            'date': day,
+            'weekday': day.weekday(),
+            'reservations': reservations,
+            'slots': slots,
+            'free_slots': sum(not slot['reserved'] for slot in slots),
+        })
+
+    return {
+        'laboratory_id': lab_id,
+        'start_date': start_date,
+        'days': grid_days,
+    }
+
+
+def week_grid_stamp(state):
+    """周占用表缓存键中的时间戳部分，state 为实验室的 (updated_at, schedule_updated_at)"""
+    return '-'.join(value.isoformat() for value in state)
+
+
+def get_week_grid(lab_id, start_date, days=WEEK_GRID_DAYS, state=None):
+    """返回实验室的周占用表（带缓存），state 未传入时查询一次实验室的时间戳"""
+    if state is None:
+        state = laboratory_state(lab_id)
+    if state is None:
+        return build_week_grid(lab_id, start_date, days)
+    key = f'reservations:week_grid:{lab_id}:{week_grid_stamp(state)}:{start_date.isoformat()}:{days}'
+    grid = cache.get(key)
+    if grid is None:
+        grid = build_week_grid(lab_id, start_date, days, state)
+        cache.set(key, grid, getattr(settings, 'WEEK_GRID_CACHE_TIMEOUT', 3600))
+    return grid
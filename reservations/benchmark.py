@@ -0,0 +1,453 @@
+"""
+视图性能基准测试
+
+在若干数据规模下依次请求 reservations/urls.py 中的每个路由，记录响应时间分位数、
+SQL 查询数和单次请求的内存峰值，生成可在不同提交之间对比的 JSON 报告。
+数据规模逐级累加生成（见 dataset.generate_dataset），应在一次性的测试数据库中运行，
+由 benchmark_views 管理命令负责创建和销毁。
+
+变更类路由（取消、批准、拒绝、批量审核、提交预约）每次请求前都会准备一条新的
+待审核预约，准备和清理的耗时不计入结果。
+
+measure_concurrency() 用多线程模拟多个工作进程并发读写，用于对比数据库连接配置
+（由 benchmark_sqlite 管理命令分别在默认配置和调优配置的临时文件数据库上运行）。
+
+measure_handlers() 对比 WSGI 与 ASGI 两种处理方式下被频繁轮询的 JSON 接口的并发吞吐量
+（由 benchmark_asgi 管理命令在临时文件数据库上运行）。
+"""
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import time, timedelta
+from time import perf_counter
+
+import django
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import OperationalError, close_old_connections, connection, connections, transaction
+from django.db.models import Count
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import urls
+from .dataset import generate_dataset
+from .models import Laboratory, Reservation, ReservationSeries
+from .occupancy import occupancy_index
+from .schedules import compile_schedules
+
+# (实验室数, 用户数, 预约数)
+DEFAULT_SCALES = [(20, 200, 2000), (100, 1000, 20000), (400, 4000, 100000)]
+PERCENTILES = (50, 90, 95, 99)
+# 临时预约所在日期与今天的间隔，避开生成数据的日期范围
+SCRATCH_DAYS_AHEAD = 365
+
+
+def parse_scales(value):
+    """解析 "20:200:2000,100:1000:20000" 形式的规模列表"""
+    scales = []
+    for item in value.split(','):
+        parts = item.strip().split(':')
+        if len(parts) != 3 or not all(part.isdigit() for part in parts):
+            raise ValueError(f'无效的数据规模：{item!r}，格式应为 实验室数:用户数:预约数')
+        scales.append(tuple(int(part) for part in parts))
+    for previous, current in zip(scales, scales[1:]):
+        if any(b < a for a, b in zip(previous, current)):
+            raise ValueError('数据规模必须逐级递增')
+    return scales
+
+
+def percentile(samples, p):
+    """线性插值的分位数"""
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    position = (len(ordered) - 1) * p / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class RouteBenchmark:
+    """在当前数据库上逐个测量路由"""
+
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.client = Client()
+        labs = Laboratory.objects.filter(is_active=True).annotate(n=Count('reservation')).order_by('-n')
+        self.laboratory = labs.first()
+        # 以预约最多的用户作为管理员登录，“我的预约”页面即为最重的情况
+        counts = Reservation.objects.values('user_id').annotate(n=Count('id')).order_by('-n')[:1]
+        self.user = User.objects.get(id=counts[0]['user_id']) if counts else User.objects.first()
+        User.objects.filter(id=self.user.id).update(is_staff=True)
+        self.user.is_staff = True
+        self.today = timezone.now().date()
+        self.scratch_day = self.today + timedelta(days=SCRATCH_DAYS_AHEAD)
+        # 落在工作日，使预约请求在“仅工作日开放”的实验室也能通过开放时间校验
+        while self.scratch_day.weekday() >= 5:
+            self.scratch_day += timedelta(days=1)
+
+    def scratch_reservation(self):
+        """清理上一轮的临时预约并创建一条新的待审核预约"""
+        self.clear_scratch()
+        return Reservation.objects.create(
+            user=self.user, laboratory=self.laboratory, date=self.scratch_day,
+            start_time='20:00', end_time='21:00', purpose='性能测试',
+        )
+
+    def scratch_series(self):
+        """创建只包含一条临时预约的重复预约系列"""
+        reservation = self.scratch_reservation()
+        series = ReservationSeries.objects.create(
+            user=self.user, laboratory=self.laboratory, start_date=self.scratch_day, end_date=self.scratch_day,
+            start_time=reservation.start_time, end_time=reservation.end_time, purpose=reservation.purpose,
+        )
+        Reservation.objects.filter(pk=reservation.pk).update(series=series)
+        return series
+
+    def clear_scratch(self):
+        for reservation in Reservation.objects.filter(laboratory=self.laboratory, date=self.scratch_day):
+            reservation.delete()
+        ReservationSeries.objects.filter(laboratory=self.laboratory, start_date=self.scratch_day).delete()
+
+    def request_for(self, name, route_kwargs):
+        """返回 (method, url, data, content_type)，变更类路由先准备好所需数据"""
+        kwargs = {}
+        if 'lab_id' in route_kwargs:
+            kwargs['lab_id'] = self.laboratory.id
+        if 'reservation_id' in route_kwargs:
+            kwargs['reservation_id'] = self.scratch_reservation().id
+        if 'series_id' in route_kwargs:
+            kwargs['series_id'] = self.scratch_series().id
+        url = reverse(f'reservations:{name}', kwargs=kwargs)
+        day = (self.today + timedelta(days=1)).isoformat()
+
+        if name == 'check_availability':
+            return 'get', url, {'lab_id': self.laboratory.id, 'date': day, 'start_time': '10:00', 'end_time': '11:00'}, None
+        if name == 'check_availability_batch':
+            probes = [
+                {'lab_id': self.laboratory.id, 'date': (self.today + timedelta(days=i % 14)).isoformat(),
+                 'start_time': f'{8 + i % 12:02d}:00', 'end_time': f'{9 + i % 12:02d}:00'}
+                for i in range(50)
+            ]
+            return 'post', url, json.dumps({'probes': probes}), 'application/json'
+        if name == 'bulk_review_reservations':
+            body = {'ids': [self.scratch_reservation().id], 'action': 'reject'}
+            return 'post', url, json.dumps(body), 'application/json'
+        if name == 'make_reservation':
+            self.clear_scratch()
+            data = {'date': self.scratch_day.isoformat(), 'start_time': '20:00', 'end_time': '21:00', 'purpose': '性能测试'}
+            return 'post', url, data, None
+        if name == 'laboratory_list':
+            return 'get', url, {'search': '实验室'}, None
+        return 'get', url, {}, None
+
+    def send(self, method, url, data, content_type):
+        if content_type:
+            return getattr(self.client, method)(url, data, content_type=content_type)
+        return getattr(self.client, method)(url, data)
+
+    def measure(self, pattern):
+        name = pattern.name
+        samples = []
+        status = None
+        for _ in range(self.repeat):
+            self.client.force_login(self.user)
+            request = self.request_for(name, pattern.pattern.converters)
+            started = perf_counter()
+            response = self.send(*request)
+            samples.append((perf_counter() - started) * 1000)
+            status = response.status_code
+
+        # 额外一轮单独统计查询数和内存峰值，避免 tracemalloc 影响计时
+        self.client.force_login(self.user)
+        request = self.request_for(name, pattern.pattern.converters)
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                self.send(*request)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.clear_scratch()
+
+        result = {
+            'url': request[1],
+            'method': request[0].upper(),
+            'status': status,
+            'queries': len(queries),
+            'cold_ms': round(samples[0], 3),
+            'mean_ms': round(sum(samples) / len(samples), 3),
+            'min_ms': round(min(samples), 3),
+            'max_ms': round(max(samples), 3),
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+        for p in PERCENTILES:
+            result[f'p{p}_ms'] = round(percentile(samples, p), 3)
+        return result
+
+    def run(self, progress=None):
+        results = {}
+        for pattern in urls.urlpatterns:
+            results[pattern.name] = self.measure(pattern)
+            if progress:
+                progress(f"  {pattern.name}: p50={results[pattern.name]['p50_ms']}ms queries={results[pattern.name]['queries']}")
+        return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(scales=DEFAULT_SCALES, repeat=20, seed=0, progress=None):
+    """依次生成各规模的数据并测量所有路由，返回报告字典"""
+    report = {
+        'generated_at': timezone.now().isoformat(),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'repeat': repeat,
+        'seed': seed,
+        'scales': [],
+    }
+    current = (0, 0, 0)
+    for index, scale in enumerate(scales):
+        labs, users, reservations = (target - existing for target, existing in zip(scale, current))
+        if progress:
+            progress(f'数据规模 {scale[0]} 个实验室 / {scale[1]} 个用户 / {scale[2]} 条预约')
+        generate_dataset(labs=labs, users=users, reservations=reservations, seed=seed + index, batch_size=2000)
+        current = scale
+        cache.clear()
+        occupancy_index.invalidate()
+        report['scales'].append({
+            'laboratories': scale[0],
+            'users': scale[1],
+            'reservations': scale[2],
+            'routes': RouteBenchmark(repeat).run(progress),
+        })
+    return report
+
+
+def compare_reports(baseline, current):
+    """对比两份报告，返回 (规模, 路由, 旧 p50, 新 p50, 变化百分比, 旧查询数, 新查询数) 列表"""
+    def key(scale):
+        return scale['laboratories'], scale['users'], scale['reservations']
+
+    baseline_scales = {key(scale): scale['routes'] for scale in baseline['scales']}
+    rows = []
+    for scale in current['scales']:
+        old_routes = baseline_scales.get(key(scale))
+        if old_routes is None:
+            continue
+        for name, new in scale['routes'].items():
+            old = old_routes.get(name)
+            if old is None:
+                continue
+            change = (new['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100 if old['p50_ms'] else 0.0
+            rows.append((key(scale), name, old['p50_ms'], new['p50_ms'], round(change, 1), old['queries'], new['queries']))
+    return rows
+
+
+# SQLite 并发测试的两组配置：Django 默认设置 与 settings 中的调优设置
+SQLITE_BASELINE = {
+    'CONN_MAX_AGE': 0,
+    'OPTIONS': {},
+    'PRAGMAS': {'journal_mode': 'delete', 'synchronous': 'full'},
+}
+
+
+def measure_concurrency(threads=8, duration=5.0, write_ratio=0.2, seed=0):
+    """模拟多个工作进程并发读写，返回吞吐量、延迟和 "database is locked" 错误数
+
+    每个线程相当于一个 WSGI 工作进程，每次操作前后按请求生命周期调用
+    close_old_connections()，因此 CONN_MAX_AGE=0 时每次操作都会重新建立连接。
+    写操作与预约流程一致：事务内先检查重叠再插入；读操作与实验室详情页相近。
+    """
+    generate_dataset(labs=threads, users=threads * 5, reservations=threads * 200, seed=seed, batch_size=2000)
+    lab_ids = list(Laboratory.objects.order_by('id').values_list('id', flat=True))[:threads]
+    user_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+    first_day = timezone.now().date() + timedelta(days=SCRATCH_DAYS_AHEAD)
+    connections.close_all()
+
+    def read(rng):
+        lab_id = rng.choice(lab_ids)
+        laboratory = Laboratory.objects.get(id=lab_id)
+        today = timezone.now().date()
+        list(Reservation.objects.filter(
+            laboratory=laboratory, date__range=(today, today + timedelta(days=6)),
+            status__in=Reservation.ACTIVE_STATUSES,
+        ).values_list('date', 'start_time', 'end_time'))
+        compile_schedules([laboratory.id])
+
+    def write(rng, lab_id, n):
+        day = first_day + timedelta(days=n // 5)
+        start = time(8 + 2 * (n % 5))
+        end = time(9 + 2 * (n % 5))
+        with transaction.atomic():
+            exists = Reservation.objects.filter(
+                laboratory_id=lab_id, date=day, status__in=Reservation.ACTIVE_STATUSES,
+                start_time__lt=end, end_time__gt=start,
+            ).exists()
+            if not exists:
+                Reservation.objects.create(
+                    user_id=rng.choice(user_ids), laboratory_id=lab_id, date=day,
+                    start_time=start, end_time=end, purpose='并发测试',
+                )
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        lab_id = lab_ids[index % len(lab_ids)]
+        stats = {'read_ms': [], 'write_ms': [], 'errors': 0}
+        deadline = perf_counter() + duration
+        n = 0
+        try:
+            while perf_counter() < deadline:
+                is_write = rng.random() < write_ratio
+                close_old_connections()
+                started = perf_counter()
+                try:
+                    if is_write:
+                        write(rng, lab_id, n)
+                        n += 1
+                    else:
+                        read(rng)
+                except OperationalError:
+                    stats['errors'] += 1
+                    continue
+                finally:
+                    close_old_connections()
+                elapsed = (perf_counter() - started) * 1000
+                stats['write_ms' if is_write else 'read_ms'].append(elapsed)
+        finally:
+            connections.close_all()
+        return stats
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(worker, range(threads)))
+
+    read_ms = [value for stats in results for value in stats['read_ms']]
+    write_ms = [value for stats in results for value in stats['write_ms']]
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode')
+        journal_mode = cursor.fetchone()[0]
+    return {
+        'threads': threads,
+        'duration_s': duration,
+        'write_ratio': write_ratio,
+        'journal_mode': journal_mode,
+        'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+        'reads': len(read_ms),
+        'writes': len(write_ms),
+        'errors': sum(stats['errors'] for stats in results),
+        'reads_per_s': round(len(read_ms) / duration, 1),
+        'writes_per_s': round(len(write_ms) / duration, 1),
+        'read_p95_ms': round(percentile(read_ms, 95), 3) if read_ms else None,
+        'write_p95_ms': round(percentile(write_ms, 95), 3) if write_ms else None,
+    }
+
+
+def _summarize(results, duration):
+    latencies = [value for stats in results for value in stats['ms']]
+    return {
+        'requests': len(latencies),
+        'errors': sum(stats['errors'] for stats in results),
+        'requests_per_s': round(len(latencies) / duration, 1),
+        **{f'p{p}_ms': round(percentile(latencies, p), 3) if latencies else None for p in PERCENTILES},
+    }
+
+
+# 可用性检查和实验室列表接口也使用异步视图的 ASGI 路由（可选配置）
+ASYNC_HANDLER_URLCONF = 'lab_reservation_system.asgi_polled_urls'
+
+
+def measure_handlers(concurrency=32, duration=5.0, seed=0):
+    """对比 WSGI 与 ASGI 处理可用性检查和实验室列表接口的并发吞吐量
+
+    在进程内直接驱动 Django 的请求处理器，不经过网络和 HTTP 服务器：
+    WSGI 用 concurrency 个线程各自循环发送请求（相当于一个有 concurrency 个工作线程的 WSGI 进程），
+    ASGI 在一个事件循环中同时运行 concurrency 个协程（相当于一个 ASGI 工作进程），
+    请求经 AsyncURLConfMiddleware 按 ASYNC_HANDLER_URLCONF 路由到异步视图（默认配置下这两个接口仍为同步视图）。
+    两组请求序列相同，开始前都清空缓存和占用索引。
+    """
+    generate_dataset(labs=50, users=200, reservations=5000, seed=seed, batch_size=2000)
+    lab_ids = list(Laboratory.objects.filter(is_active=True).values_list('id', flat=True))
+    categories = sorted(set(Laboratory.objects.values_list('category', flat=True)))
+    check_url = reverse('reservations:check_availability')
+    list_url = reverse('reservations:laboratory_list_ajax')
+    today = timezone.now().date()
+    connections.close_all()
+
+    def next_request(rng):
+        # 七成为可用性检查，其余为实验室列表（全部、按分类、搜索）
+        if rng.random() < 0.7:
+            start = rng.randint(8, 20)
+            return check_url, {
+                'lab_id': rng.choice(lab_ids), 'date': (today + timedelta(days=rng.randint(0, 13))).isoformat(),
+                'start_time': f'{start:02d}:00', 'end_time': f'{start + 1:02d}:00',
+            }
+        return list_url, rng.choice([{}, {'category': rng.choice(categories)}, {'search': '实验室'}])
+
+    def wsgi_worker(index):
+        rng = random.Random(seed + index)
+        client = Client()
+        stats = {'ms': [], 'errors': 0}
+        deadline = perf_counter() + duration
+        try:
+            while perf_counter() < deadline:
+                path, params = next_request(rng)
+                started = perf_counter()
+                response = client.get(path, params)
+                if response.status_code != 200:
+                    stats['errors'] += 1
+                    continue
+                stats['ms'].append((perf_counter() - started) * 1000)
+        finally:
+            connections.close_all()
+        return stats
+
+    async def asgi_worker(index):
+        rng = random.Random(seed + index)
+        client = AsyncClient()
+        stats = {'ms': [], 'errors': 0}
+        deadline = perf_counter() + duration
+        while perf_counter() < deadline:
+            path, params = next_request(rng)
+            started = perf_counter()
+            response = await client.get(path, params)
+            if response.status_code != 200:
+                stats['errors'] += 1
+                continue
+            stats['ms'].append((perf_counter() - started) * 1000)
+        return stats
+
+    async def run_asgi():
+        try:
+            return await asyncio.gather(*(asgi_worker(index) for index in range(concurrency)))
+        finally:
+            # 异步 ORM 在共享的工作线程中执行，连接也在该线程中关闭
+            await sync_to_async(connections.close_all)()
+
+    report = {'concurrency': concurrency, 'duration_s': duration}
+    cache.clear()
+    occupancy_index.invalidate()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        report['wsgi'] = _summarize(list(executor.map(wsgi_worker, range(concurrency))), duration)
+    cache.clear()
+    occupancy_index.invalidate()
+    with override_settings(ASGI_URLCONF=ASYNC_HANDLER_URLCONF):
+        report['asgi'] = _summarize(asyncio.run(run_asgi()), duration)
+    return report
@@ -0,0 +1,59 @@
+"""
+版本号缓存辅助函数
+
+缓存键中带上命名空间的版本号，数据变更时只需递增版本号，
+旧版本的缓存项自然失效并由缓存后端按过期时间回收。
+"""
+import time
+
+from django.core.cache import cache
+
+
+def _version_key(namespace):
+    return f'reservations:version:{namespace}'
+
+
+def get_version(namespace):
+    """返回命名空间当前的版本号"""
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        # 版本号被淘汰后以时间戳重新初始化，避免与旧缓存项的版本号重合
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(namespace):
+    """get_version() 的异步版本"""
+    key = _version_key(namespace)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_version(namespace):
+    """递增命名空间的版本号，使其下的所有缓存失效"""
+    key = _version_key(namespace)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+        return cache.get(key)
+
+
+def _format_key(namespace, version, parts):
+    suffix = ':'.join(str(part) for part in parts)
+    return f'reservations:{namespace}:v{version}:{suffix}'
+
+
+def versioned_key(namespace, *parts):
+    """生成带版本号的缓存键"""
+    return _format_key(namespace, get_version(namespace), parts)
+
+
+async def aversioned_key(namespace, *parts):
+    """versioned_key() 的异步版本"""
+    return _format_key(namespace, await aget_version(namespace), parts)
@@ -0,0 +1,206 @@
+"""
+实验室目录查询
+
+集中实验室列表页、详情页与 AJAX 接口共用的目录读取、搜索与分类统计逻辑，搜索优先走全文索引。
+可用实验室列表、搜索结果和分类统计的缓存键带上与 ETag 相同的数据库字段（所有实验室的
+Max(updated_at) 与数量），单个实验室记录的缓存键带上该实验室的 updated_at：其他进程中的修改
+不依赖各进程各自的缓存即可在下次读取时生效，整页缓存和 ETag 也不会配上旧的目录数据。
+另带上 catalogue 命名空间的版本号，Laboratory / TimeSlot 写入后由信号递增，本进程内立即失效。
+视图传入本次请求已查询的状态（state），缓存命中时目录读取不再访问数据库；未传入时查询一次。
+部署后可执行 python manage.py warm_catalogue_cache 预热。
+以 a 开头的函数是供 ASGI 异步视图使用的版本，读写同一份缓存。
+"""
+import hashlib
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .caching import aversioned_key, bump_version, versioned_key
+from .freshness import acatalogue_state, catalogue_state, laboratory_state
+from .models import Laboratory
+from .search import full_text_search
+
+CATALOGUE_NAMESPACE = 'catalogue'
+
+
+def search_laboratories(queryset, search_query, ranked=True):
+    """按名称、位置、描述、设备搜索实验室
+
+    优先使用全文索引（ranked 时按相关度排序），不可用时回退到 icontains 查询。
+    """
+    if not search_query:
+        return queryset
+    results = full_text_search(queryset, search_query, ranked=ranked)
+    if results is not None:
+        return results
+    return queryset.filter(
+        Q(name__icontains=search_query) |
+        Q(location__icontains=search_query) |
+        Q(description__icontains=search_query) |
+        Q(equipment__icontains=search_query)
+    )
+
+
+def _timeout():
+    return getattr(settings, 'CATALOGUE_CACHE_TIMEOUT', 3600)
+
+
+def _build_facets(counts):
+    """按 CATEGORY_CHOICES 顺序整理分类统计，返回 (分类统计, 总数)"""
+    category_counts = {}
+    for category_code, category_name in Laboratory.CATEGORY_CHOICES:
+        count = counts.get(category_code, 0)
+        if count > 0:
+            category_counts[category_code] = {
+                'name': category_name,
+                'count': count,
+                'color': Laboratory.CATEGORY_COLORS.get(category_code, '#495057'),
+            }
+    return category_counts, sum(counts.values())
+
+
+def _count_categories(queryset):
+    """一次 GROUP BY 查询统计各分类数量，返回 (分类统计, 总数)"""
+    return _build_facets(dict(queryset.order_by().values_list('category').annotate(count=Count('id'))))
+
+
+def catalogue_stamp(state):
+    """目录缓存键中的时间戳部分，state 为所有实验室的 Max(updated_at) 与数量"""
+    updated_at = state['updated_at']
+    return f"{updated_at.isoformat() if updated_at else '-'}:{state['count']}"
+
+
+def active_laboratories(state=None):
+    """可用实验室列表（按分类、名称排序）"""
+    key = versioned_key(CATALOGUE_NAMESPACE, 'laboratories', catalogue_stamp(state or catalogue_state()))
+    laboratories = cache.get(key)
+    if laboratories is None:
+        laboratories = list(Laboratory.objects.filter(is_active=True))
+        cache.set(key, laboratories, _timeout())
+    return laboratories
+
+
+async def aactive_laboratories(state=None):
+    """active_laboratories() 的异步版本"""
+    key = await aversioned_key(CATALOGUE_NAMESPACE, 'laboratories', catalogue_stamp(state or await acatalogue_state()))
+    laboratories = await cache.aget(key)
+    if laboratories is None:
+        laboratories = [laboratory async for laboratory in Laboratory.objects.filter(is_active=True)]
+        await cache.aset(key, laboratories, _timeout())
+    return laboratories
+
+
+def get_laboratory(lab_id, state=None):
+    """按 id 返回可用实验室，不存在或已停用时返回 None
+
+    state 为实验室的 (updated_at, schedule_updated_at)（freshness.laboratory_state），未传入时查询一次。
+    """
+    if state is None:
+        state = laboratory_state(lab_id)
+        if state is None:
+            return None
+    key = versioned_key(CATALOGUE_NAMESPACE, 'laboratory', lab_id, state[0].isoformat())
+    laboratory = cache.get(key)
+    if laboratory is None:
+        laboratory = Laboratory.objects.filter(id=lab_id, is_active=True).first()
+        if laboratory is not None:
+            cache.set(key, laboratory, _timeout())
+    return laboratory
+
+
+def _search_digest(search_query):
+    return hashlib.md5(search_query.encode('utf-8')).hexdigest()
+
+
+def search_laboratory_ids(search_query, state=None):
+    """可用实验室的搜索结果 id 列表（按相关度排序）"""
+    key = versioned_key(
+        CATALOGUE_NAMESPACE, 'search', catalogue_stamp(state or catalogue_state()), _search_digest(search_query),
+    )
+    ids = cache.get(key)
+    if ids is None:
+        ids = list(search_laboratories(Laboratory.objects.filter(is_active=True), search_query).values_list('id', flat=True))
+        cache.set(key, ids, _timeout())
+    return ids
+
+
+async def asearch_laboratory_ids(search_query, state=None):
+    """search_laboratory_ids() 的异步版本"""
+    key = await aversioned_key(
+        CATALOGUE_NAMESPACE, 'search', catalogue_stamp(state or await acatalogue_state()), _search_digest(search_query),
+    )
+    ids = await cache.aget(key)
+    if ids is None:
+        # 构造全文检索查询时可能需要读取表结构（同步操作），放到线程中执行
+        queryset = await sync_to_async(search_laboratories)(Laboratory.objects.filter(is_active=True), search_query)
+        ids = [pk async for pk in queryset.values_list('id', flat=True)]
+        await cache.aset(key, ids, _timeout())
+    return ids
+
+
+def browse_catalogue(search_query='', category_filter='', state=None):
+    """按搜索词和分类筛选可用实验室，返回 (实验室列表, 分类统计, 总数)
+
+    分类统计只受搜索词影响，不受当前选中的分类影响。
+    """
+    state = state or catalogue_state()
+    laboratories = active_laboratories(state)
+    if search_query:
+        by_id = {laboratory.id: laboratory for laboratory in laboratories}
+        laboratories = [by_id[pk] for pk in search_laboratory_ids(search_query, state) if pk in by_id]
+        category_counts, total_count = _build_facets(Counter(laboratory.category for laboratory in laboratories))
+    else:
+        category_counts, total_count = category_facets(state=state)
+    if category_filter:
+        laboratories = [laboratory for laboratory in laboratories if laboratory.category == category_filter]
+    return laboratories, category_counts, total_count
+
+
+async def abrowse_laboratories(search_query='', category_filter='', state=None):
+    """按搜索词和分类筛选可用实验室（异步，只返回实验室列表，不统计分类）"""
+    state = state or await acatalogue_state()
+    laboratories = await aactive_laboratories(state)
+    if search_query:
+        by_id = {laboratory.id: laboratory for laboratory in laboratories}
+        laboratories = [by_id[pk] for pk in await asearch_laboratory_ids(search_query, state) if pk in by_id]
+    if category_filter:
+        laboratories = [laboratory for laboratory in laboratories if laboratory.category == category_filter]
+    return laboratories
+
+
+def category_facets(search_query='', state=None):
+    """返回可用实验室的分类统计 (分类统计, 总数)，未搜索时走缓存"""
+    laboratories = Laboratory.objects.filter(is_active=True)
+    if search_query:
+        return _count_categories(search_laboratories(laboratories, search_query, ranked=False))
+
+    state = state or catalogue_state()
+    key = versioned_key(CATALOGUE_NAMESPACE, 'facets', catalogue_stamp(state))
+    facets = cache.get(key)
+    if facets is None:
+        facets = _build_facets(Counter(laboratory.category for laboratory in active_laboratories(state)))
+        cache.set(key, facets, _timeout())
+    return facets
+
+
+def warm_catalogue():
+    """预热目录缓存：实验室列表、分类统计和每个可用实验室的记录，返回实验室数量"""
+    state = catalogue_state()
+    laboratories = active_laboratories(state)
+    category_facets(state=state)
+    cache.set_many(
+        {
+            versioned_key(CATALOGUE_NAMESPACE, 'laboratory', laboratory.id, laboratory.updated_at.isoformat()): laboratory
+            for laboratory in laboratories
+        },
+        _timeout(),
+    )
+    return len(laboratories)
+
+
+def invalidate_catalogue():
+    """使实验室目录相关缓存失效"""
+    bump_version(CATALOGUE_NAMESPACE)
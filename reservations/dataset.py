@@ -0,0 +1,189 @@
+"""
+合成数据集生成
+
+按给定规模批量生成实验室、用户和预约记录，用于性能测试和压测；实验室引用两个共用的时间表模板
+（全周开放 / 仅工作日开放），不再为每个实验室写入时间段。
+分布尽量贴近真实使用：热门实验室和活跃用户占多数预约，工作日多于周末，
+上午和下午的时间段多于晚上；过去的预约多为已完成，未来的预约多为待审核/已批准。
+同一实验室同一时间段只会生成一条有效预约，满足数据库的重叠约束。
+全部写入使用 bulk_create，不触发模型信号，生成后统一重建全文索引并清理缓存。
+"""
+import random
+from datetime import time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .catalogue import invalidate_catalogue
+from .freshness import touch_laboratory_schedule
+from .models import Laboratory, Reservation, ScheduleTemplate, ScheduleTemplateSlot, UserProfile
+from .occupancy import occupancy_index
+from .schedules import schedule_table
+from .search import rebuild_search_index
+
+DEFAULT_PASSWORD = 'bench12345'
+
+# 标准开放时间段及其被预约的相对概率
+SLOTS = [(8, 10), (10, 12), (14, 16), (16, 18), (19, 21)]
+SLOT_WEIGHTS = [3, 4, 4, 3, 1]
+# 周一到周日被预约的相对概率
+WEEKDAY_WEIGHTS = [10, 10, 10, 10, 9, 4, 2]
+
+PAST_STATUSES = (['completed', 'cancelled', 'rejected'], [70, 15, 15])
+FUTURE_STATUSES = (['pending', 'approved', 'cancelled', 'rejected'], [40, 45, 10, 5])
+
+CATEGORY_EQUIPMENT = {
+    'physics': '示波器、信号发生器、万用表、光学平台',
+    'chemistry': '通风橱、分析天平、离心机、pH计',
+    'biology': '显微镜、培养箱、PCR仪、电泳设备',
+    'computer': '高性能计算机、投影设备、网络设备',
+    'engineering': '3D打印机、激光切割机、数控机床',
+    'mathematics': '计算工作站、电子白板',
+    'electronics': '焊接台、逻辑分析仪、电源',
+    'materials': '万能试验机、硬度计、金相显微镜',
+    'environmental': '水质分析仪、气相色谱仪',
+    'medical': '生理记录仪、解剖模型',
+    'other': '常用实验器材',
+}
+BUILDINGS = ['理科楼', '工程楼', '信息楼', '生科楼', '实验楼', '医学楼']
+DEPARTMENTS = ['计算机科学与技术学院', '物理学院', '化学学院', '生命科学学院', '工程学院', '医学院']
+PURPOSES = ['课程实验', '毕业设计', '科研项目', '竞赛准备', '兴趣小组活动', '设备调试']
+
+
+def _popularity(count, skew=0.8):
+    """排名越靠前权重越大的长尾分布"""
+    return [1 / (rank + 1) ** skew for rank in range(count)]
+
+
+def _report(progress, message):
+    if progress:
+        progress(message)
+
+
+def generate_dataset(labs=0, users=0, reservations=0, past_days=60, future_days=30,
+                     seed=None, batch_size=1000, prefix='bench', progress=None):
+    """生成合成数据，返回各类记录的新增数量
+
+    reservations 条预约分配到本次生成的实验室和用户上；
+    未生成实验室或用户时使用数据库中已有的记录。
+    """
+    rng = random.Random(seed)
+    categories = [value for value, _label in Laboratory.CATEGORY_CHOICES]
+    today = timezone.now().date()
+    created = {'laboratories': 0, 'timeslots': 0, 'users': 0, 'reservations': 0}
+
+    with transaction.atomic():
+        # 时间表模板：全周开放、仅工作日开放
+        templates = []
+        for suffix, weekdays in (('全周', range(7)), ('工作日', range(5))):
+            template, new = ScheduleTemplate.objects.get_or_create(name=f'{prefix}-{suffix}时间表')
+            if new:
+                slots = ScheduleTemplateSlot.objects.bulk_create([
+                    ScheduleTemplateSlot(template=template, weekday=weekday, start_time=time(start), end_time=time(end))
+                    for weekday in weekdays
+                    for start, end in SLOTS
+                ])
+                created['timeslots'] += len(slots)
+            templates.append(template)
+        _report(progress, f"模板时间段：{created['timeslots']}")
+
+        # 实验室
+        offset = Laboratory.objects.filter(name__startswith=prefix).count()
+        new_labs = []
+        for i in range(offset, offset + labs):
+            category = rng.choice(categories)
+            new_labs.append(Laboratory(
+                name=f'{prefix}-{dict(Laboratory.CATEGORY_CHOICES)[category]}实验室{i + 1}',
+                category=category,
+                location=f'{rng.choice(BUILDINGS)}{rng.randint(1, 6)}{rng.randint(1, 20):02d}',
+                capacity=rng.choice([15, 20, 25, 30, 40, 60]),
+                equipment=CATEGORY_EQUIPMENT[category],
+                description=f'{dict(Laboratory.CATEGORY_CHOICES)[category]}类实验室，支持{rng.choice(PURPOSES)}。',
+                is_active=rng.random() > 0.05,
+                schedule_template=templates[rng.random() > 0.5],
+            ))
+        new_labs = Laboratory.objects.bulk_create(new_labs, batch_size=batch_size)
+        created['laboratories'] = len(new_labs)
+        _report(progress, f'实验室：{len(new_labs)}')
+
+        # 用户及其资料（密码只哈希一次）
+        offset = User.objects.filter(username__startswith=prefix).count()
+        password = make_password(DEFAULT_PASSWORD)
+        new_users = User.objects.bulk_create([
+            User(username=f'{prefix}{i + 1:06d}', password=password, email=f'{prefix}{i + 1:06d}@example.com')
+            for i in range(offset, offset + users)
+        ], batch_size=batch_size)
+        UserProfile.objects.bulk_create([
+            UserProfile(user=user, student_id=user.username, phone=f'138{rng.randint(0, 99999999):08d}',
+                        department=rng.choice(DEPARTMENTS))
+            for user in new_users
+        ], batch_size=batch_size)
+        created['users'] = len(new_users)
+        _report(progress, f'用户：{len(new_users)}')
+
+        # 预约记录
+        if reservations:
+            lab_ids = [lab.pk for lab in new_labs] or list(Laboratory.objects.values_list('pk', flat=True))
+            user_ids = [user.pk for user in new_users] or list(User.objects.values_list('pk', flat=True))
+            if not lab_ids or not user_ids:
+                raise ValueError('生成预约需要至少一个实验室和一个用户')
+            lab_weights = _popularity(len(lab_ids))
+            user_weights = _popularity(len(user_ids))
+            days = [today + timedelta(days=n) for n in range(-past_days, future_days + 1)]
+            day_weights = [WEEKDAY_WEIGHTS[day.weekday()] for day in days]
+            # 已有的有效预约所占的标准时间段
+            taken = set()
+            if not new_labs:
+                rows = Reservation.objects.filter(
+                    laboratory_id__in=lab_ids, date__gte=days[0], status__in=Reservation.ACTIVE_STATUSES,
+                ).values_list('laboratory_id', 'date', 'start_time', 'end_time')
+                for lab_id, day, start_time, end_time in rows:
+                    taken.update(
+                        (lab_id, day, start) for start, end in SLOTS
+                        if start_time < time(end) and end_time > time(start)
+                    )
+
+            remaining = reservations
+            while remaining:
+                count = min(batch_size, remaining)
+                batch = []
+                for lab_id, user_id, day, (start, end) in zip(
+                    rng.choices(lab_ids, lab_weights, k=count),
+                    rng.choices(user_ids, user_weights, k=count),
+                    rng.choices(days, day_weights, k=count),
+                    rng.choices(SLOTS, SLOT_WEIGHTS, k=count),
+                ):
+                    statuses, weights = PAST_STATUSES if day < today else FUTURE_STATUSES
+                    status = rng.choices(statuses, weights)[0]
+                    if status in Reservation.ACTIVE_STATUSES:
+                        if (lab_id, day, start) in taken:
+                            status = 'cancelled'
+                        else:
+                            taken.add((lab_id, day, start))
+                    # 约三分之一的预约只占用时间段中的一个小时
+                    if rng.random() < 0.35:
+                        start_time, end_time = (time(start), time(start + 1)) if rng.random() < 0.5 else (time(start + 1), time(end))
+                    else:
+                        start_time, end_time = time(start), time(end)
+                    batch.append(Reservation(
+                        user_id=user_id, laboratory_id=lab_id, date=day, start_time=start_time, end_time=end_time,
+                        purpose=rng.choice(PURPOSES), status=status,
+                    ))
+                Reservation.objects.bulk_create(batch, batch_size=batch_size)
+                remaining -= count
+                created['reservations'] += count
+                _report(progress, f'预约：{created["reservations"]}/{reservations}')
+
+        if reservations and not new_labs:
+            touch_laboratory_schedule(lab_ids)
+        if new_labs:
+            rebuild_search_index(Laboratory.objects.only('id', 'name', 'location', 'description', 'equipment').iterator(chunk_size=2000))
+
+    # bulk_create 不触发信号，统一清理进程内索引和缓存
+    occupancy_index.invalidate()
+    invalidate_catalogue()
+    if new_labs:
+        schedule_table.discard()
+    return created
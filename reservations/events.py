@@ -0,0 +1,225 @@
+"""
+实验室占用变化推送（Server-Sent Events）
+
+预约创建、取消、批准、拒绝（以及删除）提交后，向该实验室的频道发布当天的最新占用情况，
+详情页通过 EventSource 订阅 laboratory_events 接口并就地更新周占用表，不再需要刷新或轮询。
+事件流只在 ASGI 下提供（asgi_urls 中的异步视图，等待时不占用线程）；WSGI 下每个连接会一直占用
+一个工作线程，接口直接返回 204，浏览器不再重连，详情页改为定时轮询 laboratory_week_grid。
+
+发布与订阅经过消息代理（settings.RESERVATION_EVENT_BROKER，默认为进程内的 InProcessBroker）。
+进程内代理只能把事件分发给同一进程中的连接，多进程部署时可替换为基于 Redis 等的实现，
+只需提供 publish / subscribe / has_subscribers 三个方法。
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_date
+from django.utils.module_loading import import_string
+
+from .availability import WEEK_GRID_DAYS
+from .occupancy import occupancy_index
+
+# 每个订阅最多缓存的未读事件数，客户端过慢时丢弃最早的事件
+SUBSCRIPTION_BUFFER = 100
+# 浏览器断线后重连的等待时间（毫秒）
+RECONNECT_MS = 3000
+
+
+def laboratory_channel(lab_id):
+    return f'laboratory:{int(lab_id)}'
+
+
+class Subscription:
+    """一个频道的订阅，可在线程中同步读取，也可在事件循环中异步读取"""
+
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self._events = deque(maxlen=SUBSCRIPTION_BUFFER)
+        self._condition = threading.Condition()
+        self._waiter = None
+
+    def put(self, event):
+        """由代理在发布事件的线程中调用"""
+        with self._condition:
+            self._events.append(event)
+            self._condition.notify()
+            waiter = self._waiter
+        if waiter is not None:
+            loop, ready = waiter
+            try:
+                loop.call_soon_threadsafe(ready.set)
+            except RuntimeError:
+                # 事件循环已关闭，连接已经结束
+                pass
+
+    def get(self, timeout=None):
+        """等待下一个事件，超时返回 None"""
+        with self._condition:
+            if not self._events:
+                self._condition.wait(timeout)
+            return self._events.popleft() if self._events else None
+
+    async def aget(self, timeout=None):
+        """get() 的异步版本"""
+        with self._condition:
+            if self._events:
+                return self._events.popleft()
+            ready = asyncio.Event()
+            self._waiter = (asyncio.get_running_loop(), ready)
+        try:
+            await asyncio.wait_for(ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        with self._condition:
+            self._waiter = None
+            return self._events.popleft() if self._events else None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class InProcessBroker:
+    """进程内的消息代理"""
+
+    def __init__(self):
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel)
+        with self._lock:
+            self._subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+    def has_subscribers(self, channel):
+        with self._lock:
+            return bool(self._subscriptions.get(channel))
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+        return len(subscriptions)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """当前配置的消息代理（进程内单例）"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, 'RESERVATION_EVENT_BROKER', 'reservations.events.InProcessBroker')
+                _broker = import_string(path)()
+    return _broker
+
+
+def reset_broker():
+    """丢弃当前的消息代理，下次使用时按配置重新创建（测试或修改配置后使用）"""
+    global _broker
+    with _broker_lock:
+        _broker = None
+
+
+def _occupancy_event(lab_id, day, bucket, action, reservation_id=None):
+    return {
+        'laboratory_id': int(lab_id),
+        'date': day,
+        'action': action,
+        'reservation_id': reservation_id,
+        'reservations': [{'start_time': start, 'end_time': end} for start, end, _pk in bucket.intervals],
+    }
+
+
+def day_occupancy_event(lab_id, day, action='snapshot', reservation_id=None):
+    """某实验室某天（date 对象）的占用情况（有效预约的时间区间，按开始时间排序）"""
+    return _occupancy_event(lab_id, day, occupancy_index.get(lab_id, day), action, reservation_id)
+
+
+def _snapshot_days(start_date):
+    return [start_date + timedelta(days=i) for i in range(WEEK_GRID_DAYS)]
+
+
+async def aweek_snapshot(lab_id, start_date):
+    """详情页周占用表范围内每天的占用情况（一次查询）"""
+    days = _snapshot_days(start_date)
+    buckets = await occupancy_index.aget_many((lab_id, day) for day in days)
+    return [_occupancy_event(lab_id, day, buckets[(int(lab_id), day)], 'snapshot') for day in days]
+
+
+def publish_occupancy(lab_id, days, action, reservation_id=None):
+    """发布实验室若干天的最新占用情况，没有订阅者时不做任何查询"""
+    broker = get_broker()
+    channel = laboratory_channel(lab_id)
+    if not broker.has_subscribers(channel):
+        return
+    for day in sorted({parse_date(day) if isinstance(day, str) else day for day in days}):
+        broker.publish(channel, day_occupancy_event(lab_id, day, action, reservation_id))
+
+
+def reservation_action(reservation, created):
+    """根据预约的保存情况推断变化类型"""
+    if created:
+        return 'created'
+    if reservation.status in ('cancelled', 'approved', 'rejected'):
+        return reservation.status
+    return 'updated'
+
+
+def format_event(event, name='occupancy'):
+    """编码为一条 SSE 消息"""
+    data = json.dumps(event, cls=DjangoJSONEncoder, ensure_ascii=False)
+    return f'event: {name}\ndata: {data}\n\n'
+
+
+def _stream_timing():
+    """(心跳间隔, 单个连接的最长时间)，单位为秒"""
+    return (
+        getattr(settings, 'EVENT_STREAM_HEARTBEAT', 15),
+        getattr(settings, 'EVENT_STREAM_MAX_AGE', 300),
+    )
+
+
+async def astream_laboratory_events(lab_id, start_date):
+    """实验室的 SSE 事件流（ASGI）
+
+    先订阅再发送周占用快照，之后推送占用变化，空闲时发送心跳注释。
+    等待事件时不占用线程，超过 EVENT_STREAM_MAX_AGE 秒后结束，由浏览器自动重连。
+    """
+    heartbeat, max_age = _stream_timing()
+    subscription = get_broker().subscribe(laboratory_channel(lab_id))
+    try:
+        yield f'retry: {RECONNECT_MS}\n\n'
+        for event in await aweek_snapshot(lab_id, start_date):
+            yield format_event(event)
+        deadline = time.monotonic() + max_age
+        while (remaining := deadline - time.monotonic()) > 0:
+            event = await subscription.aget(min(heartbeat, remaining))
+            yield format_event(event) if event is not None else ': keepalive\n\n'
+    finally:
+        subscription.close()
@@ -0,0 +1,172 @@
+"""
+预约记录导出（CSV / NDJSON）
+
+管理员按日期范围、实验室和状态导出预约记录。查询使用 values() 投影（预约连接用户、
+用户资料和实验室，只取导出的列），按主键顺序经 iterator(chunk_size=...) 分块读取，
+编码后每 EXPORT_BATCH_ROWS 行输出一次；不创建模型实例，也不把结果集整体读入内存，
+导出一千行和一千万行时占用的内存相同。
+ASGI 下使用异步迭代（aiterator），避免 Django 把同步迭代器整体读入内存后再发送。
+CSV 中以公式字符开头的文本前加单引号，防止用 Excel 等打开时被当作公式执行（CSV 注入）。
+"""
+import csv
+import io
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_date
+
+from .models import Reservation
+
+# (NDJSON 字段名, values() 查询路径, CSV 表头)
+EXPORT_COLUMNS = [
+    ('id', 'id', '预约编号'),
+    ('date', 'date', '日期'),
+    ('start_time', 'start_time', '开始时间'),
+    ('end_time', 'end_time', '结束时间'),
+    ('status', 'status', '状态'),
+    ('laboratory_id', 'laboratory_id', '实验室编号'),
+    ('laboratory', 'laboratory__name', '实验室'),
+    ('location', 'laboratory__location', '位置'),
+    ('username', 'user__username', '用户名'),
+    ('name', 'user__first_name', '姓名'),
+    ('email', 'user__email', '邮箱'),
+    ('student_id', 'user__userprofile__student_id', '学号/工号'),
+    ('department', 'user__userprofile__department', '院系'),
+    ('purpose', 'purpose', '使用目的'),
+    ('admin_comment', 'admin_comment', '管理员备注'),
+    ('created_at', 'created_at', '创建时间'),
+    ('updated_at', 'updated_at', '更新时间'),
+]
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+# 每输出一块包含的行数
+EXPORT_BATCH_ROWS = 500
+
+STATUS_LABELS = dict(Reservation.STATUS_CHOICES)
+# 电子表格会把以这些字符开头的单元格当作公式
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def export_chunk_size():
+    """每次从数据库读取的行数"""
+    return getattr(settings, 'RESERVATION_EXPORT_CHUNK_SIZE', 2000)
+
+
+def _parse_date(value, label):
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValueError(f'{label}格式错误')
+    return day
+
+
+def parse_export_filters(params):
+    """解析导出条件（start、end、lab、status，lab 和 status 可多值），参数错误时抛出 ValueError"""
+    filters = {}
+    if params.get('start'):
+        filters['date__gte'] = _parse_date(params['start'], '开始日期')
+    if params.get('end'):
+        filters['date__lte'] = _parse_date(params['end'], '结束日期')
+    if 'date__gte' in filters and 'date__lte' in filters and filters['date__gte'] > filters['date__lte']:
+        raise ValueError('开始日期不能晚于结束日期')
+    labs = [value for value in params.getlist('lab') if value]
+    if labs:
+        try:
+            filters['laboratory_id__in'] = sorted({int(value) for value in labs})
+        except ValueError:
+            raise ValueError('实验室编号错误') from None
+    statuses = [value for value in params.getlist('status') if value]
+    if statuses:
+        unknown = set(statuses) - set(STATUS_LABELS)
+        if unknown:
+            raise ValueError(f'未知的状态：{"、".join(sorted(unknown))}')
+        filters['status__in'] = sorted(set(statuses))
+    return filters
+
+
+def export_queryset(filters):
+    """导出的查询：按主键顺序的 values() 投影"""
+    return (
+        Reservation.objects.filter(**filters)
+        .order_by('id')
+        .values(*[lookup for _key, lookup, _title in EXPORT_COLUMNS])
+    )
+
+
+def escape_formula(value):
+    """以公式字符开头的文本前加单引号，按普通文本显示"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class CSVEncoder:
+    """CSV 编码，带 BOM 以便 Excel 正确识别中文；状态输出为中文名称，用户填写的文本转义公式字符"""
+
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def _line(self, values):
+        self._writer.writerow(values)
+        line = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return line
+
+    def header(self):
+        return '\ufeff' + self._line([title for _key, _lookup, title in EXPORT_COLUMNS])
+
+    def row(self, row):
+        values = []
+        for _key, lookup, _title in EXPORT_COLUMNS:
+            value = row[lookup]
+            if lookup == 'status':
+                value = STATUS_LABELS.get(value, value)
+            values.append('' if value is None else escape_formula(value))
+        return self._line(values)
+
+
+class NDJSONEncoder:
+    """NDJSON 编码，每行一个 JSON 对象"""
+
+    def header(self):
+        return ''
+
+    def row(self, row):
+        record = {key: row[lookup] for key, lookup, _title in EXPORT_COLUMNS}
+        return json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+ENCODERS = {'csv': CSVEncoder, 'ndjson': NDJSONEncoder}
+
+
+def stream_export(queryset, fmt):
+    """逐块输出编码后的导出内容"""
+    encoder = ENCODERS[fmt]()
+    parts = [encoder.header()]
+    for row in queryset.iterator(chunk_size=export_chunk_size()):
+        parts.append(encoder.row(row))
+        if len(parts) >= EXPORT_BATCH_ROWS:
+            yield ''.join(parts)
+            parts = []
+    if parts:
+        yield ''.join(parts)
+
+
+async def astream_export(queryset, fmt):
+    """stream_export() 的异步版本（ASGI）"""
+    encoder = ENCODERS[fmt]()
+    parts = [encoder.header()]
+    async for row in queryset.aiterator(chunk_size=export_chunk_size()):
+        parts.append(encoder.row(row))
+        if len(parts) >= EXPORT_BATCH_ROWS:
+            yield ''.join(parts)
+            parts = []
+    if parts:
+        yield ''.join(parts)
@@ -1,12 +1,42 @@
 from django import forms
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm
-from .models import Reservation, UserProfile
+from .models import Reservation, ReservationSeries, UserProfile
+from .schedules import WEEKDAY_LABELS, laboratory_schedule
+from .services import overlapping_reservations
+
+# 一个重复预约系列最多包含的次数（约一个学期）
+MAX_SERIES_OCCURRENCES = 30
 
 
 class ReservationForm(forms.ModelForm):
-    """预约表单"""
-    
+    """预约表单（allow_recurring 为 True 时可按周重复预约；给出 laboratory 时检查开放时间）"""
+    repeat = forms.TypedChoiceField(
+        label='重复',
+        choices=[(0, '不重复')] + ReservationSeries.INTERVAL_CHOICES,
+        coerce=int,
+        empty_value=0,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+    repeat_until = forms.DateField(
+        label='重复截止日期',
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+    )
+    skip_conflicts = forms.BooleanField(
+        label='跳过已被预约的日期',
+        required=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+    )
+
+    def __init__(self, *args, laboratory=None, allow_recurring=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.laboratory = laboratory
+        if not allow_recurring:
+            for name in ('repeat', 'repeat_until', 'skip_conflicts'):
+                del self.fields[name]
+
     class Meta:
         model = Reservation
         fields = ['date', 'start_time', 'end_time', 'purpose']
@@ -45,9 +75,59 @@ class ReservationForm(forms.ModelForm):
         if start_time and end_time:
             if start_time >= end_time:
                 raise forms.ValidationError('开始时间必须早于结束时间')
+
+        date = cleaned_data.get('date')
+        # 按周重复的各次预约与首次同一星期，检查一次即可
+        if self.laboratory is not None and date and start_time and end_time:
+            schedule = laboratory_schedule(self.laboratory)
+            weekday = date.weekday()
+            if not schedule.allows(weekday, start_time, end_time):
+                raise forms.ValidationError(
+                    f'所选时间不在实验室开放时间内（{WEEKDAY_LABELS[weekday]}：{schedule.describe(weekday)}）'
+                )
+        if cleaned_data.get('repeat') and date:
+            until = cleaned_data.get('repeat_until')
+            if until is None:
+                self.add_error('repeat_until', '请填写重复截止日期')
+            elif until < date:
+                self.add_error('repeat_until', '截止日期不能早于预约日期')
+            elif (until - date).days // (7 * cleaned_data['repeat']) + 1 > MAX_SERIES_OCCURRENCES:
+                self.add_error('repeat_until', f'重复预约最多 {MAX_SERIES_OCCURRENCES} 次')
         
         return cleaned_data
 
+    @property
+    def is_recurring(self):
+        return bool(self.cleaned_data.get('repeat'))
+
+    def build_series(self, reservation):
+        """根据表单和未保存的首次预约构造重复预约系列（未保存）"""
+        return ReservationSeries(
+            user=reservation.user, laboratory=reservation.laboratory,
+            start_date=reservation.date, end_date=self.cleaned_data['repeat_until'],
+            interval_weeks=self.cleaned_data['repeat'],
+            start_time=reservation.start_time, end_time=reservation.end_time, purpose=reservation.purpose,
+        )
+
+
+class ReservationAdminForm(forms.ModelForm):
+    """后台预约表单：与其他有效预约重叠时作为表单错误返回，保留已填写的内容"""
+
+    class Meta:
+        model = Reservation
+        fields = '__all__'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        fields = [cleaned_data.get(name) for name in ('laboratory', 'date', 'start_time', 'end_time', 'status')]
+        if all(fields):
+            laboratory, date, start_time, end_time, status = fields
+            if status in Reservation.ACTIVE_STATUSES and start_time < end_time and overlapping_reservations(
+                laboratory.id, date, start_time, end_time
+            ).exclude(pk=self.instance.pk).exists():
+                raise forms.ValidationError('该时间段与其他有效预约冲突')
+        return cleaned_data
+
 
 class UserRegistrationForm(UserCreationForm):
     """用户注册表单"""
@@ -104,3 +184,18 @@ class UserProfileForm(forms.ModelForm):
             'phone': '电话',
             'department': '院系',
         }
+
+
+class CatalogueImportForm(forms.Form):
+    """实验室目录导入表单"""
+
+    file = forms.FileField(
+        label='目录文件',
+        help_text='CSV、JSON 或 JSON Lines 文件，按实验室名称新增或更新',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.json,.jsonl,.ndjson'}),
+    )
+    dry_run = forms.BooleanField(
+        label='只预览差异，不保存',
+        required=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+    )
@@ -0,0 +1,124 @@
+"""
+条件请求（ETag / Last-Modified）
+
+实验室列表、详情页和实验室列表接口配合 django.views.decorators.http.condition 使用，
+未变化时直接返回 304，不执行视图、不渲染模板，除登录用户的会话查询外只需一次很小的查询：
+- 列表类：所有实验室的 Max(updated_at) 与数量（数量变化可反映删除）；
+- 详情页：该实验室的 updated_at 与 schedule_updated_at（时间段、预约变更时由信号更新）。
+页面包含当前用户信息和待显示的提示消息，ETag 中一并计入；详情页的周占用表从今天开始，
+因此也计入当天日期。同一请求内 ETag 与 Last-Modified 共用一次查询结果。
+condition 在事件循环中同步调用 ETag 函数，异步视图需先用 prefetch_catalogue_state 预取状态。
+"""
+import hashlib
+from datetime import datetime, time
+from functools import wraps
+
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.contrib.messages.storage.session import SessionStorage
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import Laboratory
+
+
+def touch_laboratory_schedule(lab_ids):
+    """标记实验室的时间段或预约已变更（集合 UPDATE，不触发 Laboratory 信号）"""
+    lab_ids = set(lab_ids)
+    if lab_ids:
+        Laboratory.objects.filter(pk__in=lab_ids).update(schedule_updated_at=timezone.now())
+
+
+def catalogue_state():
+    """所有实验室的 Max(updated_at) 与数量"""
+    return Laboratory.objects.aggregate(updated_at=Max('updated_at'), count=Count('id'))
+
+
+async def acatalogue_state():
+    """catalogue_state() 的异步版本"""
+    return await Laboratory.objects.aaggregate(updated_at=Max('updated_at'), count=Count('id'))
+
+
+def request_catalogue_state(request):
+    """所有实验室的 Max(updated_at) 与数量，同一请求内只查询一次（ETag、整页缓存键和目录缓存键共用）"""
+    if not hasattr(request, '_catalogue_state'):
+        request._catalogue_state = catalogue_state()
+    return request._catalogue_state
+
+
+def prefetch_catalogue_state(view):
+    """异步视图装饰器（置于 condition 之外）：用异步 ORM 预取目录状态"""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if not hasattr(request, '_catalogue_state'):
+            request._catalogue_state = await acatalogue_state()
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def laboratory_state(lab_id):
+    """可用实验室的 (updated_at, schedule_updated_at)，不存在或已停用时返回 None"""
+    return (
+        Laboratory.objects.filter(pk=lab_id, is_active=True)
+        .values_list('updated_at', 'schedule_updated_at')
+        .first()
+    )
+
+
+def request_laboratory_state(request, lab_id):
+    """同一请求内共用一次 laboratory_state() 查询（ETag、整页缓存键和周占用表缓存键）"""
+    if not hasattr(request, '_laboratory_state'):
+        request._laboratory_state = laboratory_state(lab_id)
+    return request._laboratory_state
+
+
+def has_pending_messages(request):
+    """是否有待显示的提示消息"""
+    if request.COOKIES.get(CookieStorage.cookie_name):
+        return True
+    session = getattr(request, 'session', None)
+    return session is not None and session.session_key is not None and SessionStorage.session_key in session
+
+
+def _viewer(request):
+    """页面上与访问者相关的部分：用户和待显示的提示消息"""
+    user = getattr(request, 'user', None)
+    user_id = user.pk if user is not None and user.is_authenticated else 0
+    return f'{user_id}:{int(has_pending_messages(request))}'
+
+
+def _digest(*parts):
+    return hashlib.md5(':'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+
+def catalogue_etag(request, *args, **kwargs):
+    """实验室列表页面的 ETag"""
+    state = request_catalogue_state(request)
+    return _digest('catalogue', state['updated_at'], state['count'], _viewer(request))
+
+
+def catalogue_api_etag(request, *args, **kwargs):
+    """实验室列表接口的 ETag（与访问者无关）"""
+    state = request_catalogue_state(request)
+    return _digest('catalogue-api', state['updated_at'], state['count'])
+
+
+def catalogue_last_modified(request, *args, **kwargs):
+    """实验室列表的最后修改时间"""
+    return request_catalogue_state(request)['updated_at']
+
+
+def laboratory_etag(request, lab_id, *args, **kwargs):
+    """实验室详情页面的 ETag，实验室不存在时返回 None 由视图处理"""
+    state = request_laboratory_state(request, lab_id)
+    if state is None:
+        return None
+    return _digest('laboratory', lab_id, *state, timezone.localdate(), _viewer(request))
+
+
+def laboratory_last_modified(request, lab_id, *args, **kwargs):
+    """实验室详情的最后修改时间，不早于今天零点（周占用表按天滚动）"""
+    state = request_laboratory_state(request, lab_id)
+    if state is None:
+        return None
+    start_of_today = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+    return max(*state, start_of_today)
@@ -0,0 +1,401 @@
+"""
+实验室目录导入（CSV / JSON / JSON Lines）
+
+逐条读取实验室及其每周开放时间段，校验后按实验室名称 upsert：
+新实验室批量插入，字段有变化的批量更新；记录中给出了时间段的实验室以文件为准，
+按 (星期, 开始时间) 新增、更新或删除时间段，未给出时间段的实验室保持原有时间段不变。
+每 IMPORT_BATCH_SIZE 个实验室写入一批，整个导入在同一个事务内完成，
+任一条记录校验失败时全部回滚（其余记录仍会校验，以便一次报告所有错误）。
+批量写入不触发模型信号，写入后补写全文索引并标记排期变更，提交后使缓存失效。
+
+CSV 列：name, category, location, capacity, equipment, description, is_active, schedule_template, time_slots。
+is_active 留空表示不修改（新实验室默认可用）。
+schedule_template 为已有时间表模板的名称，留空表示不修改；引用模板时 time_slots 是对模板的覆盖。
+time_slots 形如 "0-4 08:00-10:00; 5,6 09:00-12:00"（星期 0 为周一），留空表示不修改时间段。
+JSON 为实验室对象数组，JSON Lines 每行一个对象，time_slots 为
+[{"weekday": 0, "start_time": "08:00", "end_time": "10:00", "is_available": true}, ...]。
+"""
+import csv
+import json
+import os
+import re
+from functools import lru_cache
+
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_time
+
+from .catalogue import invalidate_catalogue
+from .freshness import touch_laboratory_schedule
+from .models import Laboratory, ScheduleTemplate, TimeSlot
+from .schedules import schedule_table
+from .search import index_laboratories
+
+IMPORT_BATCH_SIZE = 1000
+IMPORT_FORMATS = {'.csv': 'csv', '.json': 'json', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+
+LAB_FIELDS = ('category', 'location', 'capacity', 'equipment', 'description', 'is_active')
+CATEGORY_LABELS = dict(Laboratory.CATEGORY_CHOICES)
+CATEGORY_CODES = {label: code for code, label in Laboratory.CATEGORY_CHOICES}
+WEEKDAYS = dict(TimeSlot.WEEKDAY_CHOICES)
+
+_SLOT_SPEC = re.compile(r'^([\d,\s-]+?)\s+(\d{1,2}:\d{2})\s*-\s*(\d{1,2}:\d{2})$')
+_TRUE = {'1', 'true', 'yes', 'y', '是'}
+_FALSE = {'0', 'false', 'no', 'n', '否'}
+
+
+class CatalogueImportError(ValueError):
+    """目录文件中有记录未通过校验，导入已回滚"""
+
+    def __init__(self, report):
+        self.report = report
+        super().__init__(f'{len(report.errors)} 条记录有误，导入已取消')
+
+
+class ImportReport:
+    """导入结果：各类记录的变化数量、逐个实验室的差异和错误"""
+
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.laboratories = {'created': 0, 'updated': 0, 'unchanged': 0}
+        self.timeslots = {'created': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+        # (实验室名称, 'created' / 'updated', [变化说明])
+        self.changes = []
+        # (行号, 错误信息)
+        self.errors = []
+
+    def summary(self):
+        labs, slots = self.laboratories, self.timeslots
+        return (
+            f"实验室：新增 {labs['created']}、更新 {labs['updated']}、未变化 {labs['unchanged']}；"
+            f"时间段：新增 {slots['created']}、更新 {slots['updated']}、删除 {slots['deleted']}、"
+            f"未变化 {slots['unchanged']}"
+        )
+
+    def diff_lines(self):
+        """逐行的差异说明：+ 新增，~ 更新"""
+        for name, action, details in self.changes:
+            marker = '+' if action == 'created' else '~'
+            yield f"{marker} {name}" + (f"（{'，'.join(details)}）" if details else '')
+
+
+def catalogue_format(filename):
+    """按扩展名判断目录文件格式"""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in IMPORT_FORMATS:
+        raise ValueError(f'不支持的文件格式：{extension or filename}（可用 .csv、.json、.jsonl）')
+    return IMPORT_FORMATS[extension]
+
+
+def read_catalogue(stream, fmt):
+    """逐条读取目录文件（文本流），产生 (行号, 记录)，无法解析的记录为 None"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                yield number, json.loads(line)
+            except ValueError:
+                yield number, None
+    else:
+        try:
+            records = json.load(stream)
+        except ValueError as exc:
+            yield getattr(exc, 'lineno', 1), None
+            return
+        if not isinstance(records, list):
+            yield 1, None
+            return
+        yield from enumerate(records, 1)
+
+
+def _text(record, key, max_length=None, required=False, label=''):
+    value = record.get(key)
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise ValueError(f'缺少{label}')
+    if max_length and len(value) > max_length:
+        raise ValueError(f'{label}超过 {max_length} 个字符')
+    return value
+
+
+def _boolean(value, label):
+    if isinstance(value, bool):
+        return value
+    text = '' if value is None else str(value).strip().lower()
+    if not text or text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    raise ValueError(f'{label}应为 true 或 false')
+
+
+@lru_cache(maxsize=1024)
+def _parse_time(text):
+    try:
+        return parse_time(text)
+    except ValueError:
+        return None
+
+
+def _time(value):
+    parsed = _parse_time(str(value).strip()) if value is not None else None
+    if parsed is None:
+        raise ValueError(f'时间格式错误：{value}')
+    return parsed
+
+
+def _weekdays(spec):
+    """'0-4' / '0,2,4' / '5' → 星期列表"""
+    days = []
+    for part in spec.replace(' ', '').split(','):
+        first, _, last = part.partition('-')
+        if not first.isdigit() or (last and not last.isdigit()):
+            raise ValueError(f'星期格式错误：{spec}')
+        days.extend(range(int(first), int(last or first) + 1))
+    return days
+
+
+def parse_slot_spec(spec):
+    """解析 CSV 中的时间段描述，返回 [(星期, 开始时间, 结束时间, 是否可预约)]"""
+    slots = []
+    for entry in filter(None, (part.strip() for part in spec.split(';'))):
+        match = _SLOT_SPEC.match(entry)
+        if not match:
+            raise ValueError(f'时间段格式错误：{entry}')
+        days, start, end = match.groups()
+        slots.extend((weekday, _time(start), _time(end), True) for weekday in _weekdays(days))
+    return slots
+
+
+def _clean_slots(value):
+    """规范化时间段，返回 {(星期, 开始时间): (结束时间, 是否可预约)}，None 表示不修改"""
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    if isinstance(value, str):
+        slots = parse_slot_spec(value)
+    elif isinstance(value, list):
+        slots = []
+        for item in value:
+            if not isinstance(item, dict):
+                raise ValueError('时间段应为对象')
+            try:
+                weekday = int(item.get('weekday'))
+            except (TypeError, ValueError):
+                raise ValueError(f'星期格式错误：{item.get("weekday")}') from None
+            slots.append((weekday, _time(item.get('start_time')), _time(item.get('end_time')),
+                          _boolean(item.get('is_available', True), '是否可预约')))
+    else:
+        raise ValueError('时间段格式错误')
+
+    grid = {}
+    for weekday, start, end, available in slots:
+        if weekday not in WEEKDAYS:
+            raise ValueError(f'星期应在 0（周一）到 6（周日）之间：{weekday}')
+        if start >= end:
+            raise ValueError(f'{WEEKDAYS[weekday]} {start:%H:%M} 的结束时间必须晚于开始时间')
+        if (weekday, start) in grid:
+            raise ValueError(f'{WEEKDAYS[weekday]} {start:%H:%M} 的时间段重复')
+        grid[(weekday, start)] = (end, available)
+    return grid
+
+
+def clean_record(record, templates=None):
+    """校验并规范化一条记录，返回 (名称, 实验室字段, 时间段)，有误时抛出 ValueError
+
+    templates 为 {模板名称: 模板 ID}，记录中给出了 schedule_template 时用于解析。
+    """
+    if not isinstance(record, dict):
+        raise ValueError('不是有效的 JSON 对象')
+    name = _text(record, 'name', 100, required=True, label='实验室名称')
+    category = _text(record, 'category') or 'other'
+    category = CATEGORY_CODES.get(category, category)
+    if category not in CATEGORY_LABELS:
+        raise ValueError(f'未知的分类“{category}”（可用：{"、".join(CATEGORY_LABELS)}）')
+    try:
+        capacity = int(str(record.get('capacity')).strip())
+    except ValueError:
+        capacity = 0
+    if capacity < 1:
+        raise ValueError('容量应为正整数')
+    fields = {
+        'category': category,
+        'location': _text(record, 'location', 200, required=True, label='位置'),
+        'capacity': capacity,
+        'equipment': _text(record, 'equipment'),
+        'description': _text(record, 'description'),
+    }
+    # 留空时不修改已有实验室的状态，新实验室按模型默认值可用
+    if _text(record, 'is_active'):
+        fields['is_active'] = _boolean(record.get('is_active'), '是否可用')
+    template = _text(record, 'schedule_template', 100)
+    if template:
+        if template not in (templates or {}):
+            raise ValueError(f'未知的时间表模板“{template}”')
+        fields['schedule_template_id'] = templates[template]
+    return name, fields, _clean_slots(record.get('time_slots'))
+
+
+def _slot_diff(created, updated, deleted):
+    parts = [f'{label}{count}' for label, count in (('+', created), ('~', updated), ('-', deleted)) if count]
+    return f"时间段 {' '.join(parts)}" if parts else None
+
+
+def _write_slots(to_create, to_update, to_delete):
+    """用 executemany 写入时间段（时间段没有信号和自动字段，逐个构造模型实例的开销远大于写入本身）"""
+    table = TimeSlot._meta.db_table
+    adapt = connection.ops.adapt_timefield_value
+    with connection.cursor() as cursor:
+        if to_delete:
+            cursor.executemany(f'DELETE FROM {table} WHERE id = %s', to_delete)
+        if to_update:
+            cursor.executemany(
+                f'UPDATE {table} SET end_time = %s, is_available = %s WHERE id = %s',
+                [(adapt(end), available, pk) for end, available, pk in to_update],
+            )
+        if to_create:
+            cursor.executemany(
+                f'INSERT INTO {table} (laboratory_id, weekday, start_time, end_time, is_available) VALUES (%s, %s, %s, %s, %s)',
+                [(lab_id, weekday, adapt(start), adapt(end), available) for lab_id, weekday, start, end, available in to_create],
+            )
+
+
+def _display(field, value, template_names):
+    if field == 'schedule_template_id':
+        return template_names.get(value, '无')
+    return value
+
+
+def _import_batch(batch, report, now, template_names):
+    """写入一批 (行号, 名称, 实验室字段, 时间段)，返回开放时间有变化的已有实验室 ID"""
+    existing = {}
+    for lab in Laboratory.objects.filter(name__in=[name for _number, name, _fields, _slots in batch]).order_by('id'):
+        existing.setdefault(lab.name, []).append(lab)
+
+    new, changed, grids = [], [], []
+    schedule_changed = set()
+    for number, name, fields, slots in batch:
+        labs = existing.get(name, [])
+        if len(labs) > 1:
+            report.errors.append((number, f'数据库中有 {len(labs)} 个名为“{name}”的实验室，无法确定更新哪一个'))
+            continue
+        if labs:
+            lab = labs[0]
+            details = [
+                f'{Laboratory._meta.get_field(field).verbose_name}: '
+                f'{_display(field, getattr(lab, field), template_names)} → {_display(field, value, template_names)}'
+                for field, value in fields.items() if getattr(lab, field) != value
+            ]
+            if fields.get('schedule_template_id', lab.schedule_template_id) != lab.schedule_template_id:
+                schedule_changed.add(lab.pk)
+            if details:
+                for field, value in fields.items():
+                    setattr(lab, field, value)
+                lab.updated_at = now
+                changed.append(lab)
+            grids.append((lab, name, slots, 'updated', details))
+        else:
+            lab = Laboratory(name=name, **fields)
+            new.append(lab)
+            grids.append((lab, name, slots, 'created', []))
+    if report.errors:
+        return set()
+
+    Laboratory.objects.bulk_create(new)
+    Laboratory.objects.bulk_update(changed, [*LAB_FIELDS, 'schedule_template', 'updated_at'])
+    index_laboratories(new + changed)
+
+    # 时间段：以文件为准，按 (星期, 开始时间) 对比
+    current = {}
+    rows = TimeSlot.objects.filter(
+        laboratory_id__in=[lab.pk for lab, _name, slots, _action, _details in grids if slots is not None]
+    ).values_list('id', 'laboratory_id', 'weekday', 'start_time', 'end_time', 'is_available')
+    for pk, lab_id, weekday, start, end, available in rows:
+        current.setdefault(lab_id, {})[(weekday, start)] = (pk, end, available)
+    to_create, to_update, to_delete = [], [], []
+    for lab, name, slots, action, details in grids:
+        counts = [0, 0, 0]
+        if slots is not None:
+            old = current.get(lab.pk, {})
+            for (weekday, start), (end, available) in slots.items():
+                slot = old.get((weekday, start))
+                if slot is None:
+                    to_create.append((lab.pk, weekday, start, end, available))
+                    counts[0] += 1
+                elif slot[1:] != (end, available):
+                    to_update.append((end, available, slot[0]))
+                    counts[1] += 1
+                else:
+                    report.timeslots['unchanged'] += 1
+            removed = [(slot[0],) for key, slot in old.items() if key not in slots]
+            to_delete.extend(removed)
+            counts[2] = len(removed)
+        if any(counts):
+            # 新实验室的 schedule_updated_at 默认就是当前时间
+            if action == 'updated':
+                schedule_changed.add(lab.pk)
+            slot_details = _slot_diff(*counts)
+            details = details + [slot_details] if action == 'updated' else [slot_details]
+        if action == 'created' or details:
+            report.laboratories[action] += 1
+            report.changes.append((name, action, details))
+        else:
+            report.laboratories['unchanged'] += 1
+        for key, count in zip(('created', 'updated', 'deleted'), counts):
+            report.timeslots[key] += count
+
+    _write_slots(to_create, to_update, to_delete)
+    return schedule_changed
+
+
+def import_catalogue(records, dry_run=False, batch_size=IMPORT_BATCH_SIZE, progress=None):
+    """导入 (行号, 记录) 序列，返回 ImportReport；有记录未通过校验时抛出 CatalogueImportError
+
+    dry_run 为 True 时只计算差异，不保存任何修改。
+    """
+    report = ImportReport(dry_run=dry_run)
+    now = timezone.now()
+    templates = dict(ScheduleTemplate.objects.values_list('name', 'id'))
+    template_names = {pk: name for name, pk in templates.items()}
+    seen = set()
+    schedule_changed = set()
+    total = 0
+
+    with transaction.atomic():
+        batch = []
+        for number, record in records:
+            try:
+                name, fields, slots = clean_record(record, templates)
+                if name in seen:
+                    raise ValueError(f'实验室“{name}”重复出现')
+            except ValueError as exc:
+                report.errors.append((number, str(exc)))
+                continue
+            seen.add(name)
+            batch.append((number, name, fields, slots))
+            if len(batch) >= batch_size and not report.errors:
+                schedule_changed |= _import_batch(batch, report, now, template_names)
+                total += len(batch)
+                if progress:
+                    progress(f'实验室：{total}')
+                batch = []
+            elif report.errors:
+                # 已有错误时不再写入，只继续校验
+                batch = []
+        if batch and not report.errors:
+            schedule_changed |= _import_batch(batch, report, now, template_names)
+        if report.errors:
+            raise CatalogueImportError(report)
+
+        touch_laboratory_schedule(schedule_changed)
+        schedule_table.discard()
+        if dry_run:
+            transaction.set_rollback(True)
+        else:
+            # bulk 写入不触发信号，提交后统一使缓存失效
+            transaction.on_commit(invalidate_catalogue)
+    return report
@@ -0,0 +1,58 @@
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from reservations.benchmark import measure_handlers
+
+
+class Command(BaseCommand):
+    help = '在临时文件数据库上对比 WSGI 与 ASGI 处理可用性检查和实验室列表接口的并发吞吐量'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=32, help='并发请求数（WSGI 线程数 / ASGI 协程数）')
+        parser.add_argument('--duration', type=float, default=5.0, help='每种处理方式的测试时长（秒）')
+        parser.add_argument('--seed', type=int, default=0, help='随机种子')
+        parser.add_argument('--output', help='报告输出文件（默认输出到标准输出）')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['duration'] <= 0:
+            raise CommandError('参数无效：并发数和时长需大于 0')
+
+        settings_dict = connection.settings_dict
+        saved = {key: settings_dict.get(key) for key in ('NAME', 'TEST')}
+        setup_test_environment(debug=False)
+        try:
+            with tempfile.TemporaryDirectory() as workdir:
+                # 多个线程共享数据库，使用临时文件而不是内存数据库
+                settings_dict['TEST'] = {**(saved['TEST'] or {}), 'NAME': os.path.join(workdir, 'handlers.sqlite3')}
+                old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+                try:
+                    # 按生产配置测量：关闭 SQL 统计中间件，查询超预算只记日志
+                    with override_settings(SQL_INSTRUMENTATION_ENABLED=False, QUERY_BUDGET_STRICT=False):
+                        report = measure_handlers(
+                            concurrency=options['concurrency'], duration=options['duration'], seed=options['seed'],
+                        )
+                finally:
+                    connection.creation.destroy_test_db(old_name, verbosity=0)
+        finally:
+            settings_dict.update(saved)
+            settings.DATABASES[connection.alias]['NAME'] = saved['NAME']
+            teardown_test_environment()
+
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
+        for name in ('wsgi', 'asgi'):
+            result = report[name]
+            self.stderr.write(
+                f"{name}: {result['requests_per_s']} 请求/s，p50 {result['p50_ms']}ms，"
+                f"p95 {result['p95_ms']}ms，错误 {result['errors']}"
+            )
@@ -0,0 +1,75 @@
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from reservations.benchmark import SQLITE_BASELINE, measure_concurrency
+from reservations.sqlite_tuning import get_pragmas
+
+
+class Command(BaseCommand):
+    help = '在临时文件数据库上对比 SQLite 默认配置与调优配置的并发读写吞吐量'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='并发线程数（模拟工作进程数）')
+        parser.add_argument('--duration', type=float, default=5.0, help='每组配置的测试时长（秒）')
+        parser.add_argument('--write-ratio', type=float, default=0.2, help='写操作所占比例')
+        parser.add_argument('--seed', type=int, default=0, help='随机种子')
+        parser.add_argument('--output', help='报告输出文件（默认输出到标准输出）')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('该命令只适用于 SQLite 数据库')
+        if options['threads'] < 1 or options['duration'] <= 0 or not 0 <= options['write_ratio'] <= 1:
+            raise CommandError('参数无效：线程数需大于 0，时长需大于 0，写比例需在 0 到 1 之间')
+
+        tuned = {
+            'CONN_MAX_AGE': connection.settings_dict['CONN_MAX_AGE'],
+            'OPTIONS': dict(connection.settings_dict['OPTIONS']),
+            'PRAGMAS': get_pragmas(),
+        }
+        report = {}
+        with tempfile.TemporaryDirectory() as workdir:
+            for name, config in (('baseline', SQLITE_BASELINE), ('tuned', tuned)):
+                report[name] = self.run_config(name, config, workdir, options)
+
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
+        for name, result in report.items():
+            self.stderr.write(
+                f"{name}: 读 {result['reads_per_s']}/s，写 {result['writes_per_s']}/s，"
+                f"写 p95 {result['write_p95_ms']}ms，锁错误 {result['errors']}"
+            )
+
+    def run_config(self, name, config, workdir, options):
+        settings_dict = connection.settings_dict
+        saved = {key: settings_dict.get(key) for key in ('NAME', 'CONN_MAX_AGE', 'OPTIONS', 'TEST')}
+        # 各线程的连接共享同一个 settings_dict，修改后对所有线程生效
+        settings_dict.update({
+            'CONN_MAX_AGE': config['CONN_MAX_AGE'],
+            'OPTIONS': config['OPTIONS'],
+            'TEST': {**(saved['TEST'] or {}), 'NAME': os.path.join(workdir, f'{name}.sqlite3')},
+        })
+        try:
+            with override_settings(SQLITE_PRAGMAS=config['PRAGMAS']):
+                old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+                try:
+                    if options['verbosity'] > 1:
+                        self.stderr.write(f'运行 {name} 配置……')
+                    return measure_concurrency(
+                        threads=options['threads'], duration=options['duration'],
+                        write_ratio=options['write_ratio'], seed=options['seed'],
+                    )
+                finally:
+                    connection.creation.destroy_test_db(old_name, verbosity=0)
+        finally:
+            settings_dict.update(saved)
+            settings.DATABASES[connection.alias]['NAME'] = saved['NAME']
@@ -0,0 +1,63 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from reservations.benchmark import DEFAULT_SCALES, compare_reports, parse_scales, run_benchmark
+
+
+class Command(BaseCommand):
+    help = '在一次性测试数据库中按多个数据规模测量所有页面和接口的性能，输出 JSON 报告'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scales', default=','.join(':'.join(map(str, scale)) for scale in DEFAULT_SCALES),
+            help='逐级递增的数据规模，格式为 实验室数:用户数:预约数，多个用逗号分隔',
+        )
+        parser.add_argument('--repeat', type=int, default=20, help='每个路由的请求次数')
+        parser.add_argument('--seed', type=int, default=0, help='生成数据的随机种子')
+        parser.add_argument('--output', help='报告输出文件（默认输出到标准输出）')
+        parser.add_argument('--compare', help='与之前的报告对比 p50 响应时间和查询数')
+
+    def handle(self, *args, **options):
+        try:
+            scales = parse_scales(options['scales'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if options['repeat'] < 1:
+            raise CommandError('--repeat 必须大于 0')
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare'], encoding='utf-8') as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'无法读取对比报告：{exc}')
+
+        progress = self.stderr.write if options['verbosity'] > 1 else None
+        setup_test_environment(debug=False)
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # 按生产配置测量：关闭 SQL 统计中间件，查询超预算只记日志
+            with override_settings(SQL_INSTRUMENTATION_ENABLED=False, QUERY_BUDGET_STRICT=False):
+                report = run_benchmark(scales, repeat=options['repeat'], seed=options['seed'], progress=progress)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f"报告已写入 {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+        if baseline is not None:
+            for scale, name, old, new, change, old_queries, new_queries in compare_reports(baseline, report):
+                self.stderr.write(
+                    f"{'/'.join(map(str, scale))} {name}: p50 {old}ms -> {new}ms ({change:+.1f}%), "
+                    f"查询 {old_queries} -> {new_queries}"
+                )
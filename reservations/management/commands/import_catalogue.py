@@ -0,0 +1,53 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reservations.importing import (
+    IMPORT_BATCH_SIZE, CatalogueImportError, catalogue_format, import_catalogue, read_catalogue,
+)
+
+
+class Command(BaseCommand):
+    help = '从 CSV / JSON / JSON Lines 文件批量导入实验室及其开放时间段（按名称新增或更新）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='目录文件路径，- 表示从标准输入读取（需指定 --format）')
+        parser.add_argument('--format', choices=['csv', 'json', 'jsonl'], help='文件格式，默认按扩展名判断')
+        parser.add_argument('--dry-run', action='store_true', help='只输出差异，不保存修改')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help='每批写入的实验室数')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size 必须大于 0')
+        if path == '-' and not options['format']:
+            raise CommandError('从标准输入读取时需要指定 --format')
+        try:
+            fmt = options['format'] or catalogue_format(path)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        verbosity = options['verbosity']
+        progress = self.stdout.write if verbosity > 1 else None
+        try:
+            stream = sys.stdin if path == '-' else open(path, encoding='utf-8-sig', newline='')
+        except OSError as exc:
+            raise CommandError(f'无法读取文件：{exc}')
+        try:
+            report = import_catalogue(
+                read_catalogue(stream, fmt), dry_run=options['dry_run'],
+                batch_size=options['batch_size'], progress=progress,
+            )
+        except CatalogueImportError as exc:
+            for number, message in exc.report.errors:
+                self.stderr.write(f'第 {number} 条：{message}')
+            raise CommandError(str(exc))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        if verbosity:
+            for line in report.diff_lines():
+                self.stdout.write(line)
+            prefix = '（试运行，未保存）' if report.dry_run else ''
+            self.stdout.write(self.style.SUCCESS(f'{prefix}{report.summary()}'))
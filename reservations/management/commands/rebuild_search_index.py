@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from reservations.models import Laboratory
+from reservations.search import rebuild_search_index, search_index_available
+
+
+class Command(BaseCommand):
+    help = '重建实验室全文检索索引（批量导入实验室后使用）'
+
+    def handle(self, *args, **options):
+        if not search_index_available():
+            self.stdout.write(self.style.WARNING('当前数据库不支持全文索引，已跳过。'))
+            return
+
+        laboratories = Laboratory.objects.only('id', 'name', 'location', 'description', 'equipment')
+        with transaction.atomic():
+            rebuild_search_index(laboratories.iterator(chunk_size=2000))
+        self.stdout.write(self.style.SUCCESS(f'已重建 {laboratories.count()} 个实验室的全文索引。'))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from reservations.seeding import seed
+
+
+class Command(BaseCommand):
+    help = '批量补齐示例实验室、标准时间表模板和测试用户（已存在的记录保持不变）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all-labs', action='store_true',
+            help='让数据库中所有未引用模板的实验室引用标准时间表，而不只是示例实验室',
+        )
+        parser.add_argument('--progress', action='store_true', help='按批次输出写入进度')
+
+    def handle(self, *args, **options):
+        # -v 0 为静默模式
+        verbosity = options['verbosity']
+        progress = self.stdout.write if options['progress'] and verbosity else None
+        created = seed(all_laboratories=options['all_labs'], progress=progress)
+        if not verbosity:
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"示例数据创建完成！新增 {created['laboratories']} 个实验室、{created['timeslots']} 个模板时间段、"
+            f"{created['scheduled']} 个实验室引用标准时间表、"
+            f"{created['users']} 个用户、{created['profiles']} 份用户资料。"
+        ))
+        self.stdout.write('\n登录信息:')
+        self.stdout.write('管理员账户: admin / admin123')
+        self.stdout.write('学生账户1: student1 / student123')
+        self.stdout.write('学生账户2: student2 / student123')
+        self.stdout.write('教师账户: teacher1 / teacher123')
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from reservations.services import SWEEP_BATCH_SIZE, sweep_reservations
+
+
+class Command(BaseCommand):
+    help = '把已结束的已批准预约标记为已完成，已结束仍未审核的预约标记为已取消（可由 cron 定期执行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=SWEEP_BATCH_SIZE, help='每个事务处理的预约数')
+        parser.add_argument('--dry-run', action='store_true', help='只统计需要处理的预约数，不修改')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size 必须大于 0')
+        counts = sweep_reservations(batch_size=options['batch_size'], dry_run=options['dry_run'])
+        if options['verbosity']:
+            prefix = '（试运行，未修改）' if options['dry_run'] else ''
+            self.stdout.write(self.style.SUCCESS(
+                f"{prefix}已完成 {counts['approved']} 条已批准的预约，超时取消 {counts['pending']} 条未审核的预约。"
+            ))
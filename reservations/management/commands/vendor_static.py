@@ -0,0 +1,36 @@
+import os
+from urllib.error import URLError
+from urllib.request import urlopen
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from reservations.staticfiles import VENDOR_DIR, VENDOR_PACKAGES
+
+
+class Command(BaseCommand):
+    help = '下载固定版本的 Bootstrap 和 Font Awesome 到应用的静态文件目录（下载后随代码提交，页面不再依赖 CDN）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='重新下载已存在的文件')
+
+    def handle(self, *args, **options):
+        root = os.path.join(apps.get_app_config('reservations').path, 'static', *VENDOR_DIR.split('/'))
+        downloaded = 0
+        for package, (cdn_root, files) in VENDOR_PACKAGES.items():
+            for name in files:
+                target = os.path.join(root, package, *name.split('/'))
+                if os.path.exists(target) and not options['force']:
+                    continue
+                try:
+                    with urlopen(cdn_root + name, timeout=30) as response:
+                        content = response.read()
+                except (URLError, OSError) as exc:
+                    raise CommandError(f'下载 {cdn_root + name} 失败：{exc}')
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, 'wb') as f:
+                    f.write(content)
+                downloaded += 1
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'{package}/{name}：{len(content)} 字节')
+        self.stdout.write(self.style.SUCCESS(f'已下载 {downloaded} 个文件到 {root}'))
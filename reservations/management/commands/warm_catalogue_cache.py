@@ -0,0 +1,20 @@
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from reservations.catalogue import warm_catalogue
+
+
+class Command(BaseCommand):
+    help = '预热实验室目录缓存（部署后执行，需配合共享缓存后端使用）'
+
+    def handle(self, *args, **options):
+        # 进程内缓存只对本命令进程可见，预热对 Web 工作进程没有作用
+        if isinstance(caches['default'], LocMemCache):
+            self.stderr.write(self.style.WARNING(
+                '默认缓存后端为 LocMemCache（每个进程独立），预热不会对 Web 工作进程生效，已跳过。'
+                '请在 CACHES 中配置 Redis、Memcached 等共享缓存后再执行。'
+            ))
+            return
+        count = warm_catalogue()
+        self.stdout.write(self.style.SUCCESS(f'已缓存 {count} 个可用实验室的目录数据。'))
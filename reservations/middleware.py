@@ -0,0 +1,232 @@
+"""
+SQL 查询统计中间件
+
+通过 connection.execute_wrapper 记录每个请求的查询次数、数据库总耗时和最慢的若干条语句
+（连同触发它们的项目代码位置），以 Server-Timing / X-DB-Queries 响应头返回，
+请求总耗时超过阈值时写入结构化的慢请求日志（logger: reservations.sql）。
+
+相关配置：
+- SQL_INSTRUMENTATION_ENABLED：是否启用，关闭时中间件在启动阶段即被移出调用链，无任何开销；
+- SQL_SLOW_REQUEST_MS：慢请求阈值（毫秒）；
+- SQL_SLOWEST_QUERIES：慢请求日志中保留的最慢语句条数。
+
+AsyncURLConfMiddleware 让 ASGI 请求改用 settings.ASGI_URLCONF 解析 URL，
+可用性检查和实验室列表接口由此路由到异步视图；WSGI 请求不受影响。
+
+StaticAssetsMiddleware 在生产环境（DEBUG 关闭）直接提供 collectstatic 生成的静态文件，
+ResponseCompressionMiddleware 对动态生成的 HTML / JSON 响应做 gzip 压缩。
+"""
+import heapq
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import ExitStack
+from urllib.parse import urlsplit
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connections
+from django.middleware.gzip import GZipMiddleware
+
+from .staticfiles import serve_static_asset
+
+logger = logging.getLogger('reservations.sql')
+
+_PROJECT_ROOT = str(settings.BASE_DIR)
+_SKIPPED_PATHS = (os.path.dirname(__file__) + os.sep + 'middleware.py',)
+
+
+def _call_site():
+    """返回触发查询的最内层项目代码位置"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (
+            filename.startswith(_PROJECT_ROOT)
+            and 'site-packages' not in filename
+            and filename not in _SKIPPED_PATHS
+        ):
+            return f'{os.path.relpath(filename, _PROJECT_ROOT)}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+
+class QueryRecorder:
+    """单个请求的查询记录"""
+
+    def __init__(self, keep):
+        self.keep = keep
+        self.count = 0
+        self.total = 0.0
+        self._slowest = []
+        self._seq = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.total += duration
+            # 只有进入最慢列表的语句才采集调用位置
+            if len(self._slowest) < self.keep or duration > self._slowest[0][0]:
+                self._seq += 1
+                entry = (duration, self._seq, sql, _call_site())
+                if len(self._slowest) < self.keep:
+                    heapq.heappush(self._slowest, entry)
+                else:
+                    heapq.heapreplace(self._slowest, entry)
+
+    @property
+    def slowest(self):
+        return [
+            {'ms': round(duration * 1000, 2), 'sql': sql, 'call_site': call_site}
+            for duration, _seq, sql, call_site in sorted(self._slowest, reverse=True)
+        ]
+
+
+class QueryInstrumentationMiddleware:
+    """统计每个请求的 SQL 查询次数与耗时"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SQL_INSTRUMENTATION_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.slow_request_ms = getattr(settings, 'SQL_SLOW_REQUEST_MS', 500)
+        self.keep = getattr(settings, 'SQL_SLOWEST_QUERIES', 5)
+
+    @staticmethod
+    def instrument(stack, recorder):
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(recorder))
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        recorder = QueryRecorder(self.keep)
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            self.instrument(stack, recorder)
+            response = self.get_response(request)
+        return self.report(request, response, recorder, started)
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder(self.keep)
+        started = time.perf_counter()
+        # 数据库连接按线程区分，在同步视图和异步 ORM 调用共用的线程中挂载 wrapper
+        stack = ExitStack()
+        await sync_to_async(self.instrument)(stack, recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.report(request, response, recorder, started)
+
+    def report(self, request, response, recorder, started):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        db_ms = recorder.total * 1000
+
+        response['X-DB-Queries'] = str(recorder.count)
+        timing = f'db;dur={db_ms:.1f};desc="{recorder.count} queries", app;dur={elapsed_ms:.1f}'
+        if response.has_header('Server-Timing'):
+            timing = f"{response['Server-Timing']}, {timing}"
+        response['Server-Timing'] = timing
+
+        if elapsed_ms >= self.slow_request_ms:
+            resolver_match = getattr(request, 'resolver_match', None)
+            logger.warning(json.dumps({
+                'event': 'slow_request',
+                'method': request.method,
+                'path': request.path,
+                'view': resolver_match.view_name if resolver_match else None,
+                'status': response.status_code,
+                'duration_ms': round(elapsed_ms, 1),
+                'db_ms': round(db_ms, 1),
+                'queries': recorder.count,
+                'slowest': recorder.slowest,
+            }, ensure_ascii=False))
+        return response
+
+
+class AsyncURLConfMiddleware:
+    """ASGI 请求使用 ASGI_URLCONF 中的路由"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.urlconf = getattr(settings, 'ASGI_URLCONF', None)
+        if not self.urlconf:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        # 按请求类型判断，后面的中间件是否都支持异步不影响路由选择
+        if isinstance(request, ASGIRequest):
+            request.urlconf = self.urlconf
+        return self.get_response(request)
+
+
+class StaticAssetsMiddleware:
+    """提供 STATIC_ROOT 中的静态文件（预压缩版本、带哈希文件名长期缓存）"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SERVE_STATIC_ASSETS', not settings.DEBUG) or not settings.STATIC_ROOT:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.prefix = urlsplit(settings.STATIC_URL).path
+        self.max_age = getattr(settings, 'STATIC_CACHE_MAX_AGE', 365 * 24 * 3600)
+        # manifest 中的带哈希文件名，内容变化时文件名随之变化，可以长期缓存
+        self.hashed_names = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+    def serve(self, request):
+        if request.method in ('GET', 'HEAD') and request.path.startswith(self.prefix):
+            name = request.path[len(self.prefix):]
+            return serve_static_asset(request, settings.STATIC_ROOT, name, name in self.hashed_names, self.max_age)
+        return None
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.serve(request)
+        return response if response is not None else self.get_response(request)
+
+    async def __acall__(self, request):
+        response = self.serve(request)
+        return response if response is not None else await self.get_response(request)
+
+
+class ResponseCompressionMiddleware(GZipMiddleware):
+    """gzip 压缩文本类响应（含流式导出），事件流除外（gzip 会缓冲数据，推迟事件送达）"""
+
+    COMPRESSIBLE_TYPES = {
+        'text/html', 'application/json', 'text/plain', 'text/css', 'text/javascript', 'application/javascript',
+        'text/csv', 'application/x-ndjson',
+    }
+
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        if content_type not in self.COMPRESSIBLE_TYPES:
+            return response
+        return super().process_response(request, response)
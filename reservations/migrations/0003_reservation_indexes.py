@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0002_alter_laboratory_options_laboratory_category'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['laboratory', 'date', 'status', 'start_time', 'end_time'], name='resv_lab_date_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'approved'])), fields=['laboratory', 'date', 'start_time', 'end_time'], name='resv_active_slot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['user', '-created_at'], name='resv_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['status', '-created_at'], name='resv_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+from django.db import migrations
+
+ACTIVE_CONFLICT = """
+    SELECT RAISE(ABORT, 'reservation overlaps an active reservation')
+    WHERE EXISTS (
+        SELECT 1 FROM reservations_reservation AS r
+        WHERE r.laboratory_id = NEW.laboratory_id
+          AND r.date = NEW.date
+          AND r.status IN ('pending', 'approved')
+          AND r.start_time < NEW.end_time
+          AND r.end_time > NEW.start_time
+          AND r.id IS NOT NEW.id
+    );
+"""
+
+CREATE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS reservations_reservation_overlap_insert
+    BEFORE INSERT ON reservations_reservation
+    WHEN NEW.status IN ('pending', 'approved')
+    BEGIN {ACTIVE_CONFLICT} END;
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS reservations_reservation_overlap_update
+    BEFORE UPDATE OF laboratory_id, date, start_time, end_time, status ON reservations_reservation
+    WHEN NEW.status IN ('pending', 'approved')
+    BEGIN {ACTIVE_CONFLICT} END;
+    """,
+]
+
+DROP_TRIGGERS = [
+    'DROP TRIGGER IF EXISTS reservations_reservation_overlap_insert;',
+    'DROP TRIGGER IF EXISTS reservations_reservation_overlap_update;',
+]
+
+
+def create_triggers(apps, schema_editor):
+    # 其他数据库由 services.book_reservation 中的行锁保证
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in CREATE_TRIGGERS:
+            schema_editor.execute(sql)
+
+
+def drop_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in DROP_TRIGGERS:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0003_reservation_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
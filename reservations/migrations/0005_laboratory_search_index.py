@@ -0,0 +1,60 @@
+import re
+
+from django.db import migrations
+
+# 表结构和分词规则按本迁移创建时的版本固定，不随 reservations.search 的后续修改变化
+FTS_TABLE = 'reservations_laboratory_fts'
+FTS_COLUMNS = ('name', 'location', 'description', 'equipment')
+
+_CJK_RUN = re.compile(r'([㐀-䶿一-鿿豈-﫿]+)')
+_WORD = re.compile(r'\w+')
+
+
+def segment(text):
+    """中文二元切分，其余按词保留"""
+    tokens = []
+    for i, part in enumerate(_CJK_RUN.split(text or '')):
+        if i % 2:
+            tokens.extend(part[j:j + 2] for j in range(len(part) - 1))
+            tokens.append(part[-1])
+        else:
+            tokens.extend(_WORD.findall(part))
+    return ' '.join(tokens)
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pragma_compile_options WHERE compile_options = 'ENABLE_FTS5'")
+        if cursor.fetchone() is None:
+            return
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            f"USING fts5({', '.join(FTS_COLUMNS)}, tokenize='unicode61')"
+        )
+        Laboratory = apps.get_model('reservations', 'Laboratory')
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) VALUES (%s, %s, %s, %s, %s)",
+            [
+                [laboratory.pk] + [segment(getattr(laboratory, column)) for column in FTS_COLUMNS]
+                for laboratory in Laboratory.objects.all()
+            ],
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0004_reservation_overlap_guard'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0005_laboratory_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='reservation',
+            name='resv_user_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='reservation',
+            name='resv_status_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='resv_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='resv_status_created_idx'),
+        ),
+    ]
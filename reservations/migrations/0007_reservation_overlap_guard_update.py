@@ -0,0 +1,61 @@
+from django.db import migrations
+
+ACTIVE_CONFLICT = """
+    SELECT RAISE(ABORT, 'reservation overlaps an active reservation')
+    WHERE EXISTS (
+        SELECT 1 FROM reservations_reservation AS r
+        WHERE r.laboratory_id = NEW.laboratory_id
+          AND r.date = NEW.date
+          AND r.status IN ('pending', 'approved')
+          AND r.start_time < NEW.end_time
+          AND r.end_time > NEW.start_time
+          AND r.id IS NOT NEW.id
+    );
+"""
+
+# 只有记录新进入有效状态，或有效记录的实验室/时间发生变化时才需要检查；
+# pending -> approved 等有效状态之间的切换不会产生新的重叠
+UPDATE_TRIGGER = f"""
+    CREATE TRIGGER reservations_reservation_overlap_update
+    BEFORE UPDATE OF laboratory_id, date, start_time, end_time, status ON reservations_reservation
+    WHEN NEW.status IN ('pending', 'approved') AND (
+        OLD.status NOT IN ('pending', 'approved')
+        OR NEW.laboratory_id IS NOT OLD.laboratory_id
+        OR NEW.date IS NOT OLD.date
+        OR NEW.start_time IS NOT OLD.start_time
+        OR NEW.end_time IS NOT OLD.end_time
+    )
+    BEGIN {ACTIVE_CONFLICT} END;
+"""
+
+PREVIOUS_UPDATE_TRIGGER = f"""
+    CREATE TRIGGER reservations_reservation_overlap_update
+    BEFORE UPDATE OF laboratory_id, date, start_time, end_time, status ON reservations_reservation
+    WHEN NEW.status IN ('pending', 'approved')
+    BEGIN {ACTIVE_CONFLICT} END;
+"""
+
+DROP_UPDATE_TRIGGER = 'DROP TRIGGER IF EXISTS reservations_reservation_overlap_update;'
+
+
+def narrow_update_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(DROP_UPDATE_TRIGGER)
+        schema_editor.execute(UPDATE_TRIGGER)
+
+
+def restore_update_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(DROP_UPDATE_TRIGGER)
+        schema_editor.execute(PREVIOUS_UPDATE_TRIGGER)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0006_reservation_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(narrow_update_trigger, restore_update_trigger),
+    ]
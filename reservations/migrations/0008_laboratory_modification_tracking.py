@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0007_reservation_overlap_guard_update'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='laboratory',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='更新时间'),
+        ),
+        migrations.AddField(
+            model_name='laboratory',
+            name='schedule_updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='排期更新时间'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0008_laboratory_modification_tracking'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservationSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField(verbose_name='首次日期')),
+                ('end_date', models.DateField(verbose_name='截止日期')),
+                ('interval_weeks', models.PositiveSmallIntegerField(choices=[(1, '每周'), (2, '每两周')], default=1, verbose_name='重复间隔')),
+                ('start_time', models.TimeField(verbose_name='开始时间')),
+                ('end_time', models.TimeField(verbose_name='结束时间')),
+                ('purpose', models.TextField(verbose_name='使用目的')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('laboratory', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='reservations.laboratory', verbose_name='实验室')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='预约用户')),
+            ],
+            options={
+                'verbose_name': '重复预约',
+                'verbose_name_plural': '重复预约',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='series',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reservations', to='reservations.reservationseries', verbose_name='所属重复预约'),
+        ),
+    ]
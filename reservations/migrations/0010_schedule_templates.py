@@ -0,0 +1,97 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def extract_templates(apps, schema_editor):
+    """时间段完全相同（且都可预约）的实验室合并为一个模板，删除各自的时间段"""
+    Laboratory = apps.get_model('reservations', 'Laboratory')
+    TimeSlot = apps.get_model('reservations', 'TimeSlot')
+    ScheduleTemplate = apps.get_model('reservations', 'ScheduleTemplate')
+    ScheduleTemplateSlot = apps.get_model('reservations', 'ScheduleTemplateSlot')
+
+    slots = {}
+    for lab_id, weekday, start, end, available in TimeSlot.objects.order_by().values_list(
+        'laboratory_id', 'weekday', 'start_time', 'end_time', 'is_available'
+    ):
+        slots.setdefault(lab_id, set()).add((weekday, start, end, available))
+    groups = {}
+    for lab_id, lab_slots in slots.items():
+        if all(available for *_slot, available in lab_slots):
+            groups.setdefault(frozenset(slot[:3] for slot in lab_slots), []).append(lab_id)
+    shared = sorted((group for group in groups.items() if len(group[1]) > 1), key=lambda group: -len(group[1]))
+
+    for number, (signature, lab_ids) in enumerate(shared, 1):
+        template = ScheduleTemplate.objects.create(name='标准时间表' if number == 1 else f'时间表 {number}')
+        ScheduleTemplateSlot.objects.bulk_create([
+            ScheduleTemplateSlot(template=template, weekday=weekday, start_time=start, end_time=end)
+            for weekday, start, end in sorted(signature)
+        ])
+        for start in range(0, len(lab_ids), 500):
+            batch = lab_ids[start:start + 500]
+            Laboratory.objects.filter(pk__in=batch).update(schedule_template=template)
+            TimeSlot.objects.filter(laboratory_id__in=batch).delete()
+
+
+def expand_templates(apps, schema_editor):
+    """把模板中的时间段写回各实验室（实验室已有的同一时段保持不变）"""
+    Laboratory = apps.get_model('reservations', 'Laboratory')
+    TimeSlot = apps.get_model('reservations', 'TimeSlot')
+    ScheduleTemplateSlot = apps.get_model('reservations', 'ScheduleTemplateSlot')
+
+    template_slots = {}
+    for template_id, weekday, start, end in ScheduleTemplateSlot.objects.order_by().values_list(
+        'template_id', 'weekday', 'start_time', 'end_time'
+    ):
+        template_slots.setdefault(template_id, []).append((weekday, start, end))
+    for lab_id, template_id in Laboratory.objects.filter(schedule_template__isnull=False).values_list('id', 'schedule_template_id'):
+        TimeSlot.objects.bulk_create([
+            TimeSlot(laboratory_id=lab_id, weekday=weekday, start_time=start, end_time=end)
+            for weekday, start, end in template_slots.get(template_id, [])
+        ], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0009_reservation_series'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='模板名称')),
+                ('description', models.TextField(blank=True, verbose_name='说明')),
+            ],
+            options={
+                'verbose_name': '时间表模板',
+                'verbose_name_plural': '时间表模板',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='laboratory',
+            name='schedule_template',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='laboratories', to='reservations.scheduletemplate', verbose_name='时间表模板'),
+        ),
+        migrations.CreateModel(
+            name='ScheduleTemplateSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.IntegerField(choices=[(0, '周一'), (1, '周二'), (2, '周三'), (3, '周四'), (4, '周五'), (5, '周六'), (6, '周日')], verbose_name='星期')),
+                ('start_time', models.TimeField(verbose_name='开始时间')),
+                ('end_time', models.TimeField(verbose_name='结束时间')),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slots', to='reservations.scheduletemplate', verbose_name='时间表模板')),
+            ],
+            options={
+                'verbose_name': '模板时间段',
+                'verbose_name_plural': '模板时间段',
+                'ordering': ['template', 'weekday', 'start_time'],
+                'unique_together': {('template', 'weekday', 'start_time')},
+            },
+        ),
+        migrations.RunPython(extract_templates, expand_templates),
+    ]
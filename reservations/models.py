@@ -20,6 +20,32 @@ class Laboratory(models.Model):
         ('medical', '医学'),
         ('other', '其他'),
     ]
+    CATEGORY_ICONS = {
+        'physics': 'fas fa-atom',
+        'chemistry': 'fas fa-flask',
+        'biology': 'fas fa-dna',
+        'computer': 'fas fa-desktop',
+        'engineering': 'fas fa-cogs',
+        'mathematics': 'fas fa-calculator',
+        'electronics': 'fas fa-microchip',
+        'materials': 'fas fa-cube',
+        'environmental': 'fas fa-leaf',
+        'medical': 'fas fa-heartbeat',
+        'other': 'fas fa-microscope',
+    }
+    CATEGORY_COLORS = {
+        'physics': '#6f42c1',      # 紫色
+        'chemistry': '#fd7e14',    # 橙色
+        'biology': '#198754',      # 绿色
+        'computer': '#0d6efd',     # 蓝色
+        'engineering': '#dc3545',  # 红色
+        'mathematics': '#20c997',  # 青色
+        'electronics': '#ffc107',  # 黄色
+        'materials': '#6c757d',    # 灰色
+        'environmental': '#28a745', # 深绿色
+        'medical': '#e83e8c',      # 粉色
+        'other': '#495057',        # 深灰色
+    }
 
     name = models.CharField(max_length=100, verbose_name="实验室名称")
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES, default='other', verbose_name="科目分类")
@@ -28,7 +54,15 @@ class Laboratory(models.Model):
     equipment = models.TextField(verbose_name="设备描述", blank=True)
     description = models.TextField(verbose_name="实验室描述", blank=True)
     is_active = models.BooleanField(default=True, verbose_name="是否可用")
+    # 每周开放时间取自模板，实验室自身的 TimeSlot 作为对模板的覆盖
+    schedule_template = models.ForeignKey(
+        'ScheduleTemplate', on_delete=models.PROTECT, null=True, blank=True,
+        related_name='laboratories', verbose_name="时间表模板",
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+    # 时间段或预约变更时由信号更新，用于详情页的条件请求
+    schedule_updated_at = models.DateTimeField(default=timezone.now, editable=False, verbose_name="排期更新时间")
 
     class Meta:
         verbose_name = "实验室"
@@ -40,41 +74,19 @@ class Laboratory(models.Model):
 
     def get_category_icon(self):
         """根据分类返回对应的图标"""
-        icon_map = {
-            'physics': 'fas fa-atom',
-            'chemistry': 'fas fa-flask',
-            'biology': 'fas fa-dna',
-            'computer': 'fas fa-desktop',
-            'engineering': 'fas fa-cogs',
-            'mathematics': 'fas fa-calculator',
-            'electronics': 'fas fa-microchip',
-            'materials': 'fas fa-cube',
-            'environmental': 'fas fa-leaf',
-            'medical': 'fas fa-heartbeat',
-            'other': 'fas fa-microscope',
-        }
-        return icon_map.get(self.category, 'fas fa-microscope')
+        return self.CATEGORY_ICONS.get(self.category, 'fas fa-microscope')
 
     def get_category_color(self):
         """根据分类返回对应的颜色"""
-        color_map = {
-            'physics': '#6f42c1',      # 紫色
-            'chemistry': '#fd7e14',    # 橙色
-            'biology': '#198754',      # 绿色
-            'computer': '#0d6efd',     # 蓝色
-            'engineering': '#dc3545',  # 红色
-            'mathematics': '#20c997',  # 青色
-            'electronics': '#ffc107',  # 黄色
-            'materials': '#6c757d',    # 灰色
-            'environmental': '#28a745', # 深绿色
-            'medical': '#e83e8c',      # 粉色
-            'other': '#495057',        # 深灰色
-        }
-        return color_map.get(self.category, '#495057')
+        return self.CATEGORY_COLORS.get(self.category, '#495057')
 
 
 class TimeSlot(models.Model):
-    """时间段模型"""
+    """时间段模型
+
+    实验室引用时间表模板时作为覆盖：与模板同一星期、同一开始时间的时间段替换模板中的时间段
+    （is_available=False 表示关闭该时段），其余的作为额外的开放时间段。
+    """
     WEEKDAY_CHOICES = [
         (0, '周一'),
         (1, '周二'),
@@ -101,6 +113,73 @@ class TimeSlot(models.Model):
         return f"{self.laboratory.name} - {self.get_weekday_display()} {self.start_time}-{self.end_time}"
 
 
+class ScheduleTemplate(models.Model):
+    """时间表模板：多个实验室共用的每周开放时间段"""
+    name = models.CharField(max_length=100, unique=True, verbose_name="模板名称")
+    description = models.TextField(blank=True, verbose_name="说明")
+
+    class Meta:
+        verbose_name = "时间表模板"
+        verbose_name_plural = "时间表模板"
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class ScheduleTemplateSlot(models.Model):
+    """时间表模板中的时间段"""
+    template = models.ForeignKey(ScheduleTemplate, on_delete=models.CASCADE, related_name='slots', verbose_name="时间表模板")
+    weekday = models.IntegerField(choices=TimeSlot.WEEKDAY_CHOICES, verbose_name="星期")
+    start_time = models.TimeField(verbose_name="开始时间")
+    end_time = models.TimeField(verbose_name="结束时间")
+
+    class Meta:
+        verbose_name = "模板时间段"
+        verbose_name_plural = "模板时间段"
+        unique_together = ['template', 'weekday', 'start_time']
+        ordering = ['template', 'weekday', 'start_time']
+
+    def __str__(self):
+        return f"{self.template.name} - {self.get_weekday_display()} {self.start_time}-{self.end_time}"
+
+
+class ReservationSeries(models.Model):
+    """重复预约系列：从 start_date 起每 interval_weeks 周一次，直到 end_date"""
+    INTERVAL_CHOICES = [
+        (1, '每周'),
+        (2, '每两周'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="预约用户")
+    laboratory = models.ForeignKey(Laboratory, on_delete=models.CASCADE, verbose_name="实验室")
+    start_date = models.DateField(verbose_name="首次日期")
+    end_date = models.DateField(verbose_name="截止日期")
+    interval_weeks = models.PositiveSmallIntegerField(choices=INTERVAL_CHOICES, default=1, verbose_name="重复间隔")
+    start_time = models.TimeField(verbose_name="开始时间")
+    end_time = models.TimeField(verbose_name="结束时间")
+    purpose = models.TextField(verbose_name="使用目的")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+
+    class Meta:
+        verbose_name = "重复预约"
+        verbose_name_plural = "重复预约"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.laboratory.name} - {self.get_interval_weeks_display()} ({self.start_date}~{self.end_date})"
+
+    def occurrence_dates(self):
+        """展开为各次预约的日期"""
+        step = timedelta(weeks=self.interval_weeks)
+        dates = []
+        day = self.start_date
+        while day <= self.end_date:
+            dates.append(day)
+            day += step
+        return dates
+
+
 class Reservation(models.Model):
     """预约记录模型"""
     STATUS_CHOICES = [
@@ -110,6 +189,8 @@ class Reservation(models.Model):
         ('cancelled', '已取消'),
         ('completed', '已完成'),
     ]
+    # 占用实验室时间的状态，冲突检测只考虑这些记录
+    ACTIVE_STATUSES = ['pending', 'approved']
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="预约用户")
     laboratory = models.ForeignKey(Laboratory, on_delete=models.CASCADE, verbose_name="实验室")
@@ -121,11 +202,32 @@ class Reservation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="申请时间")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
     admin_comment = models.TextField(blank=True, verbose_name="管理员备注")
+    series = models.ForeignKey(
+        ReservationSeries, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='reservations', verbose_name="所属重复预约",
+    )
 
     class Meta:
         verbose_name = "预约记录"
         verbose_name_plural = "预约记录"
         ordering = ['-created_at']
+        indexes = [
+            # 冲突检测 / 可用性查询：实验室 + 日期 + 状态 + 时间区间
+            models.Index(
+                fields=['laboratory', 'date', 'status', 'start_time', 'end_time'],
+                name='resv_lab_date_status_idx',
+            ),
+            # 仅覆盖有效预约的部分索引（不支持部分索引的数据库会自动跳过）
+            models.Index(
+                fields=['laboratory', 'date', 'start_time', 'end_time'],
+                condition=models.Q(status__in=['pending', 'approved']),
+                name='resv_active_slot_idx',
+            ),
+            # 我的预约：按用户筛选后按 (申请时间, id) 倒序，支持游标分页
+            models.Index(fields=['user', '-created_at', '-id'], name='resv_user_created_idx'),
+            # 管理员审核：按状态筛选后按 (申请时间, id) 倒序，支持游标分页
+            models.Index(fields=['status', '-created_at', '-id'], name='resv_status_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.laboratory.name} - {self.date}"
@@ -150,7 +252,7 @@ class Reservation(models.Model):
     @property
     def can_cancel(self):
         """判断是否可以取消"""
-        return self.status in ['pending', 'approved'] and not self.is_past
+        return self.status in self.ACTIVE_STATUSES and not self.is_past
 
 
 class UserProfile(models.Model):
@@ -0,0 +1,191 @@
+"""
+实验室占用索引
+
+按 (实验室, 日期) 在内存中维护有效预约的有序区间表，用于快速回答
+“[start, end) 是否与已有预约重叠”。区间表按需从数据库加载，并通过
+Reservation 的 post_save / post_delete 信号保持同步；其他进程写入的
+变化由 TTL 兜底刷新。最终的冲突判断仍以预约事务内的数据库查询为准。
+"""
+import threading
+import time as _time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.dateparse import parse_date, parse_time
+
+from .models import Reservation
+
+
+def _as_date(value):
+    return parse_date(value) if isinstance(value, str) else value
+
+
+def _as_time(value):
+    return parse_time(value) if isinstance(value, str) else value
+
+
+class DayOccupancy:
+    """某个实验室某一天的有效预约区间（按开始时间排序）"""
+
+    __slots__ = ('intervals', 'max_ends', 'loaded_at')
+
+    def __init__(self, intervals, loaded_at):
+        self.intervals = sorted(intervals)
+        self.loaded_at = loaded_at
+        self._rebuild()
+
+    def _rebuild(self):
+        # max_ends[i] 为前 i+1 个区间的最大结束时间，使重叠判断只需一次二分
+        max_ends = []
+        current = None
+        for _start, end, _pk in self.intervals:
+            if current is None or end > current:
+                current = end
+            max_ends.append(current)
+        self.max_ends = max_ends
+
+    def add(self, start, end, pk):
+        insort(self.intervals, (start, end, pk))
+        self._rebuild()
+
+    def remove(self, pk):
+        self.intervals = [interval for interval in self.intervals if interval[2] != pk]
+        self._rebuild()
+
+    def overlaps(self, start, end):
+        """判断 [start, end) 是否与任一区间重叠，O(log n)"""
+        # 开始时间早于 end 的区间都在 intervals[:i] 中
+        i = bisect_left(self.intervals, (end,))
+        return i > 0 and self.max_ends[i - 1] > start
+
+
+class OccupancyIndex:
+    """进程内的实验室占用索引"""
+
+    def __init__(self, ttl=None, max_buckets=None):
+        self.ttl = ttl if ttl is not None else getattr(settings, 'OCCUPANCY_INDEX_TTL', 30)
+        self.max_buckets = max_buckets or getattr(settings, 'OCCUPANCY_INDEX_MAX_BUCKETS', 4096)
+        self._buckets = OrderedDict()
+        self._locations = {}
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def get(self, lab_id, day):
+        """返回 (实验室, 日期) 对应的 DayOccupancy，必要时从数据库加载"""
+        key = (int(lab_id), _as_date(day))
+        return self.get_many([key])[key]
+
+    def get_many(self, keys):
+        """批量获取多个 (实验室, 日期) 的 DayOccupancy，未命中的用一次分组查询加载"""
+        found, missing, version, now = self._lookup(keys)
+        if missing:
+            found.update(self._load(missing, self._query(missing), version, now))
+        return found
+
+    async def aget_many(self, keys):
+        """get_many() 的异步版本，未命中时用异步 ORM 加载"""
+        found, missing, version, now = self._lookup(keys)
+        if missing:
+            rows = [row async for row in self._query(missing)]
+            found.update(self._load(missing, rows, version, now))
+        return found
+
+    def is_available(self, lab_id, day, start_time, end_time):
+        """判断时间段是否空闲"""
+        bucket = self.get(lab_id, day)
+        return not bucket.overlaps(_as_time(start_time), _as_time(end_time))
+
+    async def ais_available(self, lab_id, day, start_time, end_time):
+        """is_available() 的异步版本"""
+        key = (int(lab_id), _as_date(day))
+        bucket = (await self.aget_many([key]))[key]
+        return not bucket.overlaps(_as_time(start_time), _as_time(end_time))
+
+    def _lookup(self, keys):
+        """返回 (命中的区间表, 未命中的键, 当前版本号, 当前时间)"""
+        keys = {(int(lab_id), _as_date(day)) for lab_id, day in keys}
+        now = _time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                bucket = self._buckets.get(key)
+                if bucket is not None and now - bucket.loaded_at < self.ttl:
+                    self._buckets.move_to_end(key)
+                    found[key] = bucket
+            version = self._version
+        return found, keys - found.keys(), version, now
+
+    def _query(self, missing):
+        return Reservation.objects.filter(
+            laboratory_id__in={lab_id for lab_id, _day in missing},
+            date__in={day for _lab_id, day in missing},
+            status__in=Reservation.ACTIVE_STATUSES,
+        ).values_list('laboratory_id', 'date', 'start_time', 'end_time', 'pk')
+
+    def _load(self, missing, rows, version, now):
+        """按查询结果建立未命中键的区间表并写入索引"""
+        intervals = {key: [] for key in missing}
+        for lab_id, day, start, end, pk in rows:
+            if (lab_id, day) in intervals:
+                intervals[(lab_id, day)].append((start, end, pk))
+        loaded = {key: DayOccupancy(value, now) for key, value in intervals.items()}
+        self._store(loaded, version)
+        return loaded
+
+    def _store(self, buckets, version):
+        with self._lock:
+            # 加载期间若有信号更新，本次结果可能已过时，不写入索引
+            if version != self._version:
+                return
+            for key, bucket in buckets.items():
+                self._discard(key)
+                self._buckets[key] = bucket
+                for _start, _end, pk in bucket.intervals:
+                    self._locations[pk] = key
+            while len(self._buckets) > self.max_buckets:
+                self._discard(next(iter(self._buckets)))
+
+    def _discard(self, key):
+        bucket = self._buckets.pop(key, None)
+        if bucket is not None:
+            for _start, _end, pk in bucket.intervals:
+                self._locations.pop(pk, None)
+
+    def _unlink(self, pk):
+        key = self._locations.pop(pk, None)
+        if key in self._buckets:
+            self._buckets[key].remove(pk)
+
+    def reservation_saved(self, reservation):
+        """预约保存后同步索引"""
+        key = (reservation.laboratory_id, _as_date(reservation.date))
+        with self._lock:
+            self._version += 1
+            self._unlink(reservation.pk)
+            bucket = self._buckets.get(key)
+            if bucket is not None and reservation.status in Reservation.ACTIVE_STATUSES:
+                bucket.add(_as_time(reservation.start_time), _as_time(reservation.end_time), reservation.pk)
+                self._locations[reservation.pk] = key
+
+    def reservation_deleted(self, pk):
+        """预约删除后同步索引"""
+        with self._lock:
+            self._version += 1
+            self._unlink(pk)
+
+    def invalidate(self, lab_id=None, day=None):
+        """丢弃索引中的数据（批量 update 等绕过信号的写入后调用）"""
+        with self._lock:
+            self._version += 1
+            if lab_id is None and day is None:
+                self._buckets.clear()
+                self._locations.clear()
+                return
+            day = _as_date(day)
+            for key in list(self._buckets):
+                if (lab_id is None or key[0] == int(lab_id)) and (day is None or key[1] == day):
+                    self._discard(key)
+
+
+occupancy_index = OccupancyIndex()
@@ -0,0 +1,78 @@
+"""
+匿名用户整页缓存
+
+实验室列表页和详情页对所有匿名用户完全相同，按 URL 路径、语言以及列表页的搜索词和分类
+缓存渲染结果。缓存键中带上与 ETag 相同的数据库字段：列表页为所有实验室的 Max(updated_at) 与数量，
+详情页为实验室的 updated_at / schedule_updated_at（预约 / 时间段变更时更新），
+ETag 变化时缓存键一定随之变化，不会把旧页面配上新 ETag 返回；页面中的目录数据也按相同字段缓存（见 catalogue）。
+另带上目录缓存版本（Laboratory / TimeSlot 写入后递增）。
+登录用户、非 GET 请求、有待显示提示消息的请求不走整页缓存，由模板中的片段缓存减少渲染开销。
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.translation import get_language
+
+from .availability import week_grid_stamp
+from .caching import versioned_key
+from .catalogue import CATALOGUE_NAMESPACE
+from .freshness import has_pending_messages, request_catalogue_state, request_laboratory_state
+
+
+def page_cache_timeout():
+    """整页缓存和模板片段缓存的过期时间（秒）"""
+    return getattr(settings, 'PAGE_CACHE_TIMEOUT', 600)
+
+
+def _digest(value):
+    return hashlib.md5(value.encode('utf-8')).hexdigest()
+
+
+def catalogue_page_key(request, *args, **kwargs):
+    """实验室列表页的缓存键：路径 + 语言 + 目录时间戳（与 ETag 相同）+ 搜索词 + 分类"""
+    state = request_catalogue_state(request)
+    return versioned_key(
+        CATALOGUE_NAMESPACE, 'page', request.path, get_language(),
+        _digest(f"{state['updated_at']}:{state['count']}"),
+        _digest(request.GET.get('search', '')), _digest(request.GET.get('category', '')),
+    )
+
+
+def laboratory_page_key(request, lab_id, *args, **kwargs):
+    """实验室详情页的缓存键：路径 + 语言 + 实验室时间戳（与 ETag 相同）+ 日期"""
+    state = request_laboratory_state(request, lab_id)
+    return versioned_key(
+        CATALOGUE_NAMESPACE, 'page', request.path, get_language(),
+        state and week_grid_stamp(state), timezone.localdate().isoformat(),
+    )
+
+
+def cache_anonymous_page(key_func):
+    """装饰器：匿名用户的 GET 请求按 key_func(request, *args, **kwargs) 缓存整页"""
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if (
+                request.method not in ('GET', 'HEAD')
+                or request.user.is_authenticated
+                or has_pending_messages(request)
+            ):
+                return view_func(request, *args, **kwargs)
+
+            key = key_func(request, *args, **kwargs)
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+
+            response = view_func(request, *args, **kwargs)
+            # 只缓存不带 Cookie 的完整 200 响应
+            if response.status_code == 200 and not response.streaming and not response.cookies:
+                cache.set(key, (response.content, response['Content-Type']), page_cache_timeout())
+            return response
+        return wrapper
+    return decorator
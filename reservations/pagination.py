@@ -0,0 +1,77 @@
+"""
+预约列表的游标（keyset）分页
+
+按 (created_at, id) 倒序翻页：下一页的条件是“严格排在上一页最后一条之后”，
+配合 (user, -created_at, -id) / (status, -created_at, -id) 索引，
+任意深度的页面都只需一次索引定位加 page_size 行读取，不受 OFFSET 影响。
+"""
+import base64
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class KeysetPage:
+    """一页结果"""
+
+    def __init__(self, items, next_cursor, page_size):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.page_size = page_size
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def encode_cursor(created_at, pk):
+    raw = f'{created_at.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """解析游标，格式错误时返回 None"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.split('|')
+        return datetime.fromisoformat(created_at), int(pk)
+    except ValueError:
+        return None
+
+
+def get_page_size(value):
+    """解析请求中的每页条数，缺省取 settings.RESERVATION_PAGE_SIZE"""
+    default = getattr(settings, 'RESERVATION_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    try:
+        page_size = int(value) if value else default
+    except ValueError:
+        page_size = default
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+
+def keyset_paginate(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """按 (created_at, id) 倒序返回游标之后的一页"""
+    queryset = queryset.order_by('-created_at', '-id')
+    position = decode_cursor(cursor)
+    if position is not None:
+        created_at, pk = position
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+    items = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].pk)
+    return KeysetPage(items, next_cursor, page_size)
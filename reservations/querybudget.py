@@ -0,0 +1,58 @@
+"""
+SQL 查询数预算
+
+query_budget 既可作为上下文管理器，也可作为视图装饰器使用，统计代码块内
+在默认数据库上执行的查询数。超出预算时：严格模式（settings.QUERY_BUDGET_STRICT，
+默认随 DEBUG）抛出 QueryBudgetExceeded，否则写入 reservations.queries 日志。
+"""
+import logging
+from contextlib import ContextDecorator
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger('reservations.queries')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """查询数超出预算"""
+
+
+class query_budget(ContextDecorator):
+    """限制代码块或视图内执行的 SQL 查询数"""
+
+    def __init__(self, limit, label=None):
+        self.limit = limit
+        self.label = label
+        self.count = 0
+        self.queries = []
+
+    def __call__(self, func):
+        if self.label is None:
+            self.label = func.__qualname__
+        return super().__call__(func)
+
+    def _recreate_cm(self):
+        # 作为装饰器时每次调用使用独立的计数器，保证并发安全
+        return type(self)(self.limit, self.label)
+
+    def _count(self, execute, sql, params, many, context):
+        self.count += 1
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self.count = 0
+        self.queries = []
+        self._wrapper = connection.execute_wrapper(self._count)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._wrapper.__exit__(exc_type, exc_value, traceback)
+        if exc_type is None and self.count > self.limit:
+            message = f'{self.label or "代码块"} 执行了 {self.count} 次查询，超出预算 {self.limit} 次'
+            if getattr(settings, 'QUERY_BUDGET_STRICT', settings.DEBUG):
+                raise QueryBudgetExceeded(message + '\n' + '\n'.join(self.queries))
+            logger.warning(message)
+        return False
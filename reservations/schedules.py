@@ -0,0 +1,185 @@
+"""
+实验室每周开放时间
+
+实验室引用可复用的时间表模板（ScheduleTemplate），自身的 TimeSlot 作为对模板的覆盖：
+与模板同一星期、同一开始时间的时间段替换模板中的时间段（is_available=False 表示关闭该时段），
+其余的作为额外的开放时间段。既没有模板也没有时间段的实验室不限制开放时间。
+
+模板和覆盖用一次查询合并编译为 WeeklySchedule，保存在进程内的 schedule_table 中，
+按 实验室 → 星期 直接取当天的时间段，预约表单校验和详情页周占用表都不再查询时间段。
+开放时间相同的实验室共用同一个 WeeklySchedule 对象。
+编译结果连同实验室的 (updated_at, schedule_updated_at) 一起保存：时间段或模板变更时信号在同一事务内
+更新 schedule_updated_at，更换模板时 updated_at 随之更新，查表时时间戳不一致即重新编译该实验室。
+时间戳来自数据库，不依赖各进程各自的缓存，其他进程中的变更同样能在下次查表时发现。
+调用方已加载实验室时可直接传入时间戳，免去查询。
+"""
+import threading
+import weakref
+from bisect import bisect_right
+from datetime import time
+
+from django.db.models import F, Value
+
+from .models import Laboratory, ScheduleTemplateSlot, TimeSlot
+
+WEEKDAY_LABELS = dict(TimeSlot.WEEKDAY_CHOICES)
+
+
+def _merge(slots):
+    """合并首尾相接或重叠的时间段，得到当天的开放区间"""
+    hours = []
+    for start, end in slots:
+        if hours and start <= hours[-1][1]:
+            if end > hours[-1][1]:
+                hours[-1] = (hours[-1][0], end)
+        else:
+            hours.append((start, end))
+    return tuple(hours)
+
+
+class WeeklySchedule:
+    """编译后的每周开放时间
+
+    slots[weekday] 为当天可预约的时间段 ((开始, 结束), ...)，按开始时间排序；
+    hours[weekday] 为相邻时间段合并后的开放区间。configured 为 False 表示未设置开放时间，不做限制。
+    """
+
+    __slots__ = ('slots', 'hours', 'configured', '__weakref__')
+
+    def __init__(self, slots, configured=True):
+        self.slots = tuple(tuple(sorted(day)) for day in slots)
+        self.hours = tuple(_merge(day) for day in self.slots)
+        self.configured = configured
+
+    def allows(self, weekday, start, end):
+        """[start, end) 是否完整落在当天的某个开放区间内"""
+        if not self.configured:
+            return True
+        hours = self.hours[weekday]
+        # 开始时间不晚于 start 的最后一个开放区间
+        i = bisect_right(hours, (start, time.max)) - 1
+        return i >= 0 and hours[i][1] >= end
+
+    def describe(self, weekday):
+        """当天开放时间的文字说明"""
+        return '、'.join(f'{start:%H:%M}-{end:%H:%M}' for start, end in self.hours[weekday]) or '不开放'
+
+    def weekly_hours(self):
+        """[(星期名称, 开放时间说明)]，未设置开放时间时为空列表"""
+        if not self.configured:
+            return []
+        return [(WEEKDAY_LABELS[weekday], self.describe(weekday)) for weekday in range(7)]
+
+
+UNRESTRICTED = WeeklySchedule([()] * 7, configured=False)
+
+
+def compile_schedules(lab_ids):
+    """用一次 UNION 查询读取模板时间段和覆盖，编译为 {实验室: WeeklySchedule}"""
+    lab_ids = set(lab_ids)
+    template_rows = (
+        ScheduleTemplateSlot.objects.filter(template__laboratories__in=lab_ids)
+        .order_by()
+        .annotate(lab_id=F('template__laboratories'), available=Value(True), source=Value(0))
+        .values_list('lab_id', 'weekday', 'start_time', 'end_time', 'available', 'source')
+    )
+    override_rows = (
+        TimeSlot.objects.filter(laboratory_id__in=lab_ids)
+        .order_by()
+        .annotate(source=Value(1))
+        .values_list('laboratory_id', 'weekday', 'start_time', 'end_time', 'is_available', 'source')
+    )
+    grids = {}
+    # 先模板后覆盖，同一 (星期, 开始时间) 以覆盖为准
+    for lab_id, weekday, start, end, available, _source in sorted(
+        template_rows.union(override_rows, all=True), key=lambda row: row[5]
+    ):
+        grids.setdefault(lab_id, [{} for _day in range(7)])[weekday][start] = (end, available)
+
+    schedules = {}
+    for lab_id in lab_ids:
+        grid = grids.get(lab_id)
+        if grid is None:
+            schedules[lab_id] = UNRESTRICTED
+        else:
+            schedules[lab_id] = WeeklySchedule([
+                [(start, end) for start, (end, available) in day.items() if available] for day in grid
+            ])
+    return schedules
+
+
+def schedule_states(lab_ids):
+    """实验室的 {id: (updated_at, schedule_updated_at)}，一次查询"""
+    return {
+        lab_id: (updated_at, schedule_updated_at)
+        for lab_id, updated_at, schedule_updated_at in Laboratory.objects.filter(pk__in=lab_ids)
+        .order_by().values_list('id', 'updated_at', 'schedule_updated_at')
+    }
+
+
+class ScheduleTable:
+    """进程内的 实验室 → WeeklySchedule 查找表"""
+
+    def __init__(self):
+        # 实验室 → (编译时的时间戳, WeeklySchedule)
+        self._schedules = {}
+        # slots → WeeklySchedule，开放时间相同的实验室共用一个对象，不再被引用的自动回收
+        self._shared = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def get(self, lab_id, state=None):
+        """实验室的每周开放时间，state 为实验室的 (updated_at, schedule_updated_at)，未传入时查询一次"""
+        lab_id = int(lab_id)
+        states = None if state is None else {lab_id: state}
+        return self.get_many([lab_id], states)[lab_id]
+
+    def get_many(self, lab_ids, states=None):
+        """批量获取多个实验室的每周开放时间
+
+        states 未传入时用一次查询读取时间戳；时间戳与编译时不一致或未编译的实验室用一次查询重新编译。
+        """
+        lab_ids = {int(lab_id) for lab_id in lab_ids}
+        if states is None:
+            states = schedule_states(lab_ids)
+        found = {}
+        with self._lock:
+            for lab_id in lab_ids:
+                entry = self._schedules.get(lab_id)
+                if entry is not None and entry[0] == states.get(lab_id):
+                    found[lab_id] = entry[1]
+        missing = lab_ids - found.keys()
+        if missing:
+            # 先读时间戳后编译，编译结果不会比时间戳旧；其间的变更下次查表时按新时间戳重新编译
+            compiled = compile_schedules(missing)
+            with self._lock:
+                for lab_id, schedule in compiled.items():
+                    if schedule.configured:
+                        schedule = self._shared.setdefault(schedule.slots, schedule)
+                    compiled[lab_id] = schedule
+                    # 已删除的实验室没有时间戳，不写入查找表
+                    if states.get(lab_id) is not None:
+                        self._schedules[lab_id] = (states[lab_id], schedule)
+            found.update(compiled)
+        return found
+
+    def discard(self, lab_ids=None):
+        """丢弃本进程中实验室（默认全部）已编译的开放时间"""
+        with self._lock:
+            if lab_ids is None:
+                self._schedules.clear()
+                return
+            for lab_id in lab_ids:
+                self._schedules.pop(int(lab_id), None)
+
+
+schedule_table = ScheduleTable()
+
+
+def weekly_schedule(lab_id, state=None):
+    """实验室的每周开放时间（WeeklySchedule），state 为已知的 (updated_at, schedule_updated_at)"""
+    return schedule_table.get(lab_id, state)
+
+
+def laboratory_schedule(laboratory):
+    """已加载的实验室的每周开放时间，按实例上的时间戳判断是否需要重新编译"""
+    return schedule_table.get(laboratory.pk, (laboratory.updated_at, laboratory.schedule_updated_at))
@@ -0,0 +1,133 @@
+"""
+实验室全文检索（SQLite FTS5）
+
+FTS5 自带的 unicode61 分词器会把连续的中文当作一个词，无法检索其中的片段，
+因此写入索引前先对中文做二元切分（“物理实验室” → “物理 理实 实验 验室 室”），
+查询时把中文词拆成相同的二元短语，英文和数字按前缀匹配。
+索引由 Laboratory 的 post_save / post_delete 信号在同一事务内维护，
+批量写入后可调用 index_laboratories() 补写或 rebuild_search_index() 重建。不支持 FTS5 的数据库返回 None，
+由调用方回退到 icontains 查询。索引表是否存在按数据库连接缓存，migrate 完成后（post_migrate）重新检查。
+"""
+import re
+
+from django.db import connection
+
+FTS_TABLE = 'reservations_laboratory_fts'
+FTS_COLUMNS = ('name', 'location', 'description', 'equipment')
+# bm25 列权重，与 FTS_COLUMNS 顺序一致：名称最重要，其次位置和设备
+FTS_WEIGHTS = (10.0, 4.0, 1.0, 2.0)
+
+_CJK_RUN = re.compile(r'([㐀-䶿一-鿿豈-﫿]+)')
+_WORD = re.compile(r'\w+')
+
+_available = {}
+
+
+def segment(text):
+    """把文本转换为索引用的词序列（中文二元切分，其余原样保留）"""
+    tokens = []
+    for i, part in enumerate(_CJK_RUN.split(text or '')):
+        if i % 2:
+            tokens.extend(part[j:j + 2] for j in range(len(part) - 1))
+            tokens.append(part[-1])
+        else:
+            tokens.extend(_WORD.findall(part))
+    return ' '.join(tokens)
+
+
+def build_match_query(search_query):
+    """把用户输入转换为 FTS5 MATCH 表达式，无可检索内容时返回空字符串"""
+    clauses = []
+    for i, part in enumerate(_CJK_RUN.split(search_query)):
+        if i % 2:
+            if len(part) == 1:
+                clauses.append(f'"{part}" *')
+            else:
+                clauses.append('"%s"' % ' '.join(part[j:j + 2] for j in range(len(part) - 1)))
+        else:
+            clauses.extend(f'"{word}" *' for word in _WORD.findall(part))
+    return ' '.join(clauses)
+
+
+def search_index_available():
+    """当前数据库是否存在全文索引表"""
+    alias = connection.alias
+    if alias not in _available:
+        _available[alias] = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names(include_views=False)
+        )
+    return _available[alias]
+
+
+def reset_search_index_state():
+    """丢弃缓存的索引表是否存在的结果（迁移创建或删除索引表后调用）"""
+    _available.clear()
+
+
+def index_laboratory(laboratory):
+    """写入或更新单个实验室的索引"""
+    index_laboratories([laboratory])
+
+
+def index_laboratories(laboratories):
+    """批量写入或更新多个实验室的索引（bulk_create 后使用）"""
+    if not search_index_available():
+        return
+    rows = [
+        [laboratory.pk] + [segment(getattr(laboratory, column)) for column in FTS_COLUMNS]
+        for laboratory in laboratories
+    ]
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [row[:1] for row in rows])
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, {", ".join(FTS_COLUMNS)}) VALUES (%s, %s, %s, %s, %s)',
+            rows,
+        )
+
+
+def remove_laboratory(pk):
+    """删除单个实验室的索引"""
+    if not search_index_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [pk])
+
+
+def rebuild_search_index(laboratories):
+    """按给定实验室数据重建全部索引"""
+    if not search_index_available():
+        return
+    rows = [
+        [laboratory.pk] + [segment(getattr(laboratory, column)) for column in FTS_COLUMNS]
+        for laboratory in laboratories
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, {", ".join(FTS_COLUMNS)}) VALUES (%s, %s, %s, %s, %s)',
+            rows,
+        )
+
+
+def full_text_search(queryset, search_query, ranked=True):
+    """用全文索引筛选实验室，ranked 时按相关度排序；索引不可用时返回 None"""
+    if not search_index_available():
+        return None
+    match = build_match_query(search_query)
+    if not match:
+        return None
+
+    table = queryset.model._meta.db_table
+    extra = {
+        'tables': [FTS_TABLE],
+        'where': [f'{FTS_TABLE}.rowid = {table}.id', f'{FTS_TABLE} MATCH %s'],
+        'params': [match],
+    }
+    if ranked:
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        extra['select'] = {'search_rank': f'bm25({FTS_TABLE}, {weights})'}
+        extra['order_by'] = ['search_rank', 'name']
+    return queryset.extra(**extra)
@@ -0,0 +1,183 @@
+"""
+初始数据批量写入
+
+示例实验室、标准时间表模板和测试用户的定义，以及按差集批量补齐缺失记录的 seed()。
+已存在的记录（实验室按名称、模板时间段按 星期+开始时间、用户按用户名、
+用户资料按用户）不会被修改，尚未引用模板的实验室改为引用标准时间表，重复执行是安全的。
+全部写入在同一个事务内完成，写入后补写全文索引并使相关缓存失效。
+"""
+from datetime import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .catalogue import invalidate_catalogue
+from .freshness import touch_laboratory_schedule
+from .models import Laboratory, ScheduleTemplate, ScheduleTemplateSlot, TimeSlot, UserProfile
+from .schedules import schedule_table
+from .search import index_laboratories
+
+SEED_BATCH_SIZE = 1000
+
+SAMPLE_LABORATORIES = [
+    {
+        'name': '物理实验室A',
+        'category': 'physics',
+        'location': '理科楼301',
+        'capacity': 30,
+        'equipment': '示波器、信号发生器、万用表、电源等基础物理实验设备',
+        'description': '适用于基础物理实验，包括力学、电学、光学等实验项目。',
+    },
+    {
+        'name': '化学实验室B',
+        'category': 'chemistry',
+        'location': '理科楼205',
+        'capacity': 25,
+        'equipment': '通风橱、分析天平、离心机、pH计、加热设备等',
+        'description': '专业化学实验室，配备完善的安全设施和精密仪器。',
+    },
+    {
+        'name': '计算机实验室C',
+        'category': 'computer',
+        'location': '信息楼102',
+        'capacity': 40,
+        'equipment': '高性能计算机40台、投影设备、网络设备',
+        'description': '现代化计算机实验室，支持编程、数据分析、软件开发等课程。',
+    },
+    {
+        'name': '生物实验室D',
+        'category': 'biology',
+        'location': '生科楼401',
+        'capacity': 20,
+        'equipment': '显微镜、培养箱、离心机、PCR仪、电泳设备等',
+        'description': '生物学专业实验室，适用于分子生物学、细胞生物学实验。',
+    },
+    {
+        'name': '工程实验室E',
+        'category': 'engineering',
+        'location': '工程楼501',
+        'capacity': 15,
+        'equipment': '3D打印机、激光切割机、数控机床、测量工具等',
+        'description': '工程技术实验室，支持机械设计、制造工艺等实践课程。',
+    },
+]
+
+# 标准时间表模板的名称和每天的开放时间段（周一到周日相同）
+STANDARD_TEMPLATE_NAME = '标准时间表'
+STANDARD_TIME_SLOTS = [
+    (time(8, 0), time(10, 0)),
+    (time(10, 0), time(12, 0)),
+    (time(14, 0), time(16, 0)),
+    (time(16, 0), time(18, 0)),
+    (time(19, 0), time(21, 0)),
+]
+
+SAMPLE_USERS = [
+    {
+        'username': 'student1',
+        'password': 'student123',
+        'first_name': '张三',
+        'email': 'student1@example.com',
+        'profile': {'student_id': '2021001', 'phone': '13800138001', 'department': '计算机科学与技术学院'},
+    },
+    {
+        'username': 'student2',
+        'password': 'student123',
+        'first_name': '李四',
+        'email': 'student2@example.com',
+        'profile': {'student_id': '2021002', 'phone': '13800138002', 'department': '物理学院'},
+    },
+    {
+        'username': 'teacher1',
+        'password': 'teacher123',
+        'first_name': '王老师',
+        'email': 'teacher1@example.com',
+        'is_staff': True,
+        'profile': {'student_id': 'T001', 'phone': '13800138003', 'department': '化学学院'},
+    },
+]
+
+
+def _bulk_insert(model, objs, label, progress):
+    """分批 bulk_create(ignore_conflicts=True)，每批报告一次进度"""
+    for start in range(0, len(objs), SEED_BATCH_SIZE):
+        model.objects.bulk_create(objs[start:start + SEED_BATCH_SIZE], ignore_conflicts=True)
+        if progress:
+            progress(f'{label}：{min(start + SEED_BATCH_SIZE, len(objs))}/{len(objs)}')
+
+
+def seed(laboratories=SAMPLE_LABORATORIES, users=SAMPLE_USERS, time_slots=STANDARD_TIME_SLOTS,
+         all_laboratories=False, progress=None):
+    """补齐缺失的实验室、标准时间表、用户和用户资料，返回各类新增记录数
+
+    all_laboratories 为 True 时数据库中所有未引用模板的实验室都改为引用标准时间表，
+    否则只处理 laboratories 中列出的实验室。
+    """
+    created = {}
+    with transaction.atomic():
+        # 实验室：按名称取差集
+        names = [lab['name'] for lab in laboratories]
+        existing = set(Laboratory.objects.filter(name__in=names).order_by().values_list('name', flat=True))
+        missing = [Laboratory(**lab) for lab in laboratories if lab['name'] not in existing]
+        _bulk_insert(Laboratory, missing, '实验室', progress)
+        created['laboratories'] = len(missing)
+        if missing:
+            # ignore_conflicts 时不会回填主键，重新查询后补写全文索引
+            index_laboratories(Laboratory.objects.filter(name__in=[lab.name for lab in missing]))
+
+        # 标准时间表：模板时间段按 (星期, 开始时间) 取差集
+        template = ScheduleTemplate.objects.filter(name=STANDARD_TEMPLATE_NAME).first()
+        if template is None:
+            template = ScheduleTemplate.objects.create(name=STANDARD_TEMPLATE_NAME, description='周一到周日开放时间相同')
+        existing = set(ScheduleTemplateSlot.objects.filter(template=template).order_by().values_list('weekday', 'start_time'))
+        missing = [
+            ScheduleTemplateSlot(template=template, weekday=weekday, start_time=start, end_time=end)
+            for weekday, _label in TimeSlot.WEEKDAY_CHOICES
+            for start, end in time_slots
+            if (weekday, start) not in existing
+        ]
+        _bulk_insert(ScheduleTemplateSlot, missing, '时间段', progress)
+        created['timeslots'] = len(missing)
+
+        # 尚未引用模板的实验室改为引用标准时间表（模板有新增时段时，引用它的实验室排期都有变化）
+        labs = Laboratory.objects.all() if all_laboratories else Laboratory.objects.filter(name__in=names)
+        unscheduled = list(labs.filter(schedule_template__isnull=True).order_by().values_list('id', flat=True))
+        Laboratory.objects.filter(pk__in=unscheduled).update(schedule_template=template)
+        created['scheduled'] = len(unscheduled)
+        changed_labs = set(unscheduled)
+        if missing:
+            changed_labs.update(Laboratory.objects.filter(schedule_template=template).values_list('id', flat=True))
+        touch_laboratory_schedule(changed_labs)
+        schedule_table.discard(changed_labs)
+
+        # 用户：按用户名取差集，相同的密码只哈希一次
+        usernames = [user['username'] for user in users]
+        existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        hashes = {}
+        missing = []
+        for data in users:
+            if data['username'] in existing:
+                continue
+            fields = {key: value for key, value in data.items() if key not in ('password', 'profile')}
+            if data['password'] not in hashes:
+                hashes[data['password']] = make_password(data['password'])
+            missing.append(User(password=hashes[data['password']], **fields))
+        _bulk_insert(User, missing, '用户', progress)
+        created['users'] = len(missing)
+
+        # 用户资料：为还没有资料的用户补齐
+        user_ids = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+        existing = set(UserProfile.objects.filter(user_id__in=user_ids.values()).values_list('user_id', flat=True))
+        missing = [
+            UserProfile(user_id=user_ids[data['username']], **data['profile'])
+            for data in users
+            if 'profile' in data and user_ids[data['username']] not in existing
+        ]
+        _bulk_insert(UserProfile, missing, '用户资料', progress)
+        created['profiles'] = len(missing)
+
+        # bulk_create 不触发信号，提交后统一使缓存失效
+        if created['laboratories'] or changed_labs:
+            transaction.on_commit(invalidate_catalogue)
+    return created
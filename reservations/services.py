@@ -0,0 +1,348 @@
+"""
+预约写入服务
+
+冲突检查与写入在同一事务内原子完成：
+- SQLite 上由 0004 迁移安装的触发器在 INSERT/UPDATE 时拒绝与有效预约重叠的记录；
+- 其他数据库通过 select_for_update 锁定实验室行，把同一实验室的预约串行化后再检查。
+进程内另有按实验室划分的锁，高并发时同一实验室的请求在进程内排队，
+而不是在数据库锁上互相等待；内存占用索引判断空闲的请求直接进入事务，
+索引显示冲突时（其他进程的取消、拒绝最多要等 TTL 才反映到索引）先查询数据库确认，确实重叠才拒绝。
+重复预约的所有日期用一次范围查询检查冲突，再用 bulk_create 一次写入。
+已结束的预约由 sweep_reservations() 分块转为非有效状态（见 sweeper 模块的定期执行）。
+"""
+import threading
+from collections import defaultdict
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .events import publish_occupancy
+from .freshness import touch_laboratory_schedule
+from .models import Laboratory, Reservation
+from .occupancy import DayOccupancy, occupancy_index
+
+# 与迁移 0004 中触发器抛出的错误信息保持一致
+OVERLAP_ERROR = 'reservation overlaps an active reservation'
+
+_lab_locks = defaultdict(threading.Lock)
+_lab_locks_guard = threading.Lock()
+
+
+class BookingConflict(Exception):
+    """预约时间段与已有预约冲突"""
+
+
+class SeriesConflict(BookingConflict):
+    """重复预约中有日期与已有预约冲突，dates 为冲突的日期"""
+
+    def __init__(self, dates):
+        self.dates = sorted(dates)
+        super().__init__(self.dates)
+
+
+def _lab_lock(lab_id):
+    with _lab_locks_guard:
+        return _lab_locks[lab_id]
+
+
+def overlapping_reservations(laboratory_id, date, start_time, end_time):
+    """与 [start_time, end_time) 重叠的有效预约"""
+    return Reservation.objects.filter(
+        laboratory_id=laboratory_id,
+        date=date,
+        status__in=Reservation.ACTIVE_STATUSES,
+        start_time__lt=end_time,
+        end_time__gt=start_time,
+    )
+
+
+def book_reservation(reservation):
+    """原子地检查冲突并保存预约，冲突时抛出 BookingConflict"""
+    lab_id = reservation.laboratory_id
+    with _lab_lock(lab_id):
+        if not occupancy_index.is_available(lab_id, reservation.date, reservation.start_time, reservation.end_time):
+            if overlapping_reservations(
+                lab_id, reservation.date, reservation.start_time, reservation.end_time
+            ).exists():
+                raise BookingConflict
+            # 索引已过时，丢弃该日的区间表，下次按数据库重新加载
+            occupancy_index.invalidate(lab_id, reservation.date)
+        try:
+            with transaction.atomic():
+                if connection.vendor != 'sqlite':
+                    list(Laboratory.objects.select_for_update().filter(pk=lab_id).values_list('pk'))
+                    if overlapping_reservations(
+                        lab_id, reservation.date, reservation.start_time, reservation.end_time
+                    ).exists():
+                        raise BookingConflict
+                reservation.save()
+        except IntegrityError as exc:
+            if OVERLAP_ERROR in str(exc):
+                raise BookingConflict from exc
+            raise
+    return reservation
+
+
+def save_reservation(reservation):
+    """保存对已有预约的修改（审核、后台编辑），与其他有效预约重叠时抛出 BookingConflict"""
+    lab_id = reservation.laboratory_id
+    with _lab_lock(lab_id):
+        try:
+            with transaction.atomic():
+                if connection.vendor != 'sqlite' and reservation.status in Reservation.ACTIVE_STATUSES:
+                    list(Laboratory.objects.select_for_update().filter(pk=lab_id).values_list('pk'))
+                    if overlapping_reservations(
+                        lab_id, reservation.date, reservation.start_time, reservation.end_time
+                    ).exclude(pk=reservation.pk).exists():
+                        raise BookingConflict
+                reservation.save()
+        except IntegrityError as exc:
+            if OVERLAP_ERROR in str(exc):
+                raise BookingConflict from exc
+            raise
+    return reservation
+
+
+def series_conflicts(laboratory_id, dates, start_time, end_time):
+    """dates 中与有效预约在 [start_time, end_time) 重叠的日期
+
+    只做一次覆盖首末日期的范围查询，再在内存中按日期筛选。
+    """
+    if not dates:
+        return set()
+    wanted = set(dates)
+    rows = Reservation.objects.filter(
+        laboratory_id=laboratory_id,
+        date__range=(min(wanted), max(wanted)),
+        status__in=Reservation.ACTIVE_STATUSES,
+        start_time__lt=end_time,
+        end_time__gt=start_time,
+    ).values_list('date', flat=True)
+    return {day for day in rows if day in wanted}
+
+
+def book_series(series, skip_conflicts=False):
+    """原子地保存重复预约系列及其各次预约，返回 (预约列表, 跳过的冲突日期)
+
+    有日期冲突时，skip_conflicts 为 True 则跳过这些日期，否则抛出 SeriesConflict 且不写入任何记录。
+    """
+    lab_id = series.laboratory_id
+    dates = series.occurrence_dates()
+    with _lab_lock(lab_id):
+        try:
+            with transaction.atomic():
+                if connection.vendor != 'sqlite':
+                    list(Laboratory.objects.select_for_update().filter(pk=lab_id).values_list('pk'))
+                conflicts = series_conflicts(lab_id, dates, series.start_time, series.end_time)
+                if conflicts and (not skip_conflicts or len(conflicts) == len(dates)):
+                    raise SeriesConflict(conflicts)
+                series.save()
+                reservations = Reservation.objects.bulk_create([
+                    Reservation(
+                        user_id=series.user_id, laboratory_id=lab_id, series=series, date=day,
+                        start_time=series.start_time, end_time=series.end_time, purpose=series.purpose,
+                    )
+                    for day in dates if day not in conflicts
+                ])
+                # bulk_create 不触发信号
+                touch_laboratory_schedule([lab_id])
+                keys = {(lab_id, reservation.date) for reservation in reservations}
+                transaction.on_commit(lambda: _invalidate_after_bulk_update(keys, 'created'))
+        except IntegrityError as exc:
+            if OVERLAP_ERROR in str(exc):
+                raise SeriesConflict([]) from exc
+            raise
+    return reservations, sorted(conflicts)
+
+
+def cancel_series(series):
+    """取消系列中尚未开始的有效预约（一次集合 UPDATE），返回取消的数量"""
+    today = timezone.now().date()
+    with transaction.atomic():
+        pending = Reservation.objects.filter(
+            series=series, status__in=Reservation.ACTIVE_STATUSES, date__gte=today,
+        )
+        days = list(pending.values_list('date', flat=True))
+        if not days:
+            return 0
+        count = pending.update(status='cancelled', updated_at=timezone.now())
+        touch_laboratory_schedule([series.laboratory_id])
+        keys = {(series.laboratory_id, day) for day in days}
+        transaction.on_commit(lambda: _invalidate_after_bulk_update(keys, 'cancelled'))
+    return count
+
+
+# 批量审核时每条 IN 查询/UPDATE 的最大 id 数，避免超过数据库参数上限
+BULK_CHUNK_SIZE = 500
+
+BULK_RESULT_MESSAGES = {
+    'approved': '已批准',
+    'rejected': '已拒绝',
+    'conflict': '与已批准的预约时间冲突',
+    'past': '预约日期已过，无法批准',
+    'invalid_status': '只能审核待审核的预约',
+    'not_found': '预约不存在',
+}
+
+
+def _chunks(items, size=BULK_CHUNK_SIZE):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def bulk_review(reservation_ids, action):
+    """在一个事务内批量批准或拒绝待审核预约，返回每条预约的处理结果
+
+    批准时，所选预约与同一实验室同一天已批准的预约一起按时间排序，
+    一次扫描完成冲突检查（批内按申请先后，先到先得），随后用集合 UPDATE 写入。
+    """
+    if action not in ('approve', 'reject'):
+        raise ValueError(f'未知的审核操作: {action}')
+
+    ids = list(dict.fromkeys(int(pk) for pk in reservation_ids))
+    today = timezone.now().date()
+    outcomes = {}
+
+    with transaction.atomic():
+        selected = {}
+        for chunk in _chunks(ids):
+            for row in Reservation.objects.select_for_update().filter(id__in=chunk).values(
+                'id', 'laboratory_id', 'date', 'start_time', 'end_time', 'status', 'created_at'
+            ):
+                selected[row['id']] = row
+
+        candidates = []
+        for pk in ids:
+            row = selected.get(pk)
+            if row is None:
+                outcomes[pk] = 'not_found'
+            elif row['status'] != 'pending':
+                outcomes[pk] = 'invalid_status'
+            elif action == 'approve' and row['date'] < today:
+                outcomes[pk] = 'past'
+            else:
+                candidates.append(row)
+
+        if action == 'reject':
+            for row in candidates:
+                outcomes[row['id']] = 'rejected'
+        else:
+            for row in _sweep_conflicts(candidates):
+                outcomes[row['id']] = 'conflict'
+            for row in candidates:
+                outcomes.setdefault(row['id'], 'approved')
+
+        new_status = 'approved' if action == 'approve' else 'rejected'
+        changed = [row for row in candidates if outcomes[row['id']] == new_status]
+        now = timezone.now()
+        for chunk in _chunks(row['id'] for row in changed):
+            Reservation.objects.filter(id__in=chunk, status='pending').update(status=new_status, updated_at=now)
+
+        keys = {(row['laboratory_id'], row['date']) for row in changed}
+        touch_laboratory_schedule(lab_id for lab_id, _date in keys)
+        transaction.on_commit(lambda: _invalidate_after_bulk_update(keys, new_status))
+
+    return [
+        {'id': pk, 'result': outcomes[pk], 'message': BULK_RESULT_MESSAGES[outcomes[pk]]}
+        for pk in ids
+    ]
+
+
+def _sweep_conflicts(candidates):
+    """返回与已批准预约或批内更早申请冲突的候选预约"""
+    if not candidates:
+        return []
+
+    by_day = defaultdict(list)
+    for row in candidates:
+        by_day[(row['laboratory_id'], row['date'])].append(row)
+
+    candidate_ids = {row['id'] for row in candidates}
+    approved = defaultdict(list)
+    labs = {lab_id for lab_id, _date in by_day}
+    dates = [date for _lab_id, date in by_day]
+    for lab_chunk in _chunks(labs):
+        for lab_id, date, start_time, end_time, pk in Reservation.objects.filter(
+            laboratory_id__in=lab_chunk,
+            date__range=(min(dates), max(dates)),
+            status='approved',
+        ).values_list('laboratory_id', 'date', 'start_time', 'end_time', 'id'):
+            if (lab_id, date) in by_day and pk not in candidate_ids:
+                approved[(lab_id, date)].append((start_time, end_time, pk))
+
+    conflicts = []
+    for key, rows in by_day.items():
+        occupied = DayOccupancy(approved[key], 0)
+        for row in sorted(rows, key=lambda row: (row['created_at'], row['id'])):
+            if occupied.overlaps(row['start_time'], row['end_time']):
+                conflicts.append(row)
+            else:
+                occupied.add(row['start_time'], row['end_time'], row['id'])
+    return conflicts
+
+
+# 每个事务处理的预约数
+SWEEP_BATCH_SIZE = 500
+
+# 结束时间已过的预约：原状态 → (新状态, 管理员备注)
+SWEEP_TRANSITIONS = {
+    'approved': ('completed', ''),
+    'pending': ('cancelled', '预约时间已过仍未审核，已自动取消'),
+}
+
+
+def ended_reservations(status, now=None):
+    """结束时间已过、仍处于 status 状态的预约（按本地时间判断）"""
+    now = timezone.localtime(now)
+    return Reservation.objects.filter(status=status).filter(
+        Q(date__lt=now.date()) | Q(date=now.date(), end_time__lte=now.time())
+    )
+
+
+def sweep_reservations(now=None, batch_size=SWEEP_BATCH_SIZE, dry_run=False):
+    """把已结束的已批准预约标记为已完成、未审核的标记为已取消，返回 {原状态: 处理数量}
+
+    按主键顺序每次读出 batch_size 个 id，在独立的短事务中用集合 UPDATE 写入，
+    不会长时间占用写锁；UPDATE 条件中重新检查原状态，期间被审核或取消的预约保持不变。
+    每块提交后使受影响的占用索引和周占用表失效并推送占用变化。
+    """
+    counts = {}
+    for status, (new_status, comment) in SWEEP_TRANSITIONS.items():
+        ended = ended_reservations(status, now)
+        if dry_run:
+            counts[status] = ended.count()
+            continue
+        counts[status] = 0
+        last_id = 0
+        while True:
+            rows = list(
+                ended.filter(id__gt=last_id).order_by('id').values_list('id', 'laboratory_id', 'date')[:batch_size]
+            )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            changes = {'status': new_status, 'updated_at': timezone.now()}
+            if comment:
+                changes['admin_comment'] = comment
+            with transaction.atomic():
+                count = Reservation.objects.filter(id__in=[row[0] for row in rows], status=status).update(**changes)
+                if count:
+                    keys = {(lab_id, day) for _pk, lab_id, day in rows}
+                    touch_laboratory_schedule(lab_id for lab_id, _day in keys)
+                    transaction.on_commit(lambda keys=keys, action=new_status: _invalidate_after_bulk_update(keys, action))
+            counts[status] += count
+            if len(rows) < batch_size:
+                break
+    return counts
+
+
+def _invalidate_after_bulk_update(keys, action):
+    """集合 UPDATE 不触发信号，手动使受影响的缓存失效并推送占用变化"""
+    days_by_lab = defaultdict(set)
+    for lab_id, date in keys:
+        occupancy_index.invalidate(lab_id, date)
+        days_by_lab[lab_id].add(date)
+    for lab_id, days in days_by_lab.items():
+        publish_occupancy(lab_id, days, action)
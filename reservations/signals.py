@@ -0,0 +1,86 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from .catalogue import invalidate_catalogue
+from .events import publish_occupancy, reservation_action
+from .freshness import touch_laboratory_schedule
+from .models import Laboratory, Reservation, ScheduleTemplateSlot, TimeSlot
+from .occupancy import occupancy_index
+from .schedules import schedule_table
+from .search import index_laboratory, remove_laboratory, reset_search_index_state
+from .sqlite_tuning import apply_pragmas
+
+
+@receiver(post_save, sender=Reservation)
+def reservation_saved(sender, instance, created, **kwargs):
+    """预约变更：同一事务内标记实验室排期已更新（周占用表按此失效），提交后同步占用索引并推送占用变化"""
+    touch_laboratory_schedule([instance.laboratory_id])
+    action = reservation_action(instance, created)
+
+    def sync():
+        occupancy_index.reservation_saved(instance)
+        publish_occupancy(instance.laboratory_id, [instance.date], action, instance.pk)
+
+    transaction.on_commit(sync)
+
+
+@receiver(post_delete, sender=Reservation)
+def reservation_deleted(sender, instance, **kwargs):
+    """预约删除：同一事务内标记实验室排期已更新（周占用表按此失效），提交后同步占用索引并推送占用变化"""
+    pk, lab_id, day = instance.pk, instance.laboratory_id, instance.date
+    touch_laboratory_schedule([lab_id])
+
+    def sync():
+        occupancy_index.reservation_deleted(pk)
+        publish_occupancy(lab_id, [day], 'deleted', pk)
+
+    transaction.on_commit(sync)
+
+
+@receiver(post_save, sender=TimeSlot)
+@receiver(post_delete, sender=TimeSlot)
+def time_slot_changed(sender, instance, **kwargs):
+    """时间段变更：同一事务内标记实验室排期已更新（开放时间和周占用表按此失效），提交后使目录缓存失效"""
+    lab_id = instance.laboratory_id
+    touch_laboratory_schedule([lab_id])
+    schedule_table.discard([lab_id])
+    transaction.on_commit(invalidate_catalogue)
+
+
+@receiver(post_save, sender=ScheduleTemplateSlot)
+@receiver(post_delete, sender=ScheduleTemplateSlot)
+def template_slot_changed(sender, instance, **kwargs):
+    """模板时间段变更：标记引用该模板的实验室排期已更新（开放时间和周占用表按此失效）"""
+    lab_ids = list(Laboratory.objects.filter(schedule_template_id=instance.template_id).values_list('id', flat=True))
+    touch_laboratory_schedule(lab_ids)
+    schedule_table.discard(lab_ids)
+
+
+@receiver(post_save, sender=Laboratory)
+def laboratory_saved(sender, instance, **kwargs):
+    """实验室变更：同一事务内更新全文索引，提交后使目录缓存失效（更换时间表模板时 updated_at 随之更新，开放时间按此失效）"""
+    index_laboratory(instance)
+    schedule_table.discard([instance.pk])
+    transaction.on_commit(invalidate_catalogue)
+
+
+@receiver(post_delete, sender=Laboratory)
+def laboratory_deleted(sender, instance, **kwargs):
+    """实验室删除：同一事务内移除全文索引，提交后使目录缓存失效"""
+    remove_laboratory(instance.pk)
+    schedule_table.discard([instance.pk])
+    transaction.on_commit(invalidate_catalogue)
+
+
+@receiver(post_migrate)
+def migrated(sender, **kwargs):
+    """迁移可能创建或删除了全文索引表，重新检查是否可用"""
+    reset_search_index_state()
+
+
+@receiver(connection_created)
+def configure_connection(sender, connection, **kwargs):
+    """新建数据库连接时应用 SQLite PRAGMA 配置"""
+    apply_pragmas(connection)
@@ -0,0 +1,64 @@
+"""
+SQLite 连接参数
+
+每个新建的 SQLite 连接（connection_created 信号）按 settings.SQLITE_PRAGMAS 执行 PRAGMA，
+默认启用 WAL 日志、synchronous=NORMAL、内存映射、较大的页缓存、忙等待超时和内存临时表。
+WAL 模式下读写互不阻塞，配合 busy_timeout 和 IMMEDIATE 事务模式，
+多个 WSGI 进程并发写入时等待锁而不是立即报 "database is locked"。
+"""
+import logging
+
+from django.conf import settings
+
+logger = logging.getLogger('reservations.db')
+
+DEFAULT_PRAGMAS = {
+    'busy_timeout': 5000,
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'cache_size': -20000,
+    'mmap_size': 134217728,
+    'temp_store': 'memory',
+}
+# 允许配置的 PRAGMA 及取值校验（PRAGMA 不支持参数绑定，只接受白名单内的名称和取值）
+ALLOWED_PRAGMAS = {
+    'busy_timeout': int,
+    'journal_mode': {'delete', 'truncate', 'persist', 'memory', 'wal', 'off'},
+    'synchronous': {'off', 'normal', 'full', 'extra'},
+    'cache_size': int,
+    'mmap_size': int,
+    'temp_store': {'default', 'file', 'memory'},
+    'foreign_keys': {'on', 'off'},
+    'wal_autocheckpoint': int,
+}
+# 只对文件数据库有意义的 PRAGMA
+FILE_ONLY_PRAGMAS = {'journal_mode', 'mmap_size', 'wal_autocheckpoint'}
+
+
+def get_pragmas():
+    """当前生效的 PRAGMA 配置"""
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', DEFAULT_PRAGMAS)
+    for name, value in pragmas.items():
+        allowed = ALLOWED_PRAGMAS.get(name)
+        if allowed is None:
+            raise ValueError(f'不支持的 SQLite PRAGMA：{name}')
+        if allowed is int:
+            if not isinstance(value, int) or isinstance(value, bool):
+                raise ValueError(f'PRAGMA {name} 的取值必须是整数：{value!r}')
+        elif str(value).lower() not in allowed:
+            raise ValueError(f'PRAGMA {name} 的取值无效：{value!r}')
+    return pragmas
+
+
+def apply_pragmas(connection):
+    """对一个 SQLite 连接执行配置的 PRAGMA"""
+    if connection.vendor != 'sqlite':
+        return
+    in_memory = connection.is_in_memory_db()
+    for name, value in get_pragmas().items():
+        if in_memory and name in FILE_ONLY_PRAGMAS:
+            continue
+        # 直接使用底层连接，避免经过 execute_wrapper 和查询日志
+        result = connection.connection.execute(f'PRAGMA {name} = {value}').fetchone()
+        if name == 'journal_mode' and result and result[0].lower() != str(value).lower():
+            logger.warning('SQLite journal_mode 设置为 %s 失败，当前为 %s', value, result[0])
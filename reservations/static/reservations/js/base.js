@@ -0,0 +1,74 @@
+// 页面加载动画
+document.addEventListener('DOMContentLoaded', function() {
+    // 为卡片添加延迟动画
+    const cards = document.querySelectorAll('.lab-card');
+    cards.forEach((card, index) => {
+        card.style.animationDelay = `${index * 0.1}s`;
+    });
+
+    // 平滑滚动
+    document.querySelectorAll('a[href^="#"]').forEach(anchor => {
+        anchor.addEventListener('click', function (e) {
+            e.preventDefault();
+            const target = document.querySelector(this.getAttribute('href'));
+            if (target) {
+                target.scrollIntoView({
+                    behavior: 'smooth',
+                    block: 'start'
+                });
+            }
+        });
+    });
+
+    // 搜索框焦点效果
+    const searchBox = document.querySelector('.search-box');
+    if (searchBox) {
+        searchBox.addEventListener('focus', function() {
+            this.parentElement.style.transform = 'scale(1.02)';
+        });
+        searchBox.addEventListener('blur', function() {
+            this.parentElement.style.transform = 'scale(1)';
+        });
+    }
+});
+
+// 卡片悬停效果增强
+document.addEventListener('DOMContentLoaded', function() {
+    const labCards = document.querySelectorAll('.lab-card');
+    labCards.forEach(card => {
+        card.addEventListener('mouseenter', function() {
+            this.style.transform = 'translateY(-10px) scale(1.02)';
+        });
+        card.addEventListener('mouseleave', function() {
+            this.style.transform = 'translateY(0) scale(1)';
+        });
+    });
+});
+
+// 分类筛选功能
+document.addEventListener('DOMContentLoaded', function() {
+    const categoryButtons = document.querySelectorAll('.category-btn');
+    const searchForm = document.getElementById('searchForm');
+    const categoryInput = document.querySelector('input[name="category"]');
+
+    categoryButtons.forEach(button => {
+        button.addEventListener('click', function(e) {
+            e.preventDefault();
+
+            // 更新按钮状态
+            categoryButtons.forEach(btn => btn.classList.remove('active'));
+            this.classList.add('active');
+
+            // 更新隐藏字段
+            const category = this.getAttribute('data-category');
+            if (categoryInput) {
+                categoryInput.value = category;
+            }
+
+            // 提交表单
+            if (searchForm) {
+                searchForm.submit();
+            }
+        });
+    });
+});
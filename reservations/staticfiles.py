@@ -0,0 +1,182 @@
+"""
+静态资源
+
+- 第三方前端库（Bootstrap、Font Awesome）固定版本，由 vendor_static 管理命令下载到
+  reservations/static/reservations/vendor/ 并随代码提交；模板通过 {% vendor_static %} 引用。
+  文件缺失时只有 settings.VENDOR_STATIC_CDN_FALLBACK 为 True 才回退到 CDN 地址，
+  系统检查会列出缺失的文件（回退开启时为警告，否则为错误）。
+- CompressedManifestStaticFilesStorage 在 collectstatic 时生成带内容哈希的文件名，
+  并为文本类文件额外写入 .gz 和 .br（需安装 brotli）压缩版本。
+- serve_static_asset() 供 StaticAssetsMiddleware 在生产环境直接提供 STATIC_ROOT 中的文件：
+  按 Accept-Encoding 选择预压缩版本，带哈希的文件名使用长期缓存（immutable）。
+"""
+import gzip
+import mimetypes
+import os
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core import checks
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.http import FileResponse, HttpResponseNotModified
+from django.templatetags.static import static
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+VENDOR_DIR = 'reservations/vendor'
+# 包名 -> (CDN 根地址, 需要的文件)；Font Awesome 的 CSS 通过相对路径引用 webfonts 下的字体
+VENDOR_PACKAGES = {
+    'bootstrap': ('https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/', [
+        'css/bootstrap.min.css',
+        'js/bootstrap.bundle.min.js',
+    ]),
+    'fontawesome': ('https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/', [
+        'css/all.min.css',
+        'webfonts/fa-brands-400.ttf',
+        'webfonts/fa-brands-400.woff2',
+        'webfonts/fa-regular-400.ttf',
+        'webfonts/fa-regular-400.woff2',
+        'webfonts/fa-solid-900.ttf',
+        'webfonts/fa-solid-900.woff2',
+        'webfonts/fa-v4compatibility.ttf',
+        'webfonts/fa-v4compatibility.woff2',
+    ]),
+}
+
+# 值得预压缩的文本类文件（woff2、图片等本身已压缩）
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.json', '.map', '.svg', '.txt', '.html', '.xml', '.ttf', '.eot', '.ico'}
+COMPRESS_MIN_SIZE = 256
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+
+def _cdn_fallback():
+    return getattr(settings, 'VENDOR_STATIC_CDN_FALLBACK', False)
+
+
+@lru_cache(maxsize=None)
+def vendor_url(path):
+    """第三方资源的地址：使用本地静态文件，文件缺失且开启 VENDOR_STATIC_CDN_FALLBACK 时使用 CDN"""
+    package, _, name = path.partition('/')
+    cdn_root, _files = VENDOR_PACKAGES[package]
+    local = f'{VENDOR_DIR}/{path}'
+    if _cdn_fallback() and not finders.find(local):
+        return cdn_root + name
+    return static(local)
+
+
+def missing_vendor_files():
+    """尚未下载到静态文件目录的第三方资源"""
+    return [
+        f'{package}/{name}'
+        for package, (_cdn_root, files) in VENDOR_PACKAGES.items()
+        for name in files
+        if not finders.find(f'{VENDOR_DIR}/{package}/{name}')
+    ]
+
+
+def check_vendor_files(app_configs, **kwargs):
+    """系统检查：第三方资源是否已随代码提交"""
+    missing = missing_vendor_files()
+    if not missing:
+        return []
+    hint = '执行 python manage.py vendor_static 下载并提交这些文件'
+    if _cdn_fallback():
+        return [checks.Warning(
+            f'{len(missing)} 个第三方静态文件缺失，页面从 CDN 加载：{", ".join(missing)}',
+            hint=hint, id='reservations.W001',
+        )]
+    return [checks.Error(
+        f'{len(missing)} 个第三方静态文件缺失且未开启 VENDOR_STATIC_CDN_FALLBACK：{", ".join(missing)}',
+        hint=hint, id='reservations.E001',
+    )]
+
+
+def compress_variants(data):
+    """返回 [(扩展名, 压缩后的内容)]，只保留比原文件明显更小的版本"""
+    variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(data, quality=11)))
+    return [(suffix, content) for suffix, content in variants if len(content) < len(data) * 0.95]
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """带哈希文件名的静态文件存储，collectstatic 时同时生成 gzip / brotli 压缩版本"""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in set(paths) | set(self.hashed_files.values()):
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                self._write_variants(name)
+
+    def _write_variants(self, name):
+        with self.open(name) as f:
+            data = f.read()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return
+        for suffix, content in compress_variants(data):
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(content))
+
+
+def _accepts(request, encoding):
+    """Accept-Encoding 是否接受 encoding：q=0 表示拒绝，未列出时按 * 的设置"""
+    weights = {}
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, *params = (part.strip() for part in item.split(';'))
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding:
+            weights[coding.lower()] = q
+    return weights.get(encoding, weights.get('*', 0.0)) > 0
+
+
+def serve_static_asset(request, root, name, immutable, max_age):
+    """提供 root 下的静态文件 name，文件不存在时返回 None
+
+    immutable 为 True（带哈希的文件名）时允许浏览器长期缓存，否则只缓存较短时间。
+    """
+    if name.endswith(('.gz', '.br')):
+        return None
+    try:
+        path = safe_join(root, name)
+    except SuspiciousFileOperation:
+        return None
+    if not os.path.isfile(path):
+        return None
+
+    mtime = os.stat(path).st_mtime
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), mtime):
+        return HttpResponseNotModified()
+
+    served, encoding = path, None
+    for candidate, suffix in ENCODINGS:
+        if _accepts(request, candidate) and os.path.isfile(path + suffix):
+            served, encoding = path + suffix, candidate
+            break
+    content_type, _ = mimetypes.guess_type(path)
+    response = FileResponse(open(served, 'rb'), content_type=content_type or 'application/octet-stream')
+    response['Last-Modified'] = http_date(mtime)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    response['Cache-Control'] = f'public, max-age={max_age}, immutable' if immutable else 'public, max-age=60'
+    return response
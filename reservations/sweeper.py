@@ -0,0 +1,72 @@
+"""
+预约状态定期清理
+
+SweepRunner 在后台线程中每隔 interval 秒执行一次 services.sweep_reservations()。
+settings.RESERVATION_SWEEP_INTERVAL 设置为秒数时，应用启动后在每个进程中自动运行；
+未设置时可用 cron 等定期执行 python manage.py sweep_reservations。
+多个进程同时清理是安全的：UPDATE 条件中重新检查原状态，同一条预约只会被处理一次。
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .services import SWEEP_BATCH_SIZE, sweep_reservations
+
+logger = logging.getLogger('reservations.sweeper')
+
+
+class SweepRunner:
+    """后台定期清理已结束的预约"""
+
+    def __init__(self, interval, batch_size=SWEEP_BATCH_SIZE):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='reservation-sweeper', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run_once(self):
+        """执行一次清理，出错时记录日志而不中断后续的定期执行"""
+        try:
+            counts = sweep_reservations(batch_size=self.batch_size)
+        except Exception:
+            logger.exception('预约状态清理失败')
+            return None
+        if any(counts.values()):
+            logger.info('预约状态清理：已完成 %s 条，超时取消 %s 条', counts['approved'], counts['pending'])
+        return counts
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.run_once()
+            # 后台线程不经过请求周期，需自行关闭失效的数据库连接
+            close_old_connections()
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def start_sweeper():
+    """按 RESERVATION_SWEEP_INTERVAL 启动本进程的定期清理（未设置时不启动），返回 SweepRunner"""
+    global _runner
+    interval = getattr(settings, 'RESERVATION_SWEEP_INTERVAL', None)
+    if not interval:
+        return None
+    with _runner_lock:
+        if _runner is None:
+            _runner = SweepRunner(interval)
+            _runner.start()
+    return _runner
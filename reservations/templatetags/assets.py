@@ -0,0 +1,11 @@
+from django import template
+
+from ..staticfiles import vendor_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def vendor_static(path):
+    """第三方前端资源地址，如 {% vendor_static 'fontawesome/css/all.min.css' %}"""
+    return vendor_url(path)
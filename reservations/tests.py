@@ -1,3 +1,1961 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import json
+import logging
+import os
+import tempfile
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime, time, timedelta
+from importlib import import_module
+from io import StringIO
+from time import perf_counter, sleep
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.admin import helpers
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, connection, connections, transaction
+from django.db.models import Q
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .availability import build_week_grid, get_week_grid
+from .benchmark import compare_reports, measure_concurrency, parse_scales, run_benchmark
+from .caching import get_version, versioned_key
+from .exports import export_queryset, stream_export
+from .freshness import touch_laboratory_schedule
+from .importing import CatalogueImportError, import_catalogue, read_catalogue
+from .events import InProcessBroker, get_broker, laboratory_channel, publish_occupancy, reset_broker
+from .catalogue import CATALOGUE_NAMESPACE, active_laboratories, category_facets, get_laboratory, search_laboratories
+from . import urls, views
+from .models import (
+    Laboratory, Reservation, ReservationSeries, ScheduleTemplate, ScheduleTemplateSlot, TimeSlot, UserProfile,
+)
+from .occupancy import DayOccupancy, occupancy_index
+from .pagination import decode_cursor, keyset_paginate
+from .querybudget import QueryBudgetExceeded, query_budget
+from .schedules import ScheduleTable, compile_schedules, schedule_states, schedule_table, weekly_schedule
+from .search import build_match_query, search_index_available, segment
+from .services import (
+    BookingConflict, SeriesConflict, book_reservation, book_series, bulk_review, cancel_series, ended_reservations,
+    save_reservation, sweep_reservations,
+)
+from .sqlite_tuning import apply_pragmas
+from .staticfiles import check_vendor_files, vendor_url
+from .sweeper import SweepRunner
+
+logger = logging.getLogger('reservations.tests')
+
+
+class ReservationIndexTests(TestCase):
+    """预约表索引测试"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass12345')
+        cls.laboratory = Laboratory.objects.create(name='物理实验室A', location='理科楼301', capacity=30)
+        tomorrow = timezone.now().date() + timedelta(days=1)
+        Reservation.objects.bulk_create([
+            Reservation(
+                user=cls.user, laboratory=cls.laboratory, date=tomorrow + timedelta(days=i),
+                start_time=time(8 + i % 10), end_time=time(9 + i % 10), purpose='实验', status=status,
+            )
+            for i, status in enumerate(['pending', 'approved', 'rejected', 'cancelled'] * 25)
+        ])
+
+    def test_conflict_query_uses_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN 仅适用于 SQLite')
+        conflicts = Reservation.objects.filter(
+            laboratory=self.laboratory,
+            date=timezone.now().date() + timedelta(days=1),
+            status__in=Reservation.ACTIVE_STATUSES,
+            start_time__lt=time(10),
+            end_time__gt=time(9),
+        )
+        plan = conflicts.explain()
+        self.assertIn('USING', plan)
+        self.assertRegex(plan, r'resv_(active_slot|lab_date_status)_idx')
+
+    def test_listing_queries_use_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN 仅适用于 SQLite')
+        plan = Reservation.objects.filter(user=self.user).order_by('-created_at').explain()
+        self.assertIn('resv_user_created_idx', plan)
+        self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plan)
+        plan = Reservation.objects.filter(status='pending').order_by('-created_at').explain()
+        self.assertIn('resv_status_created_idx', plan)
+        self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plan)
+
+
+class OccupancyIndexTests(TestCase):
+    """内存占用索引测试"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass12345')
+        cls.laboratory = Laboratory.objects.create(name='化学实验室B', location='理科楼205', capacity=25)
+        cls.day = timezone.now().date() + timedelta(days=1)
+
+    def setUp(self):
+        occupancy_index.invalidate()
+
+    def reserve(self, start, end, status='pending'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Reservation.objects.create(
+                user=self.user, laboratory=self.laboratory, date=self.day,
+                start_time=time(start), end_time=time(end), purpose='实验', status=status,
+            )
+
+    def test_day_occupancy_overlaps(self):
+        bucket = DayOccupancy([(time(8), time(12), 1), (time(9), time(10), 2), (time(14), time(16), 3)], 0)
+        self.assertTrue(bucket.overlaps(time(11), time(13)))
+        self.assertTrue(bucket.overlaps(time(15), time(17)))
+        self.assertFalse(bucket.overlaps(time(12), time(14)))
+        self.assertFalse(bucket.overlaps(time(16), time(18)))
+        bucket.remove(1)
+        self.assertFalse(bucket.overlaps(time(11), time(13)))
+
+    def test_index_follows_signals(self):
+        self.assertTrue(occupancy_index.is_available(self.laboratory.id, self.day, time(9), time(10)))
+        reservation = self.reserve(9, 11)
+        self.assertFalse(occupancy_index.is_available(self.laboratory.id, self.day, time(10), time(12)))
+
+        reservation.status = 'cancelled'
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation.save()
+        self.assertTrue(occupancy_index.is_available(self.laboratory.id, self.day, time(10), time(12)))
+
+        other = self.reserve(13, 15, status='approved')
+        self.assertFalse(occupancy_index.is_available(self.laboratory.id, self.day, time(14), time(16)))
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+        self.assertTrue(occupancy_index.is_available(self.laboratory.id, self.day, time(14), time(16)))
+
+    def test_check_availability_skips_overlap_query_when_warm(self):
+        self.reserve(9, 11)
+        url = reverse('reservations:check_availability')
+        params = {'lab_id': self.laboratory.id, 'date': self.day.isoformat(), 'start_time': '10:00', 'end_time': '12:00'}
+        self.assertFalse(self.client.get(url, params).json()['available'])
+        # 索引已加载，只剩实验室存在性查询
+        with self.assertNumQueries(1):
+            response = self.client.get(url, dict(params, start_time='11:00'))
+        self.assertTrue(response.json()['available'])
+
+
+class BookingServiceTests(TestCase):
+    """预约写入服务测试"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass12345')
+        cls.laboratory = Laboratory.objects.create(name='计算机实验室C', location='信息楼102', capacity=40)
+        cls.day = timezone.now().date() + timedelta(days=1)
+
+    def setUp(self):
+        occupancy_index.invalidate()
+
+    def build(self, start, end):
+        return Reservation(
+            user=self.user, laboratory=self.laboratory, date=self.day,
+            start_time=time(start), end_time=time(end), purpose='实验',
+        )
+
+    def test_book_reservation_rejects_overlap(self):
+        book_reservation(self.build(9, 11))
+        occupancy_index.invalidate()
+        with self.assertRaises(BookingConflict):
+            book_reservation(self.build(10, 12))
+        book_reservation(self.build(11, 12))
+        self.assertEqual(Reservation.objects.count(), 2)
+
+    def test_stale_index_hit_is_confirmed_against_database(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            blocking = book_reservation(self.build(9, 11))
+        self.assertFalse(occupancy_index.is_available(self.laboratory.id, self.day, time(10), time(12)))
+        # 其他进程取消了该预约：本进程收不到信号，索引仍显示占用
+        Reservation.objects.filter(pk=blocking.pk).update(status='cancelled')
+        self.assertFalse(occupancy_index.is_available(self.laboratory.id, self.day, time(10), time(12)))
+        book_reservation(self.build(10, 12))
+        self.assertEqual(Reservation.objects.filter(status='pending').count(), 1)
+        # 数据库确认重叠时仍然拒绝
+        with self.assertRaises(BookingConflict):
+            book_reservation(self.build(11, 12))
+
+    def test_database_guard_rejects_overlap(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('触发器仅安装在 SQLite 上')
+        self.build(9, 11).save()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.build(10, 12).save()
+        cancelled = self.build(10, 12)
+        cancelled.status = 'cancelled'
+        cancelled.save()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Reservation.objects.filter(pk=cancelled.pk).update(status='approved')
+
+    def test_save_reservation_rejects_overlap(self):
+        book_reservation(self.build(9, 11))
+        rejected = self.build(10, 12)
+        rejected.status = 'rejected'
+        rejected.save()
+        rejected.status = 'approved'
+        with self.assertRaises(BookingConflict):
+            save_reservation(rejected)
+        rejected.start_time, rejected.end_time = time(11), time(12)
+        save_reservation(rejected)
+        self.assertEqual(Reservation.objects.get(pk=rejected.pk).status, 'approved')
+
+    def test_approval_and_admin_edit_report_overlap(self):
+        admin = User.objects.create_superuser(username='admin', password='pass12345')
+        self.client.force_login(admin)
+        book_reservation(self.build(9, 11))
+        rejected = self.build(10, 12)
+        rejected.status = 'rejected'
+        rejected.save()
+
+        response = self.client.get(reverse('reservations:approve_reservation', args=[rejected.id]), follow=True)
+        self.assertContains(response, '该时间段已有其他有效预约，无法批准。')
+        self.assertEqual(Reservation.objects.get(pk=rejected.pk).status, 'rejected')
+
+        # 后台表单校验时发现冲突：重新显示表单和错误，保留已填写的内容
+        data = {
+            'user': self.user.id, 'laboratory': self.laboratory.id, 'date': self.day.isoformat(),
+            'start_time': '10:00', 'end_time': '12:00', 'purpose': '后台修改', 'status': 'approved', 'admin_comment': '',
+        }
+        url = reverse('admin:reservations_reservation_change', args=[rejected.id])
+        response = self.client.post(url, data)
+        self.assertContains(response, '该时间段与其他有效预约冲突')
+        self.assertContains(response, '后台修改')
+        self.assertEqual(Reservation.objects.get(pk=rejected.pk).status, 'rejected')
+        count = Reservation.objects.count()
+        response = self.client.post(reverse('admin:reservations_reservation_add'), data)
+        self.assertContains(response, '该时间段与其他有效预约冲突')
+        self.assertContains(response, '后台修改')
+        self.assertEqual(Reservation.objects.count(), count)
+
+        # 校验通过后、保存前被抢占时由触发器拒绝
+        with mock.patch('reservations.forms.overlapping_reservations', return_value=Reservation.objects.none()):
+            response = self.client.post(url, data)
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+        self.assertEqual(Reservation.objects.get(pk=rejected.pk).status, 'rejected')
+        self.assertContains(self.client.get(url), '与其他有效预约冲突，未保存。')
+
+
+class BookingStressTests(TransactionTestCase):
+    """高并发预约压力测试：同一实验室不得出现重复预约
+
+    各线程相当于不同的工作进程：绕过进程内的实验室锁和占用索引，
+    所有请求都进入数据库事务，由重叠触发器（其他数据库为行锁后的检查）拒绝落败者。
+    """
+
+    threads = 16
+    attempts = 25
+
+    def test_concurrent_bookings_never_overlap(self):
+        users = User.objects.bulk_create(User(username=f'student{i}') for i in range(self.threads))
+        laboratory = Laboratory.objects.create(name='物理实验室A', location='理科楼301', capacity=30)
+        start_day = timezone.now().date() + timedelta(days=1)
+
+        def worker(user, seed):
+            counts = {'booked': 0, 'rejected_by_db': 0}
+            try:
+                for n in range(self.attempts):
+                    # 所有线程争抢同一批时间段，并故意制造错位重叠
+                    hour = 8 + (seed + n) % 12
+                    reservation = Reservation(
+                        user=user, laboratory=laboratory, date=start_day + timedelta(days=n % 3),
+                        start_time=time(hour, 30 * (seed % 2)), end_time=time(hour + 1, 30 * (seed % 2)),
+                        purpose='压力测试',
+                    )
+                    # 共享缓存的内存数据库在写冲突时立即报 table is locked，重试即可
+                    while True:
+                        try:
+                            book_reservation(reservation)
+                        except BookingConflict as exc:
+                            if isinstance(exc.__cause__, IntegrityError):
+                                counts['rejected_by_db'] += 1
+                        except OperationalError:
+                            if perf_counter() > deadline:
+                                raise
+                            sleep(0.001)
+                            continue
+                        else:
+                            counts['booked'] += 1
+                        break
+            finally:
+                connections.close_all()
+            return counts
+
+        started = perf_counter()
+        deadline = started + 60
+        with mock.patch('reservations.services._lab_lock', lambda lab_id: nullcontext()), \
+                mock.patch.object(occupancy_index, 'is_available', return_value=True), \
+                ThreadPoolExecutor(max_workers=self.threads) as executor:
+            results = list(executor.map(worker, users, range(self.threads)))
+        elapsed = perf_counter() - started
+        booked = sum(counts['booked'] for counts in results)
+
+        rows = list(
+            Reservation.objects.filter(laboratory=laboratory)
+            .order_by('date', 'start_time')
+            .values_list('date', 'start_time', 'end_time')
+        )
+        self.assertEqual(len(rows), booked)
+        self.assertGreater(booked, 0)
+        for previous, current in zip(rows, rows[1:]):
+            if previous[0] == current[0]:
+                self.assertLessEqual(previous[2], current[1], f'重复预约: {previous} / {current}')
+        if connection.vendor == 'sqlite':
+            # 没有进程内的预检查，落败的请求只能由触发器拒绝
+            self.assertEqual(
+                sum(counts['rejected_by_db'] for counts in results), self.threads * self.attempts - booked,
+            )
+
+        attempts = self.threads * self.attempts
+        logger.info(
+            '预约压力测试: %s 次请求, 成功 %s 次, %.2fs, %.0f 次请求/秒, %.0f 次预约/秒',
+            attempts, booked, elapsed, attempts / elapsed, booked / elapsed,
+        )
+
+
+class BatchAvailabilityTests(TestCase):
+    """批量可用性接口测试"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass12345')
+        cls.labs = [
+            Laboratory.objects.create(name=f'实验室{i}', location='理科楼', capacity=20) for i in range(3)
+        ]
+        cls.day = timezone.now().date() + timedelta(days=1)
+        for lab in cls.labs:
+            Reservation.objects.create(
+                user=cls.user, laboratory=lab, date=cls.day,
+                start_time=time(9), end_time=time(11), purpose='实验',
+            )
+
+    def setUp(self):
+        occupancy_index.invalidate()
+
+    def post(self, probes):
+        return self.client.post(
+            reverse('reservations:check_availability_batch'),
+            data={'probes': probes}, content_type='application/json',
+        )
+
+    def test_batch_resolves_probes_with_grouped_queries(self):
+        probes = []
+        for lab in self.labs:
+            for day_offset in range(3):
+                day = (self.day + timedelta(days=day_offset)).isoformat()
+                probes.append({'lab_id': lab.id, 'date': day, 'start_time': '10:00', 'end_time': '12:00'})
+        probes.append({'lab_id': 999999, 'date': self.day.isoformat(), 'start_time': '10:00', 'end_time': '12:00'})
+        probes.append({'lab_id': self.labs[0].id, 'date': 'tomorrow'})
+
+        # 实验室一次、预约一次
+        with self.assertNumQueries(2):
+            response = self.post(probes)
+        results = response.json()['results']
+
+        self.assertEqual(len(results), len(probes))
+        self.assertEqual([result['available'] for result in results[:3]], [False, True, True])
+        self.assertEqual(results[-2]['message'], '实验室不存在')
+        self.assertEqual(results[-1]['message'], '参数不完整')
+
+        # 占用索引已加载，再次查询只需验证实验室
+        with self.assertNumQueries(1):
+            self.post(probes)
+
+    def test_batch_rejects_malformed_body(self):
+        response = self.client.post(
+            reverse('reservations:check_availability_batch'), data='[', content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.post('not a list').status_code, 400)
+        self.assertEqual(self.client.get(reverse('reservations:check_availability_batch')).status_code, 405)
+
+
+class WeekGridTests(TestCase):
+    """实验室周占用表测试"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass12345')
+        cls.laboratory = Laboratory.objects.create(name='生物实验室D', location='生科楼401', capacity=20)
+        TimeSlot.objects.bulk_create([
+            TimeSlot(laboratory=cls.laboratory, weekday=weekday, start_time=time(start), end_time=time(start + 2))
+            for weekday in range(7)
+            for start in (8, 10, 14, 16)
+        ])
+        cls.today = timezone.now().date()
+        cls.day = cls.today + timedelta(days=1)
+        Reservation.objects.create(
+            user=cls.user, laboratory=cls.laboratory, date=cls.day,
+            start_time=time(9), end_time=time(11), purpose='实验',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_build_week_grid_marks_overlapping_slots(self):
+        grid = build_week_grid(self.laboratory.id, self.today)
+        self.assertEqual(len(grid['days']), 7)
+        day = grid['days'][1]
+        self.assertEqual(day['date'], self.day)
+        self.assertEqual([slot['reserved'] for slot in day['slots']], [True, True, False, False])
+        self.assertEqual(day['free_slots'], 2)
+        self.assertEqual(grid['days'][0]['free_slots'], 4)
+
+    def test_week_grid_is_cached_until_reservation_changes(self):
+        url = reverse('reservations:laboratory_week_grid', args=[self.laboratory.id])
+        self.client.get(url)
+        # 周占用表已缓存，只剩实验室时间戳查询
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.json()['days'][1]['free_slots'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Reservation.objects.filter(laboratory=self.laboratory).get().delete()
+        self.assertEqual(self.client.get(url).json()['days'][1]['free_slots'], 4)
+
+        # 其他进程写入：本进程收不到任何失效通知，只能从数据库中的排期时间得知变化
+        Reservation.objects.bulk_create([Reservation(
+            user=self.user, laboratory=self.laboratory, date=self.day,
+            start_time=time(14), end_time=time(15), purpose='实验',
+        )])
+        touch_laboratory_schedule([self.laboratory.id])
+        self.assertEqual(self.client.get(url).json()['days'][1]['free_slots'], 3)
+
+    def test_laboratory_detail_renders_grid(self):
+        response = self.client.get(reverse('reservations:laboratory_detail', args=[self.laboratory.id]))
+        self.assertContains(response, '09:00-11:00')
+        self.assertEqual(len(response.context['week_grid']['days']), 7)
+
+
+class CategoryFacetTests(TestCase):
+    """实验室分类统计测试"""
+
+    @classmethod
+    def setUpTestData(cls):
+        categories = ['physics', 'physics', 'chemistry', 'computer', 'computer', 'computer']
+        for i, category in enumerate(categories):
+            Laboratory.objects.create(name=f'实验室{i}', category=category, location='理科楼', capacity=20)
+        Laboratory.objects.create(name='停用实验室', category='biology', location='生科楼', capacity=20, is_active=False)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_category_facets_counts_active_labs(self):
+        # 目录时间戳 + 实验室列表
+        with self.assertNumQueries(2):
+            category_counts, total_count = category_facets()
+        self.assertEqual(total_count, 6)
+        self.assertEqual(list(category_counts), ['physics', 'chemistry', 'computer'])
+        self.assertEqual(category_counts['computer']['count'], 3)
+        self.assertEqual(category_counts['physics']['color'], '#6f42c1')
+
+        category_counts, total_count = category_facets('实验室1')
+        self.assertEqual(total_count, 1)
+
+    def test_laboratory_list_query_count_is_constant(self):
+        url = reverse('reservations:laboratory_list')
+        self.client.get(url)
+        # 实验室列表和分类统计均已缓存，只剩条件请求的时间戳查询
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'category': 'computer'})
+        self.assertEqual(len(response.context['laboratories']), 3)
+        self.assertEqual(response.context['total_count'], 6)
+
+    def test_laboratory_write_invalidates_facets(self):
+        category_facets()
+        with self.captureOnCommitCallbacks(execute=True):
+            Laboratory.objects.create(name='新实验室', category='medical', location='医学楼', capacity=10)
+        category_counts, total_count = category_facets()
+        self.assertEqual(total_count, 7)
+        self.assertIn('medical', category_counts)
+
+
+class LaboratorySearchTests(TestCase):
+    """实验室全文检索测试"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.physics = Laboratory.objects.create(
+            name='物理实验室A', category='physics', location='理科楼301', capacity=30,
+            equipment='示波器、信号发生器', description='基础物理实验',
+        )
+        cls.optics = Laboratory.objects.create(
+            name='光学实验室', category='physics', location='理科楼302', capacity=20,
+            equipment='激光器', description='适用于物理光学实验',
+        )
+        cls.computer = Laboratory.objects.create(
+            name='计算机实验室C', category='computer', location='信息楼102', capacity=40,
+            equipment='Workstation cluster', description='编程与数据分析',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, query):
+        return list(search_laboratories(Laboratory.objects.all(), query))
+
+    def test_segment_and_match_query(self):
+        self.assertEqual(segment('物理实验室A'), '物理 理实 实验 验室 室 A')
+        self.assertEqual(build_match_query('实验室 work'), '"实验 验室" "work" *')
+        self.assertEqual(build_match_query('理'), '"理" *')
+        self.assertEqual(build_match_query('" OR *'), '"OR" *')
+        self.assertEqual(build_match_query('"*'), '')
+
+    def test_search_index_migration_keeps_own_segmenter(self):
+        # 迁移使用创建索引时的分词规则副本，不导入 reservations.search
+        migration = import_module('reservations.migrations.0005_laboratory_search_index')
+        self.assertNotIn('search', vars(migration))
+        for text in ('物理实验室A', '理科楼301 Workstation', ''):
+            self.assertEqual(migration.segment(text), segment(text))
+
+    def test_search_matches_cjk_fragments_and_prefixes(self):
+        if not search_index_available():
+            self.skipTest('当前数据库不支持 FTS5')
+        self.assertEqual(self.search('示波'), [self.physics])
+        self.assertEqual(self.search('信息楼'), [self.computer])
+        self.assertEqual(self.search('work'), [self.computer])
+        self.assertEqual(set(self.search('理科楼')), {self.physics, self.optics})
+
+    def test_search_ranks_name_matches_first(self):
+        if not search_index_available():
+            self.skipTest('当前数据库不支持 FTS5')
+        # “物理”出现在物理实验室的名称中，只出现在光学实验室的描述中
+        self.assertEqual(self.search('物理'), [self.physics, self.optics])
+
+    def test_index_follows_laboratory_writes(self):
+        if not search_index_available():
+            self.skipTest('当前数据库不支持 FTS5')
+        self.computer.equipment = '服务器机柜'
+        self.computer.save()
+        self.assertEqual(self.search('机柜'), [self.computer])
+        self.assertEqual(self.search('Workstation'), [])
+        self.computer.delete()
+        self.assertEqual(self.search('机柜'), [])
+
+    def test_rebuild_command_indexes_bulk_created_labs(self):
+        if not search_index_available():
+            self.skipTest('当前数据库不支持 FTS5')
+        Laboratory.objects.bulk_create([Laboratory(name='材料实验室', location='工程楼', capacity=10)])
+        self.assertEqual(self.search('材料'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual([lab.name for lab in self.search('材料')], ['材料实验室'])
+
+    def test_search_views_use_index(self):
+        response = self.client.get(reverse('reservations:laboratory_list_ajax'), {'search': '理科', 'category': 'physics'})
+        self.assertEqual(response.json()['count'], 2)
+        response = self.client.get(reverse('reservations:laboratory_list'), {'search': '示波器'})
+        self.assertEqual(response.context['laboratories'], [self.physics])
+        self.assertEqual(response.context['total_count'], 1)
+
+
+class KeysetPaginationTests(TestCase):
+    """预约列表游标分页测试"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass12345')
+        cls.admin = User.objects.create_user(username='teacher', password='pass12345', is_staff=True)
+        laboratory = Laboratory.objects.create(name='工程实验室E', location='工程楼501', capacity=15)
+        tomorrow = timezone.now().date() + timedelta(days=1)
+        Reservation.objects.bulk_create([
+            Reservation(
+                user=cls.user, laboratory=laboratory, date=tomorrow + timedelta(days=i),
+                start_time=time(9), end_time=time(10), purpose='实验',
+            )
+            for i in range(25)
+        ])
+        # 同一申请时间的记录依靠 id 区分先后
+        Reservation.objects.update(created_at=timezone.now())
+
+    def test_cursor_walks_every_row_once(self):
+        seen = []
+        cursor = None
+        while True:
+            page = keyset_paginate(Reservation.objects.all(), cursor, page_size=10)
+            seen.extend(reservation.pk for reservation in page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, sorted(Reservation.objects.values_list('pk', flat=True), reverse=True))
+        self.assertIsNone(decode_cursor('not-a-cursor'))
+
+    def test_deep_page_uses_index_without_sorting(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN 仅适用于 SQLite')
+        last = Reservation.objects.order_by('-created_at', '-id')[20]
+        queryset = Reservation.objects.filter(user=self.user).order_by('-created_at', '-id').filter(
+            Q(created_at__lt=last.created_at) | Q(created_at=last.created_at, id__lt=last.pk)
+        )
+        plan = queryset[:11].explain()
+        self.assertIn('resv_user_created_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_my_reservations_pages_and_json(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('reservations:my_reservations'), {'page_size': 20})
+        self.assertEqual(len(response.context['reservations']), 20)
+        self.assertTrue(response.context['page'].has_next)
+
+        data = self.client.get(
+            reverse('reservations:my_reservations_ajax'),
+            {'page_size': 20, 'cursor': response.context['page'].next_cursor},
+        ).json()
+        self.assertEqual(data['count'], 5)
+        self.assertIsNone(data['next_cursor'])
+
+    def test_admin_reservations_json(self):
+        self.client.force_login(self.admin)
+        data = self.client.get(reverse('reservations:admin_reservations_ajax'), {'page_size': 5}).json()
+        self.assertEqual(data['count'], 5)
+        self.assertEqual(data['reservations'][0]['user']['username'], 'student')
+        self.assertIsNotNone(data['next_cursor'])
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class QueryBudgetTests(TestCase):
+    """查询数预算测试：每个页面的查询数不随数据量增长"""
+
+    def setUp(self):
+        occupancy_index.invalidate()
+        cache.clear()
+        self.admin = User.objects.create_user(username='teacher', password='pass12345', is_staff=True)
+        UserProfile.objects.create(user=self.admin, student_id='T001', phone='13800138003', department='化学学院')
+        self.laboratory = Laboratory.objects.create(name='物理实验室A', location='理科楼301', capacity=30)
+        self.day = timezone.now().date() + timedelta(days=1)
+        self.rows = 0
+
+    def seed(self, count):
+        """为每类页面追加 count 条相关数据"""
+        for i in range(self.rows, self.rows + count):
+            user = User.objects.create(username=f'student{i}')
+            UserProfile.objects.create(user=user, student_id=f'S{i}', phone='13800138000', department='物理学院')
+            lab = Laboratory.objects.create(name=f'实验室{i}', category='physics', location='理科楼', capacity=20)
+            TimeSlot.objects.create(laboratory=self.laboratory, weekday=i % 7, start_time=time(i % 24), end_time=time(i % 24, 59))
+            for owner, status in ((user, 'pending'), (self.admin, 'approved')):
+                Reservation.objects.create(
+                    user=owner, laboratory=lab if owner is user else self.laboratory, status=status,
+                    date=self.day + timedelta(days=i), start_time=time(9), end_time=time(10), purpose='实验',
+                )
+        self.rows += count
+        occupancy_index.invalidate()
+        cache.clear()
+
+    def requests(self):
+        """reservations/urls.py 中每个路由对应的请求"""
+        pending = Reservation.objects.create(
+            user=self.admin, laboratory=self.laboratory, date=self.day, start_time=time(20), end_time=time(21), purpose='实验',
+        )
+        series = ReservationSeries.objects.create(
+            user=self.admin, laboratory=self.laboratory, start_date=self.day, end_date=self.day,
+            start_time=time(22), end_time=time(23), purpose='实验',
+        )
+        kwargs = {'lab_id': self.laboratory.id, 'reservation_id': pending.id, 'series_id': series.id}
+        params = {
+            'check_availability': {
+                'lab_id': self.laboratory.id, 'date': self.day.isoformat(), 'start_time': '10:00', 'end_time': '11:00',
+            },
+            'laboratory_list': {'search': '实验室'},
+        }
+        for pattern in urls.urlpatterns:
+            route_kwargs = {name: kwargs[name] for name in pattern.pattern.converters}
+            url = reverse(f'reservations:{pattern.name}', kwargs=route_kwargs)
+            yield pattern.name, url, params.get(pattern.name, {})
+            # 变更类请求每轮都换一条新的待审核预约
+            if pattern.name in ('cancel_reservation', 'approve_reservation'):
+                pending.refresh_from_db()
+                pending.delete()
+                pending = Reservation.objects.create(
+                    user=self.admin, laboratory=self.laboratory, date=self.day,
+                    start_time=time(20), end_time=time(21), purpose='实验',
+                )
+                kwargs['reservation_id'] = pending.id
+
+    def measure(self):
+        counts = {}
+        for name, url, params in self.requests():
+            self.client.force_login(self.admin)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, params)
+            self.assertLess(response.status_code, 500, name)
+            counts[name] = len(queries)
+        return counts
+
+    def test_query_budget_context_manager(self):
+        with query_budget(1) as budget:
+            Laboratory.objects.count()
+        self.assertEqual(budget.count, 1)
+        with self.assertRaises(QueryBudgetExceeded):
+            with query_budget(1):
+                Laboratory.objects.count()
+                Laboratory.objects.count()
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.seed(2)
+        small = self.measure()
+        self.seed(15)
+        large = self.measure()
+        self.assertEqual(set(small), {pattern.name for pattern in urls.urlpatterns})
+        self.assertEqual(small, large)
+
+
+class BulkReviewTests(TestCase):
+    """批量审核测试"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass12345')
+        cls.admin = User.objects.create_user(username='teacher', password='pass12345', is_staff=True)
+        cls.laboratory = Laboratory.objects.create(name='电子实验室', location='工程楼', capacity=20)
+        cls.day = timezone.now().date() + timedelta(days=1)
+
+    def reserve(self, start, end, status='pending', day=None):
+        reservation = Reservation(
+            user=self.user, laboratory=self.laboratory, date=day or self.day,
+            start_time=time(start), end_time=time(end), purpose='实验', status=status,
+        )
+        # 绕过 save() 的校验和数据库触发器，构造历史遗留的重叠/过期数据
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('DROP TRIGGER IF EXISTS reservations_reservation_overlap_insert')
+        Reservation.objects.bulk_create([reservation])
+        return Reservation.objects.latest('id')
+
+    def test_bulk_approve_checks_batch_and_existing_conflicts(self):
+        approved = self.reserve(8, 9, status='approved')
+        clash_existing = self.reserve(8, 10)
+        first = self.reserve(13, 15)
+        clash_batch = self.reserve(14, 16)
+        other_day = self.reserve(14, 16, day=self.day + timedelta(days=1))
+        past = self.reserve(9, 10, day=self.day - timedelta(days=3))
+
+        ids = [clash_existing.id, first.id, clash_batch.id, other_day.id, past.id, approved.id, 999999]
+        with self.assertNumQueries(6):
+            results = bulk_review(ids, 'approve')
+        self.assertEqual(
+            [result['result'] for result in results],
+            ['conflict', 'approved', 'conflict', 'approved', 'past', 'invalid_status', 'not_found'],
+        )
+        statuses = dict(Reservation.objects.values_list('id', 'status'))
+        self.assertEqual(statuses[first.id], 'approved')
+        self.assertEqual(statuses[other_day.id], 'approved')
+        self.assertEqual(statuses[clash_batch.id], 'pending')
+
+    def test_bulk_reject_view(self):
+        pending = [self.reserve(8 + i, 9 + i) for i in range(3)]
+        self.client.force_login(self.admin)
+        response = self.client.post(
+            reverse('reservations:bulk_review_reservations'),
+            {'ids': [reservation.id for reservation in pending], 'action': 'reject'},
+        )
+        self.assertRedirects(response, reverse('reservations:admin_reservations'), fetch_redirect_response=False)
+        self.assertEqual(Reservation.objects.filter(status='rejected').count(), 3)
+
+        response = self.client.post(
+            reverse('reservations:bulk_review_reservations'),
+            data={'ids': [pending[0].id], 'action': 'approve'}, content_type='application/json',
+        )
+        self.assertEqual(response.json()['results'][0]['result'], 'invalid_status')
+        response = self.client.post(
+            reverse('reservations:bulk_review_reservations'),
+            data={'ids': [pending[0].id], 'action': 'delete'}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class QueryInstrumentationTests(TestCase):
+    """SQL 查询统计中间件测试"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Laboratory.objects.create(name='化学实验室', location='理科楼', capacity=20)
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(SQL_INSTRUMENTATION_ENABLED=True, SQL_SLOW_REQUEST_MS=0)
+    def test_headers_and_slow_request_log(self):
+        with self.assertLogs('reservations.sql', level='WARNING') as logs:
+            response = self.client.get(reverse('reservations:laboratory_list'))
+        queries = int(response['X-DB-Queries'])
+        self.assertGreater(queries, 0)
+        self.assertIn(f'desc="{queries} queries"', response['Server-Timing'])
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['event'], 'slow_request')
+        self.assertEqual(record['queries'], queries)
+        self.assertTrue(record['slowest'])
+        self.assertTrue(all(entry['call_site'] for entry in record['slowest']))
+
+    @override_settings(
+        SQL_INSTRUMENTATION_ENABLED=True, SQL_SLOW_REQUEST_MS=0,
+        ASGI_URLCONF='lab_reservation_system.asgi_polled_urls',
+    )
+    async def test_asgi_requests_are_instrumented(self):
+        # 异步视图的 ORM 调用和同步视图都在线程中执行，同样需要计入
+        for name, func in (
+            ('laboratory_list_ajax', views.alaboratory_list_ajax), ('laboratory_list', views.laboratory_list),
+        ):
+            with self.assertLogs('reservations.sql', level='WARNING') as logs:
+                response = await self.async_client.get(reverse(f'reservations:{name}'))
+            self.assertIs(response.asgi_request.resolver_match.func, func)
+            queries = int(response['X-DB-Queries'])
+            self.assertGreater(queries, 0)
+            self.assertIn(f'desc="{queries} queries"', response['Server-Timing'])
+            self.assertEqual(json.loads(logs.records[0].getMessage())['queries'], queries)
+
+    @override_settings(SQL_INSTRUMENTATION_ENABLED=False)
+    def test_disabled(self):
+        response = self.client.get(reverse('reservations:laboratory_list'))
+        self.assertFalse(response.has_header('X-DB-Queries'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+class DatasetBenchmarkTests(TestCase):
+    """合成数据集与性能基准测试"""
+
+    def test_generate_dataset(self):
+        out = StringIO()
+        call_command('generate_dataset', labs=4, users=10, reservations=600, seed=1, batch_size=100, stdout=out)
+        self.assertIn('600 条预约', out.getvalue())
+        self.assertEqual(Laboratory.objects.count(), 4)
+        self.assertFalse(TimeSlot.objects.exists())
+        self.assertEqual(ScheduleTemplateSlot.objects.count(), 7 * 5 + 5 * 5)
+        self.assertEqual(UserProfile.objects.count(), 10)
+        self.assertEqual(Reservation.objects.count(), 600)
+
+        # 有效预约之间没有重叠，过去的预约不处于有效状态
+        active = Reservation.objects.filter(status__in=Reservation.ACTIVE_STATUSES)
+        self.assertFalse(active.filter(date__lt=timezone.now().date()).exists())
+        for reservation in active:
+            self.assertFalse(active.exclude(id=reservation.id).filter(
+                laboratory_id=reservation.laboratory_id, date=reservation.date,
+                start_time__lt=reservation.end_time, end_time__gt=reservation.start_time,
+            ).exists())
+        if search_index_available():
+            lab = Laboratory.objects.first()
+            self.assertIn(lab, search_laboratories(Laboratory.objects.all(), lab.name))
+
+    def test_run_benchmark_covers_every_route(self):
+        report = run_benchmark([(2, 3, 20), (3, 5, 40)], repeat=2, seed=0)
+        self.assertEqual([scale['reservations'] for scale in report['scales']], [20, 40])
+        self.assertEqual(Reservation.objects.exclude(purpose='性能测试').count(), 40)
+        routes = report['scales'][1]['routes']
+        self.assertEqual(set(routes), {pattern.name for pattern in urls.urlpatterns})
+        for name, result in routes.items():
+            self.assertLess(result['status'], 400, name)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        rows = compare_reports(report, report)
+        self.assertTrue(all(row[4] == 0 for row in rows))
+        with self.assertRaises(ValueError):
+            parse_scales('10:100:1000,5:50:500')
+
+
+class SeedSampleDataTests(TestCase):
+    """示例数据批量写入测试"""
+
+    def test_seed_is_idempotent_and_fills_gaps(self):
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('seed_sample_data', '--progress', stdout=out)
+        self.assertIn('时间段：35/35', out.getvalue())
+        self.assertEqual(Laboratory.objects.count(), 5)
+        template = ScheduleTemplate.objects.get()
+        self.assertEqual(template.slots.count(), 7 * 5)
+        self.assertEqual(template.laboratories.count(), 5)
+        self.assertFalse(TimeSlot.objects.exists())
+        self.assertEqual(UserProfile.objects.count(), 3)
+        self.assertTrue(User.objects.get(username='teacher1').check_password('teacher123'))
+        if search_index_available():
+            self.assertEqual(search_laboratories(Laboratory.objects.all(), '工程').count(), 1)
+
+        # 删除部分记录后再次执行只补齐缺失部分，且只查询/写入固定次数
+        ScheduleTemplateSlot.objects.filter(weekday=6).delete()
+        UserProfile.objects.filter(user__username='student2').delete()
+        extra = Laboratory.objects.create(name='数学建模实验室', location='数学楼201', capacity=35)
+        out = StringIO()
+        with self.assertNumQueries(14):
+            call_command('seed_sample_data', '--all-labs', verbosity=0, stdout=out)
+        self.assertEqual(out.getvalue(), '')
+        self.assertEqual(template.slots.count(), 7 * 5)
+        extra.refresh_from_db()
+        self.assertEqual(extra.schedule_template, template)
+        self.assertEqual(weekly_schedule(extra.id).describe(6), '08:00-12:00、14:00-18:00、19:00-21:00')
+        self.assertEqual(UserProfile.objects.count(), 3)
+
+
+class SQLiteTuningTests(TransactionTestCase):
+    """SQLite 连接参数测试"""
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_to_new_connections(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('仅适用于 SQLite')
+        self.assertEqual(self.pragma('busy_timeout'), settings.SQLITE_PRAGMAS['busy_timeout'])
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('temp_store'), 2)
+        with override_settings(SQLITE_PRAGMAS={'busy_timeout': 1234}):
+            apply_pragmas(connection)
+        self.assertEqual(self.pragma('busy_timeout'), 1234)
+        with override_settings(SQLITE_PRAGMAS={'journal_mode': 'wal; DROP TABLE auth_user'}):
+            with self.assertRaises(ValueError):
+                apply_pragmas(connection)
+
+    def test_measure_concurrency(self):
+        result = measure_concurrency(threads=2, duration=0.2, write_ratio=0.5)
+        self.assertGreater(result['reads'] + result['writes'], 0)
+        self.assertEqual(
+            Reservation.objects.filter(purpose='并发测试').count(), result['writes'],
+        )
+
+
+class CatalogueCacheTests(TestCase):
+    """实验室目录缓存测试"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.physics = Laboratory.objects.create(name='物理实验室A', category='physics', location='理科楼301', capacity=30)
+        cls.chemistry = Laboratory.objects.create(name='化学实验室B', category='chemistry', location='理科楼205', capacity=25)
+        Laboratory.objects.create(name='停用实验室', category='biology', location='生科楼', capacity=20, is_active=False)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_warm_cache_refuses_local_memory_backend(self):
+        err = StringIO()
+        call_command('warm_catalogue_cache', stdout=StringIO(), stderr=err)
+        self.assertIn('LocMemCache', err.getvalue())
+        self.assertIsNone(cache.get(versioned_key(CATALOGUE_NAMESPACE, 'laboratories')))
+
+    def test_warm_cache_serves_catalogue_without_queries(self):
+        out = StringIO()
+        with tempfile.TemporaryDirectory() as location, self.settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location,
+        }}):
+            call_command('warm_catalogue_cache', stdout=out)
+            self.assertIn('2 个', out.getvalue())
+            # 周占用表不属于目录缓存，先生成一次
+            get_week_grid(self.physics.id, timezone.now().date())
+            # 每个页面只剩条件请求的时间戳查询
+            with self.assertNumQueries(3):
+                response = self.client.get(reverse('reservations:laboratory_list'), {'category': 'physics'})
+                self.assertEqual(response.context['laboratories'], [self.physics])
+                self.assertEqual(response.context['total_count'], 2)
+                response = self.client.get(reverse('reservations:laboratory_list_ajax'))
+                self.assertEqual(response.json()['count'], 2)
+                self.client.get(reverse('reservations:laboratory_detail', args=[self.physics.id]))
+            # 搜索结果在第一次查询后缓存
+            self.client.get(reverse('reservations:laboratory_list'), {'search': '化学'})
+            with self.assertNumQueries(1):
+                response = self.client.get(reverse('reservations:laboratory_list'), {'search': '化学'})
+            # 第二次请求直接返回匿名用户的整页缓存
+            self.assertIsNone(response.context)
+            self.assertContains(response, '化学实验室B')
+            self.assertNotContains(response, '物理实验室A')
+
+    def test_laboratory_and_timeslot_writes_bump_version(self):
+        inactive = Laboratory.objects.get(is_active=False)
+        self.assertIsNone(get_laboratory(inactive.id))
+        self.assertEqual(len(active_laboratories()), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            inactive.is_active = True
+            inactive.save()
+        self.assertEqual(get_laboratory(inactive.id), inactive)
+        self.assertEqual(len(active_laboratories()), 3)
+
+        version = get_version(CATALOGUE_NAMESPACE)
+        with self.captureOnCommitCallbacks(execute=True):
+            TimeSlot.objects.create(laboratory=self.physics, weekday=0, start_time=time(8), end_time=time(10))
+        self.assertGreater(get_version(CATALOGUE_NAMESPACE), version)
+        response = self.client.get(reverse('reservations:laboratory_detail', args=[999999]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_writes_from_other_processes_reach_catalogue(self):
+        url = reverse('reservations:laboratory_list')
+        self.assertContains(self.client.get(url), '物理实验室A')
+        self.assertEqual(get_laboratory(self.physics.id).capacity, 30)
+        version = get_version(CATALOGUE_NAMESPACE)
+        # 其他进程的修改：本进程收不到信号，目录版本号不变
+        Laboratory.objects.filter(pk=self.physics.pk).update(
+            name='光学实验室', capacity=40, updated_at=timezone.now(),
+        )
+        self.assertEqual(get_version(CATALOGUE_NAMESPACE), version)
+        self.assertIn('光学实验室', [laboratory.name for laboratory in active_laboratories()])
+        self.assertEqual(get_laboratory(self.physics.id).capacity, 40)
+        self.assertEqual(category_facets()[1], 2)
+        response = self.client.get(url)
+        self.assertContains(response, '光学实验室')
+        self.assertNotContains(response, '物理实验室A')
+        response = self.client.get(reverse('reservations:laboratory_list_ajax'))
+        self.assertIn('光学实验室', [laboratory['name'] for laboratory in response.json()['laboratories']])
+
+
+class ConditionalGetTests(TestCase):
+    """ETag / Last-Modified 条件请求测试"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass12345')
+        cls.laboratory = Laboratory.objects.create(name='物理实验室A', category='physics', location='理科楼301', capacity=30)
+        cls.day = timezone.now().date() + timedelta(days=1)
+
+    def setUp(self):
+        cache.clear()
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_catalogue_pages_return_304_until_laboratory_changes(self):
+        for name in ('laboratory_list', 'laboratory_list_ajax'):
+            url = reverse(f'reservations:{name}')
+            response = self.client.get(url)
+            self.assertTrue(response.has_header('Last-Modified'))
+            with self.assertNumQueries(1):
+                self.assertEqual(self.revalidate(url, response).status_code, 304)
+
+        url = reverse('reservations:laboratory_list')
+        response = self.client.get(url)
+        self.laboratory.capacity = 40
+        self.laboratory.save()
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+        # 页面包含用户信息，登录后 ETag 不同
+        response = self.client.get(url)
+        self.client.force_login(self.user)
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+    def test_detail_etag_follows_schedule_changes(self):
+        url = reverse('reservations:laboratory_detail', args=[self.laboratory.id])
+        response = self.client.get(url)
+        self.assertEqual(self.revalidate(url, response).status_code, 304)
+
+        reservation = Reservation.objects.create(
+            user=self.user, laboratory=self.laboratory, date=self.day,
+            start_time=time(9), end_time=time(10), purpose='实验',
+        )
+        response = self.revalidate(url, response)
+        self.assertEqual(response.status_code, 200)
+
+        # 批量审核绕过信号，同样会更新排期时间戳
+        bulk_review([reservation.id], 'reject')
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.laboratory.is_active = False
+            self.laboratory.save()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class PageCacheTests(TestCase):
+    """匿名整页缓存与模板片段缓存测试"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass12345')
+        cls.laboratory = Laboratory.objects.create(name='物理实验室A', category='physics', location='理科楼301', capacity=30)
+        cls.day = timezone.now().date() + timedelta(days=1)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_pages_are_cached_per_query(self):
+        url = reverse('reservations:laboratory_list')
+        self.assertIsNotNone(self.client.get(url).context)
+        # 只剩条件请求的时间戳查询，不再渲染模板
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertIsNone(response.context)
+        self.assertContains(response, '物理实验室A')
+        self.assertIsNotNone(self.client.get(url, {'category': 'physics'}).context)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.laboratory.name = '光学实验室'
+            self.laboratory.save()
+        response = self.client.get(url)
+        self.assertIsNotNone(response.context)
+        self.assertContains(response, '光学实验室')
+
+        # 登录用户不使用整页缓存
+        self.client.force_login(self.user)
+        self.assertIsNotNone(self.client.get(url).context)
+        self.assertIsNotNone(self.client.get(url).context)
+
+    def test_detail_page_follows_reservations(self):
+        url = reverse('reservations:laboratory_detail', args=[self.laboratory.id])
+        self.client.get(url)
+        self.assertIsNone(self.client.get(url).context)
+        with self.captureOnCommitCallbacks(execute=True):
+            Reservation.objects.create(
+                user=self.user, laboratory=self.laboratory, date=self.day,
+                start_time=time(9), end_time=time(10), purpose='实验',
+            )
+        self.assertContains(self.client.get(url), '09:00-10:00')
+
+    def test_page_keys_follow_etag_fields(self):
+        # 其他进程写入时本进程收不到失效通知，整页缓存键与 ETag 一样随数据库字段变化
+        url = reverse('reservations:laboratory_detail', args=[self.laboratory.id])
+        first = self.client.get(url)
+        Reservation.objects.bulk_create([Reservation(
+            user=self.user, laboratory=self.laboratory, date=self.day,
+            start_time=time(14), end_time=time(15), purpose='实验',
+        )])
+        touch_laboratory_schedule([self.laboratory.id])
+        response = self.client.get(url)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertContains(response, '14:00-15:00')
+
+        url = reverse('reservations:laboratory_list')
+        first = self.client.get(url)
+        self.assertIsNone(self.client.get(url).context)
+        Laboratory.objects.filter(pk=self.laboratory.pk).update(updated_at=timezone.now())
+        response = self.client.get(url)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertIsNotNone(response.context)
+
+    def test_fragments_cached_for_logged_in_users(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('reservations:laboratory_list'))
+        version = get_version(CATALOGUE_NAMESPACE)
+        updated_at = self.laboratory.updated_at.isoformat()
+        key = make_template_fragment_key('lab_card', [self.laboratory.id, updated_at, version, True])
+        self.assertIn('物理实验室A', cache.get(key))
+
+        self.client.get(reverse('reservations:laboratory_detail', args=[self.laboratory.id]))
+        key = make_template_fragment_key('lab_info', [self.laboratory.id, updated_at, version])
+        self.assertIn('理科楼301', cache.get(key))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.laboratory.location = '理科楼401'
+            self.laboratory.save()
+        response = self.client.get(reverse('reservations:laboratory_detail', args=[self.laboratory.id]))
+        self.assertContains(response, '理科楼401')
+
+
+class AsyncViewTests(TestCase):
+    """ASGI 下的异步接口测试"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass12345')
+        cls.laboratory = Laboratory.objects.create(
+            name='物理实验室A', category='physics', location='理科楼301', capacity=30, description='光学实验',
+        )
+        Laboratory.objects.create(name='化学实验室B', category='chemistry', location='理科楼205', capacity=25)
+        cls.day = timezone.now().date() + timedelta(days=1)
+        Reservation.objects.create(
+            user=cls.user, laboratory=cls.laboratory, date=cls.day,
+            start_time=time(9), end_time=time(11), purpose='实验',
+        )
+
+    def setUp(self):
+        cache.clear()
+        occupancy_index.invalidate()
+
+    async def test_asgi_json_endpoints_default_to_sync_views(self):
+        # 默认配置下只有流式接口使用异步视图
+        for name, func in (
+            ('check_availability', views.check_availability), ('laboratory_list_ajax', views.laboratory_list_ajax),
+        ):
+            response = await self.async_client.get(reverse(f'reservations:{name}'))
+            self.assertIs(response.asgi_request.resolver_match.func, func)
+
+    @override_settings(ASGI_URLCONF='lab_reservation_system.asgi_polled_urls')
+    async def test_asgi_requests_use_async_views(self):
+        url = reverse('reservations:check_availability')
+        cases = [
+            ({'lab_id': self.laboratory.id, 'date': self.day.isoformat(), 'start_time': '10:00', 'end_time': '12:00'}, False),
+            ({'lab_id': self.laboratory.id, 'date': self.day.isoformat(), 'start_time': '11:00', 'end_time': '12:00'}, True),
+            ({'lab_id': 999, 'date': self.day.isoformat(), 'start_time': '11:00', 'end_time': '12:00'}, False),
+            ({'lab_id': self.laboratory.id, 'date': 'x'}, False),
+        ]
+        for params, available in cases:
+            response = await self.async_client.get(url, params)
+            self.assertIs(response.asgi_request.resolver_match.func, views.acheck_availability)
+            self.assertEqual(response.json()['available'], available)
+
+    @override_settings(ASGI_URLCONF='lab_reservation_system.asgi_polled_urls')
+    async def test_async_list_matches_sync_list(self):
+        url = reverse('reservations:laboratory_list_ajax')
+        for params in ({}, {'category': 'chemistry'}, {'search': '光学'}):
+            response = await self.async_client.get(url, params)
+            self.assertIs(response.asgi_request.resolver_match.func, views.alaboratory_list_ajax)
+            expected = await sync_to_async(self.client.get)(url, params)
+            self.assertEqual(response.json(), expected.json())
+
+        # 条件请求在异步视图中同样生效
+        response = await self.async_client.get(url)
+        revalidated = await self.async_client.get(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_wsgi_requests_keep_sync_views(self):
+        response = self.client.get(reverse('reservations:laboratory_list_ajax'))
+        self.assertIs(response.wsgi_request.resolver_match.func, views.laboratory_list_ajax)
+
+
+class RecordingBroker(InProcessBroker):
+    """记录所有发布事件的代理，用于验证代理可替换"""
+
+    def __init__(self):
+        super().__init__()
+        self.published = []
+
+    def publish(self, channel, event):
+        self.published.append((channel, event))
+        return super().publish(channel, event)
+
+
+class EventStreamTests(TestCase):
+    """实验室占用变化推送测试"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass12345')
+        cls.laboratory = Laboratory.objects.create(name='物理实验室A', category='physics', location='理科楼301', capacity=30)
+        cls.day = timezone.now().date() + timedelta(days=1)
+
+    def setUp(self):
+        cache.clear()
+        occupancy_index.invalidate()
+        reset_broker()
+        self.addCleanup(reset_broker)
+
+    def reserve(self, start, end, status='pending'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Reservation.objects.create(
+                user=self.user, laboratory=self.laboratory, date=self.day,
+                start_time=time(start), end_time=time(end), purpose='实验', status=status,
+            )
+
+    def test_reservation_changes_are_published_to_subscribers(self):
+        with get_broker().subscribe(laboratory_channel(self.laboratory.id)) as subscription:
+            reservation = self.reserve(9, 11)
+            event = subscription.get(0)
+            self.assertEqual((event['action'], event['date'], event['reservation_id']), ('created', self.day, reservation.id))
+            self.assertEqual(event['reservations'], [{'start_time': time(9), 'end_time': time(11)}])
+
+            with self.captureOnCommitCallbacks(execute=True):
+                bulk_review([reservation.id], 'approve')
+            self.assertEqual(subscription.get(0)['action'], 'approved')
+
+            reservation.refresh_from_db()
+            reservation.status = 'cancelled'
+            with self.captureOnCommitCallbacks(execute=True):
+                reservation.save()
+            event = subscription.get(0)
+            self.assertEqual((event['action'], event['reservations']), ('cancelled', []))
+
+            rejected = self.reserve(14, 16)
+            subscription.get(0)
+            with self.captureOnCommitCallbacks(execute=True):
+                bulk_review([rejected.id], 'reject')
+            self.assertEqual(subscription.get(0)['action'], 'rejected')
+            self.assertIsNone(subscription.get(0))
+
+        # 没有订阅者时不发布也不查询
+        with self.assertNumQueries(0):
+            publish_occupancy(self.laboratory.id, [self.day], 'created')
+
+    @override_settings(RESERVATION_EVENT_BROKER='reservations.tests.RecordingBroker')
+    def test_broker_is_pluggable(self):
+        broker = get_broker()
+        self.assertIsInstance(broker, RecordingBroker)
+        with broker.subscribe(laboratory_channel(self.laboratory.id)):
+            self.reserve(9, 10)
+        self.assertEqual([channel for channel, _event in broker.published], [laboratory_channel(self.laboratory.id)])
+
+    def test_wsgi_event_stream_is_not_served(self):
+        # WSGI 下长连接会占用工作线程，返回 204 让 EventSource 停止重连，页面改为轮询周占用表
+        url = reverse('reservations:laboratory_events', args=[self.laboratory.id])
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(response.streaming)
+        self.assertFalse(get_broker().has_subscribers(laboratory_channel(self.laboratory.id)))
+        response = self.client.get(reverse('reservations:laboratory_detail', args=[self.laboratory.id]))
+        self.assertContains(response, reverse('reservations:laboratory_week_grid', args=[self.laboratory.id]))
+
+    @override_settings(EVENT_STREAM_HEARTBEAT=0.01, EVENT_STREAM_MAX_AGE=5)
+    async def test_async_event_stream_sends_snapshot_then_changes(self):
+        await sync_to_async(self.reserve)(9, 11, status='approved')
+        response = await self.async_client.get(
+            reverse('reservations:laboratory_events', args=[self.laboratory.id]), headers={'Accept-Encoding': 'gzip'},
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        # 事件流不压缩
+        self.assertFalse(response.has_header('Content-Encoding'))
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await anext(stream)).startswith(b'retry:'))
+        snapshot = [json.loads((await anext(stream)).decode().split('data: ', 1)[1]) for _ in range(7)]
+        self.assertEqual([day['date'] for day in snapshot][:2], [timezone.now().date().isoformat(), self.day.isoformat()])
+        self.assertEqual(snapshot[1]['reservations'], [{'start_time': '09:00:00', 'end_time': '11:00:00'}])
+
+        self.assertEqual(await anext(stream), b': keepalive\n\n')
+        await sync_to_async(self.reserve)(14, 15)
+        message = (await anext(stream)).decode()
+        self.assertTrue(message.startswith('event: occupancy\n'))
+        self.assertEqual(json.loads(message.split('data: ', 1)[1])['action'], 'created')
+
+        response = await self.async_client.get(reverse('reservations:laboratory_events', args=[999]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_async_event_stream(self):
+        response = await self.async_client.get(reverse('reservations:laboratory_events', args=[self.laboratory.id]))
+        self.assertIs(response.asgi_request.resolver_match.func, views.alaboratory_events)
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await anext(stream)).startswith(b'retry:'))
+        for _ in range(7):
+            await anext(stream)
+        get_broker().publish(laboratory_channel(self.laboratory.id), {'action': 'created'})
+        self.assertIn(b'"action": "created"', await anext(stream))
+
+        # 客户端断开时 ASGI 处理器取消响应任务，订阅随之关闭
+        waiting = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.05)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertFalse(get_broker().has_subscribers(laboratory_channel(self.laboratory.id)))
+
+
+class StaticAssetTests(TestCase):
+    """静态资源与响应压缩测试"""
+
+    def collect(self, root):
+        storages = {
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+            'staticfiles': {'BACKEND': 'reservations.staticfiles.CompressedManifestStaticFilesStorage'},
+        }
+        settings_override = override_settings(STATIC_ROOT=root, STORAGES=storages)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        call_command('collectstatic', interactive=False, verbosity=0, ignore_patterns=['admin'])
+        with open(os.path.join(root, 'staticfiles.json'), encoding='utf-8') as f:
+            return json.load(f)['paths']
+
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        with tempfile.TemporaryDirectory() as root:
+            manifest = self.collect(root)
+            hashed = manifest['reservations/css/base.css']
+            self.assertNotEqual(hashed, 'reservations/css/base.css')
+            with open(os.path.join(root, hashed), 'rb') as f:
+                original = f.read()
+            with gzip.open(os.path.join(root, hashed + '.gz')) as f:
+                self.assertEqual(f.read(), original)
+
+            url = f'/static/{hashed}'
+            response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertIn('immutable', response['Cache-Control'])
+            self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), original)
+            response.close()
+
+            response = self.client.get(url)
+            self.assertFalse(response.has_header('Content-Encoding'))
+            self.assertEqual(b''.join(response.streaming_content), original)
+            response.close()
+
+            # q=0 表示拒绝该编码
+            for accept in ('gzip;q=0', 'gzip; q=0.0, deflate', '*;q=0', 'x-gzip'):
+                response = self.client.get(url, HTTP_ACCEPT_ENCODING=accept)
+                self.assertFalse(response.has_header('Content-Encoding'), accept)
+                response.close()
+            response = self.client.get(url, HTTP_ACCEPT_ENCODING='br;q=0, *;q=0.5')
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            response.close()
+
+            response = self.client.get('/static/reservations/css/base.css')
+            self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+            response.close()
+            self.assertEqual(self.client.get('/static/../manage.py').status_code, 404)
+
+    def test_pages_use_static_files_and_compressed_responses(self):
+        Laboratory.objects.create(name='物理实验室A', category='physics', location='理科楼301', capacity=30)
+        response = self.client.get(reverse('reservations:laboratory_list'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        html = gzip.decompress(response.content).decode()
+        self.assertIn('/static/reservations/css/base.css', html)
+        self.assertIn('/static/reservations/js/base.js', html)
+        self.assertNotIn('<style>', html)
+        self.assertIn(vendor_url('fontawesome/css/all.min.css'), html)
+
+    def test_vendor_files_fall_back_to_cdn_only_when_enabled(self):
+        path = 'fontawesome/css/all.min.css'
+        self.addCleanup(vendor_url.cache_clear)
+        with mock.patch('reservations.staticfiles.finders.find', return_value=None):
+            for fallback, url, check_id in (
+                (True, 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css', 'reservations.W001'),
+                (False, '/static/reservations/vendor/fontawesome/css/all.min.css', 'reservations.E001'),
+            ):
+                vendor_url.cache_clear()
+                with self.settings(VENDOR_STATIC_CDN_FALLBACK=fallback):
+                    self.assertEqual(vendor_url(path), url)
+                    self.assertEqual([message.id for message in check_vendor_files(None)], [check_id])
+        vendor_url.cache_clear()
+        with mock.patch('reservations.staticfiles.finders.find', return_value='/vendor/file'):
+            self.assertEqual(vendor_url(path), '/static/reservations/vendor/fontawesome/css/all.min.css')
+            self.assertEqual(check_vendor_files(None), [])
+
+
+
+class ReservationExportTests(TestCase):
+    """预约记录导出测试"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='teacher', password='pass12345', is_staff=True)
+        cls.user = User.objects.create_user(username='student', password='pass12345', first_name='张三')
+        UserProfile.objects.create(user=cls.user, student_id='2021001', phone='13800138001', department='物理学院')
+        cls.physics = Laboratory.objects.create(name='物理实验室A', location='理科楼301', capacity=30)
+        cls.chemistry = Laboratory.objects.create(name='化学实验室B', location='理科楼205', capacity=25)
+        cls.day = timezone.now().date() + timedelta(days=1)
+        statuses = ['pending', 'approved', 'rejected', 'cancelled', 'completed']
+        Reservation.objects.bulk_create([
+            Reservation(
+                user=cls.user if i % 2 else cls.admin, laboratory=cls.physics if i % 3 else cls.chemistry,
+                date=cls.day + timedelta(days=i % 10), start_time=time(8 + i % 12), end_time=time(9 + i % 12),
+                purpose=f'实验,"{i}"', status=statuses[i % 5],
+            )
+            for i in range(60)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def export(self, **params):
+        response = self.client.get(reverse('reservations:export_reservations'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode('utf-8')
+
+    def test_csv_export_with_filters(self):
+        end = self.day + timedelta(days=4)
+        response, content = self.export(start=self.day.isoformat(), end=end.isoformat(),
+                                        lab=self.physics.id, status=['pending', 'approved'])
+        self.assertIn('attachment;', response['Content-Disposition'])
+        self.assertTrue(content.startswith('\ufeff'))
+        rows = list(csv.DictReader(StringIO(content.lstrip('\ufeff'))))
+        expected = Reservation.objects.filter(
+            date__range=(self.day, end), laboratory=self.physics, status__in=['pending', 'approved'],
+        ).order_by('id')
+        self.assertEqual([int(row['预约编号']) for row in rows], [r.id for r in expected])
+        self.assertTrue(rows)
+        for row, reservation in zip(rows, expected):
+            self.assertEqual(row['状态'], reservation.get_status_display())
+            self.assertEqual(row['使用目的'], reservation.purpose)
+            self.assertEqual(row['实验室'], '物理实验室A')
+            if reservation.user_id == self.user.id:
+                self.assertEqual((row['姓名'], row['学号/工号'], row['院系']), ('张三', '2021001', '物理学院'))
+            else:
+                self.assertEqual(row['学号/工号'], '')
+
+    def test_csv_export_escapes_formulas(self):
+        payloads = ['=HYPERLINK("http://evil.example","x")', '+1+1', '-2+3', '@SUM(A1)', '\tcmd', '\r=1+1']
+        reservations = Reservation.objects.filter(user=self.user).order_by('id')[:len(payloads)]
+        for reservation, payload in zip(reservations, payloads):
+            Reservation.objects.filter(pk=reservation.pk).update(purpose=payload, admin_comment=payload)
+        User.objects.filter(pk=self.user.pk).update(first_name='=1+2')
+        _response, content = self.export(format='csv')
+        rows = {int(row['预约编号']): row for row in csv.DictReader(StringIO(content.lstrip('\ufeff')))}
+        for reservation, payload in zip(reservations, payloads):
+            row = rows[reservation.id]
+            self.assertEqual((row['使用目的'], row['管理员备注']), ("'" + payload, "'" + payload))
+            self.assertEqual(row['姓名'], "'=1+2")
+        # 普通文本、日期和数字不受影响
+        other = rows[Reservation.objects.filter(user=self.admin).order_by('id').first().id]
+        self.assertTrue(other['使用目的'].startswith('实验'))
+        self.assertEqual(other['日期'].count('-'), 2)
+
+        # NDJSON 输出原始内容
+        _response, content = self.export(format='ndjson')
+        records = {record['id']: record for record in map(json.loads, content.splitlines())}
+        self.assertEqual(records[reservations[0].id]['purpose'], payloads[0])
+
+    @override_settings(RESERVATION_EXPORT_CHUNK_SIZE=7)
+    def test_ndjson_export_streams_with_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            _response, content = self.export(format='ndjson')
+        records = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([record['id'] for record in records], list(Reservation.objects.order_by('id').values_list('id', flat=True)))
+        self.assertEqual(records[1]['student_id'], '2021001')
+        first = Reservation.objects.order_by('id').first()
+        self.assertEqual((records[0]['date'], records[0]['status']), (first.date.isoformat(), first.status))
+        # 会话、用户各一次，导出本身只有一条查询
+        self.assertEqual(len(queries), 3)
+
+    def test_invalid_params_and_permissions(self):
+        url = reverse('reservations:export_reservations')
+        for params in ({'format': 'xml'}, {'start': '2024-13-01'}, {'lab': 'x'}, {'status': 'unknown'},
+                       {'start': '2024-02-02', 'end': '2024-02-01'}):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', response.json())
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+    def test_memory_stays_flat(self):
+        queryset = export_queryset({})
+
+        def peak(limit):
+            tracemalloc.start()
+            try:
+                for _chunk in stream_export(queryset[:limit], 'csv'):
+                    pass
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        Reservation.objects.bulk_create([
+            Reservation(user=self.user, laboratory=self.physics, date=self.day, start_time=time(1), end_time=time(2),
+                        purpose='批量' * 20, status='completed')
+            for _ in range(6000)
+        ])
+        with override_settings(RESERVATION_EXPORT_CHUNK_SIZE=100):
+            small = peak(600)
+            large = peak(6000)
+        self.assertLess(large, small * 2)
+
+    async def test_asgi_export_uses_async_iteration(self):
+        await sync_to_async(self.async_client.force_login)(self.admin)
+        url = reverse('reservations:export_reservations')
+        response = await self.async_client.get(url, {'status': 'approved'})
+        self.assertIs(response.asgi_request.resolver_match.func, views.aexport_reservations)
+        content = b''.join([chunk async for chunk in response.streaming_content]).decode('utf-8')
+
+        def sync_export():
+            return b''.join(self.client.get(url, {'status': 'approved'}).streaming_content).decode('utf-8')
+
+        self.assertEqual(content, await sync_to_async(sync_export)())
+
+
+class CatalogueImportTests(TestCase):
+    """实验室目录导入测试"""
+
+    CSV = (
+        'name,category,location,capacity,equipment,description,is_active,time_slots\n'
+        '物理实验室A,物理,理科楼301,40,示波器,光学实验,true,0-4 08:00-10:00; 5 09:00-12:00\n'
+        '化学实验室B,chemistry,理科楼205,25,,,false,\n'
+    )
+
+    def setUp(self):
+        cache.clear()
+        self.physics = Laboratory.objects.create(name='物理实验室A', category='physics', location='理科楼301', capacity=30)
+        TimeSlot.objects.create(laboratory=self.physics, weekday=0, start_time=time(8), end_time=time(9))
+        TimeSlot.objects.create(laboratory=self.physics, weekday=6, start_time=time(8), end_time=time(10))
+        self.admin = User.objects.create_user(username='teacher', password='pass12345', is_staff=True)
+
+    def test_csv_upsert_reports_diff(self):
+        catalogue_version = get_version(CATALOGUE_NAMESPACE)
+        with self.captureOnCommitCallbacks(execute=True):
+            report = import_catalogue(read_catalogue(StringIO(self.CSV), 'csv'), batch_size=1)
+        self.assertEqual(report.laboratories, {'created': 1, 'updated': 1, 'unchanged': 0})
+        self.assertEqual(report.timeslots, {'created': 5, 'updated': 1, 'deleted': 1, 'unchanged': 0})
+        lines = list(report.diff_lines())
+        self.assertIn('容量: 30 → 40', lines[0])
+        self.assertIn('时间段 +5 ~1 -1', lines[0])
+        self.assertEqual(lines[1], '+ 化学实验室B')
+
+        self.physics.refresh_from_db()
+        self.assertEqual((self.physics.capacity, self.physics.description), (40, '光学实验'))
+        self.assertEqual(
+            sorted(self.physics.timeslot_set.values_list('weekday', 'start_time', 'end_time')),
+            [(day, time(8), time(10)) for day in range(5)] + [(5, time(9), time(12))],
+        )
+        chemistry = Laboratory.objects.get(name='化学实验室B')
+        self.assertFalse(chemistry.is_active)
+        self.assertFalse(chemistry.timeslot_set.exists())
+        self.assertNotEqual(get_version(CATALOGUE_NAMESPACE), catalogue_version)
+        if search_index_available():
+            self.assertEqual(search_laboratories(Laboratory.objects.all(), '光学').get(), self.physics)
+
+        # 再次导入没有任何变化
+        report = import_catalogue(read_catalogue(StringIO(self.CSV), 'csv'))
+        self.assertEqual(report.laboratories, {'created': 0, 'updated': 0, 'unchanged': 2})
+        self.assertEqual(report.changes, [])
+
+        # 按名称引用时间表模板，未知的模板名称报错
+        ScheduleTemplate.objects.create(name='标准时间表')
+        record = {'name': '物理实验室A', 'category': 'physics', 'location': '理科楼301', 'capacity': 40,
+                  'description': '光学实验', 'equipment': '示波器', 'schedule_template': '标准时间表'}
+        report = import_catalogue(enumerate([record], 1))
+        self.assertEqual(list(report.diff_lines()), ['~ 物理实验室A（时间表模板: 无 → 标准时间表）'])
+        self.assertEqual(Laboratory.objects.get(name='物理实验室A').schedule_template.name, '标准时间表')
+        with self.assertRaises(CatalogueImportError) as raised:
+            import_catalogue(enumerate([dict(record, schedule_template='夜间时间表')], 1))
+        self.assertIn('夜间时间表', raised.exception.report.errors[0][1])
+
+    def test_blank_is_active_keeps_current_state(self):
+        self.physics.is_active = False
+        self.physics.save()
+        csv_text = (
+            'name,category,location,capacity,is_active\n'
+            '物理实验室A,physics,理科楼301,30,\n'
+            '生物实验室C,biology,理科楼108,20,\n'
+        )
+        report = import_catalogue(read_catalogue(StringIO(csv_text), 'csv'))
+        self.assertEqual(report.laboratories, {'created': 1, 'updated': 0, 'unchanged': 1})
+        self.physics.refresh_from_db()
+        self.assertFalse(self.physics.is_active)
+        self.assertTrue(Laboratory.objects.get(name='生物实验室C').is_active)
+
+        report = import_catalogue(enumerate([{'name': '物理实验室A', 'location': '理科楼301', 'capacity': 30,
+                                              'category': 'physics', 'is_active': True}], 1))
+        self.assertEqual(list(report.diff_lines()), ['~ 物理实验室A（是否可用: False → True）'])
+
+    def test_admin_action_opens_import_page(self):
+        superuser = User.objects.create_superuser(username='root', password='pass12345')
+        self.client.force_login(superuser)
+        url = reverse('admin:reservations_laboratory_changelist')
+        # 不勾选实验室也可以执行
+        for selected in ([], [self.physics.pk]):
+            response = self.client.post(url, {
+                'action': 'import_laboratories', 'index': '0', helpers.ACTION_CHECKBOX_NAME: selected,
+            })
+            self.assertRedirects(response, reverse('reservations:import_laboratories'))
+
+    def test_invalid_records_roll_back_everything(self):
+        records = [
+            {'name': '新实验室', 'category': 'physics', 'location': '理科楼', 'capacity': 10},
+            {'name': '坏分类', 'category': 'astronomy', 'location': '理科楼', 'capacity': 10},
+            {'name': '坏时间段', 'location': '理科楼', 'capacity': 10,
+             'time_slots': [{'weekday': 7, 'start_time': '08:00', 'end_time': '09:00'}]},
+            {'name': '新实验室', 'location': '理科楼', 'capacity': 10},
+            'x',
+        ]
+        with self.assertRaises(CatalogueImportError) as raised:
+            import_catalogue(enumerate(records, 1), batch_size=1)
+        self.assertEqual([number for number, _message in raised.exception.report.errors], [2, 3, 4, 5])
+        self.assertIn('astronomy', raised.exception.report.errors[0][1])
+        self.assertFalse(Laboratory.objects.filter(name='新实验室').exists())
+
+        # 试运行只报告差异
+        report = import_catalogue(enumerate(records[:1], 1), dry_run=True)
+        self.assertEqual(report.laboratories['created'], 1)
+        self.assertFalse(Laboratory.objects.filter(name='新实验室').exists())
+
+    def test_command_and_admin_upload(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, 'labs.jsonl')
+            with open(path, 'w', encoding='utf-8') as f:
+                for i in range(300):
+                    f.write(json.dumps({
+                        'name': f'导入实验室{i}', 'category': 'computer', 'location': '信息楼', 'capacity': 20,
+                        'time_slots': [{'weekday': day, 'start_time': '08:00', 'end_time': '10:00'} for day in range(7)],
+                    }, ensure_ascii=False) + '\n')
+            out = StringIO()
+            # 每批固定 7 条语句，与每批的实验室和时间段数量无关
+            with self.assertNumQueries(3 * 7 + 3):
+                call_command('import_catalogue', path, '--batch-size', '100', stdout=out)
+        self.assertIn('实验室：新增 300', out.getvalue())
+        self.assertEqual(TimeSlot.objects.filter(laboratory__name__startswith='导入实验室').count(), 300 * 7)
+
+        url = reverse('reservations:import_laboratories')
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        upload = SimpleUploadedFile('labs.csv', ('\ufeff' + self.CSV).encode('utf-8'))
+        response = self.client.post(url, {'file': upload, 'dry_run': 'on'})
+        self.assertContains(response, '实验室：新增 1、更新 1')
+        self.assertFalse(Laboratory.objects.filter(name='化学实验室B').exists())
+        response = self.client.post(url, {'file': SimpleUploadedFile('labs.xml', b'<labs/>')})
+        self.assertContains(response, '不支持的文件格式')
+
+
+class RecurringReservationTests(TestCase):
+    """重复预约测试"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(username='teacher', password='pass12345', is_staff=True)
+        cls.student = User.objects.create_user(username='student', password='pass12345')
+        cls.laboratory = Laboratory.objects.create(name='计算机实验室C', location='信息楼102', capacity=40)
+        cls.day = timezone.now().date() + timedelta(days=1)
+
+    def setUp(self):
+        cache.clear()
+        occupancy_index.invalidate()
+        self.url = reverse('reservations:make_reservation', args=[self.laboratory.id])
+
+    def post_series(self, weeks, **extra):
+        data = {
+            'date': self.day.isoformat(), 'start_time': '14:00', 'end_time': '16:00', 'purpose': '程序设计课',
+            'repeat': '1', 'repeat_until': (self.day + timedelta(weeks=weeks - 1)).isoformat(), **extra,
+        }
+        return self.client.post(self.url, data)
+
+    def test_series_is_checked_and_inserted_in_bulk(self):
+        self.client.force_login(self.teacher)
+        occupancy_index.is_available(self.laboratory.id, self.day + timedelta(weeks=3), time(14), time(15))
+        with CaptureQueriesContext(connection) as short:
+            self.post_series(2)
+        Reservation.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as long:
+                response = self.post_series(16)
+        self.assertRedirects(response, reverse('reservations:my_reservations'))
+        # 查询数与重复次数无关
+        self.assertEqual(len(short), len(long))
+
+        series = ReservationSeries.objects.latest('created_at')
+        dates = list(series.reservations.order_by('date').values_list('date', flat=True))
+        self.assertEqual(dates, [self.day + timedelta(weeks=i) for i in range(16)])
+        self.assertTrue(all(r.status == 'pending' and r.user == self.teacher for r in series.reservations.all()))
+        # bulk_create 后占用索引已失效并重新加载
+        self.assertFalse(occupancy_index.is_available(self.laboratory.id, self.day + timedelta(weeks=3), time(14), time(15)))
+
+    def test_conflicting_dates_reject_or_skip(self):
+        taken = self.day + timedelta(weeks=2)
+        Reservation.objects.create(
+            user=self.student, laboratory=self.laboratory, date=taken, start_time=time(15), end_time=time(17), purpose='实验',
+        )
+        self.client.force_login(self.teacher)
+        response = self.post_series(4)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, f'{taken:%m-%d}')
+        self.assertFalse(ReservationSeries.objects.exists())
+        self.assertEqual(Reservation.objects.count(), 1)
+
+        response = self.post_series(4, skip_conflicts='on')
+        self.assertRedirects(response, reverse('reservations:my_reservations'))
+        series = ReservationSeries.objects.get()
+        self.assertEqual(series.reservations.count(), 3)
+        self.assertFalse(series.reservations.filter(date=taken).exists())
+
+        with self.assertRaises(SeriesConflict):
+            book_series(ReservationSeries(
+                user=self.teacher, laboratory=self.laboratory, start_date=taken, end_date=taken,
+                start_time=time(14), end_time=time(16), purpose='实验',
+            ), skip_conflicts=True)
+
+    def test_cancel_series_as_a_unit(self):
+        self.client.force_login(self.teacher)
+        self.post_series(5)
+        series = ReservationSeries.objects.get()
+        series.reservations.filter(date=self.day).update(status='approved')
+        series.reservations.filter(date=self.day + timedelta(weeks=4)).update(status='rejected')
+
+        self.client.force_login(self.student)
+        url = reverse('reservations:cancel_reservation_series', args=[series.id])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_login(self.teacher)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(url)
+        self.assertEqual(
+            sorted(series.reservations.values_list('status', flat=True)),
+            ['cancelled'] * 4 + ['rejected'],
+        )
+        self.assertTrue(occupancy_index.is_available(self.laboratory.id, self.day, time(14), time(16)))
+        self.assertEqual(cancel_series(series), 0)
+
+    def test_students_cannot_book_series(self):
+        self.client.force_login(self.student)
+        self.assertNotContains(self.client.get(self.url), 'name="repeat"')
+        self.post_series(4)
+        self.assertFalse(ReservationSeries.objects.exists())
+        self.assertEqual(Reservation.objects.filter(user=self.student).count(), 1)
+
+
+class ScheduleTemplateTests(TestCase):
+    """时间表模板与开放时间测试"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass12345')
+        cls.template = ScheduleTemplate.objects.create(name='标准时间表')
+        ScheduleTemplateSlot.objects.bulk_create([
+            ScheduleTemplateSlot(template=cls.template, weekday=weekday, start_time=time(start), end_time=time(start + 2))
+            for weekday in range(5)
+            for start in (8, 10, 14)
+        ])
+        cls.physics = Laboratory.objects.create(
+            name='物理实验室A', location='理科楼301', capacity=30, schedule_template=cls.template,
+        )
+        cls.chemistry = Laboratory.objects.create(
+            name='化学实验室B', location='理科楼205', capacity=25, schedule_template=cls.template,
+        )
+        cls.open_lab = Laboratory.objects.create(name='开放实验室', location='实验楼101', capacity=10)
+        # 下一个周一
+        today = timezone.now().date()
+        cls.monday = today + timedelta(days=7 - today.weekday())
+
+    def setUp(self):
+        cache.clear()
+        schedule_table.discard()
+
+    def test_overrides_replace_close_and_extend_template(self):
+        TimeSlot.objects.create(laboratory=self.physics, weekday=0, start_time=time(8), end_time=time(9))
+        TimeSlot.objects.create(laboratory=self.physics, weekday=0, start_time=time(14), end_time=time(16), is_available=False)
+        TimeSlot.objects.create(laboratory=self.physics, weekday=5, start_time=time(9), end_time=time(12))
+        with self.assertNumQueries(1):
+            schedules = compile_schedules([self.physics.id, self.chemistry.id, self.open_lab.id])
+        physics = schedules[self.physics.id]
+        self.assertEqual(physics.slots[0], ((time(8), time(9)), (time(10), time(12))))
+        self.assertEqual(physics.slots[5], ((time(9), time(12)),))
+        self.assertEqual(schedules[self.chemistry.id].hours[0], ((time(8), time(12)), (time(14), time(16))))
+        self.assertFalse(schedules[self.open_lab.id].configured)
+        self.assertTrue(schedules[self.open_lab.id].allows(6, time(0), time(23)))
+
+        # 开放时间相同的实验室共用一个编译结果，编译后查表只读取实验室的时间戳，已知时间戳时不访问数据库
+        other = Laboratory.objects.create(name='生物实验室D', location='生科楼401', capacity=20, schedule_template=self.template)
+        schedule_table.get_many([self.chemistry.id, other.id])
+        with self.assertNumQueries(1):
+            schedules = schedule_table.get_many([self.chemistry.id, other.id])
+        self.assertIs(schedules[other.id], schedules[self.chemistry.id])
+        states = schedule_states([self.chemistry.id, other.id])
+        with self.assertNumQueries(0):
+            self.assertIs(weekly_schedule(other.id, states[other.id]), schedules[other.id])
+
+    def test_reservation_form_enforces_opening_hours(self):
+        self.client.force_login(self.user)
+        url = reverse('reservations:make_reservation', args=[self.physics.id])
+
+        def post(day, start, end):
+            return self.client.post(url, {
+                'date': day.isoformat(), 'start_time': start, 'end_time': end, 'purpose': '实验',
+            })
+
+        response = post(self.monday, '12:00', '13:00')
+        self.assertContains(response, '所选时间不在实验室开放时间内（周一：08:00-12:00、14:00-16:00）')
+        self.assertContains(post(self.monday + timedelta(days=5), '09:00', '10:00'), '周六：不开放')
+        # 相邻的时间段可以连续预约
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertRedirects(post(self.monday, '09:00', '11:00'), reverse('reservations:my_reservations'))
+        self.assertEqual(Reservation.objects.filter(laboratory=self.physics).count(), 1)
+
+        # 未设置开放时间的实验室不做限制
+        url = reverse('reservations:make_reservation', args=[self.open_lab.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertRedirects(post(self.monday + timedelta(days=5), '21:00', '23:00'), reverse('reservations:my_reservations'))
+
+    def test_template_change_updates_referencing_labs(self):
+        grid = get_week_grid(self.chemistry.id, self.monday)
+        self.assertEqual(len(grid['days'][0]['slots']), 3)
+        self.assertEqual(grid['days'][5]['slots'], [])
+        self.chemistry.refresh_from_db()
+        schedule_updated_at = self.chemistry.schedule_updated_at
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ScheduleTemplateSlot.objects.create(template=self.template, weekday=5, start_time=time(9), end_time=time(11))
+        grid = get_week_grid(self.chemistry.id, self.monday)
+        self.assertEqual([slot['start_time'] for slot in grid['days'][5]['slots']], [time(9)])
+        self.assertTrue(weekly_schedule(self.physics.id).allows(5, time(9), time(11)))
+        self.chemistry.refresh_from_db()
+        self.assertGreater(self.chemistry.schedule_updated_at, schedule_updated_at)
+
+        # 更换模板后按新模板计算
+        with self.captureOnCommitCallbacks(execute=True):
+            self.open_lab.schedule_template = self.template
+            self.open_lab.save()
+        self.assertFalse(weekly_schedule(self.open_lab.id).allows(6, time(9), time(10)))
+
+    def test_other_process_tables_follow_db_changes(self):
+        # 两个查找表相当于两个进程：只共享数据库，不共享缓存，也收不到对方的 discard()
+        first, second = ScheduleTable(), ScheduleTable()
+        for table in (first, second):
+            self.assertFalse(table.get(self.physics.id).allows(5, time(9), time(11)))
+            self.assertTrue(table.get(self.open_lab.id).allows(6, time(21), time(23)))
+
+        with self.settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}):
+            # 在“第一个进程”中修改：覆盖时间段、模板时间段、更换模板
+            TimeSlot.objects.create(laboratory=self.physics, weekday=5, start_time=time(9), end_time=time(11))
+            first.discard([self.physics.id])
+            ScheduleTemplateSlot.objects.create(template=self.template, weekday=6, start_time=time(9), end_time=time(11))
+            self.open_lab.schedule_template = self.template
+            self.open_lab.save()
+
+            self.assertTrue(second.get(self.physics.id).allows(5, time(9), time(11)))
+            self.assertTrue(second.get(self.chemistry.id).allows(6, time(9), time(11)))
+            self.assertFalse(second.get(self.open_lab.id).allows(6, time(21), time(23)))
+            self.assertEqual(
+                build_week_grid(self.chemistry.id, self.monday)['days'][6]['slots'][0]['start_time'], time(9),
+            )
+
+
+class ReservationSweepTests(TestCase):
+    """已结束预约状态清理测试"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass12345')
+        cls.laboratory = Laboratory.objects.create(name='物理实验室A', location='理科楼301', capacity=30)
+        cls.today = timezone.localdate()
+        cls.noon = timezone.make_aware(datetime.combine(cls.today, time(12)))
+
+        def reservation(days, start, status):
+            return Reservation(
+                user=cls.user, laboratory=cls.laboratory, date=cls.today + timedelta(days=days),
+                start_time=time(start), end_time=time(start + 2), purpose='实验', status=status,
+            )
+
+        # 过去的预约不能通过 save() 创建
+        Reservation.objects.bulk_create([
+            reservation(-3, 8, 'approved'), reservation(-2, 8, 'approved'), reservation(-1, 8, 'approved'),
+            reservation(-2, 10, 'pending'), reservation(-1, 10, 'pending'), reservation(-1, 14, 'cancelled'),
+            reservation(0, 8, 'approved'), reservation(0, 14, 'approved'), reservation(1, 8, 'pending'),
+        ])
+
+    def setUp(self):
+        cache.clear()
+        occupancy_index.invalidate()
+
+    def statuses(self):
+        return list(Reservation.objects.order_by('id').values_list('status', flat=True))
+
+    def test_sweep_in_chunks_and_invalidates_occupancy(self):
+        self.assertFalse(occupancy_index.is_available(self.laboratory.id, self.today, time(8), time(10)))
+        with self.captureOnCommitCallbacks(execute=True):
+            counts = sweep_reservations(now=self.noon, batch_size=2)
+        self.assertEqual(counts, {'approved': 4, 'pending': 2})
+        self.assertEqual(self.statuses(), [
+            'completed', 'completed', 'completed', 'cancelled', 'cancelled', 'cancelled',
+            'completed', 'approved', 'pending',
+        ])
+        self.assertEqual(
+            Reservation.objects.filter(admin_comment__contains='自动取消').count(), 2,
+        )
+        self.assertTrue(occupancy_index.is_available(self.laboratory.id, self.today, time(8), time(10)))
+        self.assertEqual(sweep_reservations(now=self.noon), {'approved': 0, 'pending': 0})
+
+    def test_concurrently_reviewed_reservations_are_left_alone(self):
+        # 模拟清理读出 id 后、写入前被管理员处理：UPDATE 条件中重新检查原状态
+        pending = Reservation.objects.filter(status='pending', date__lt=self.today)
+        original = Reservation.objects.filter
+
+        def filter_then_reject(*args, **kwargs):
+            if 'id__in' in kwargs:
+                pending.update(status='rejected')
+            return original(*args, **kwargs)
+
+        with mock.patch.object(Reservation.objects, 'filter', side_effect=filter_then_reject):
+            counts = sweep_reservations(now=self.noon)
+        self.assertEqual(counts['pending'], 0)
+        self.assertEqual(Reservation.objects.filter(status='rejected').count(), 2)
+
+    def test_command_and_runner(self):
+        out = StringIO()
+        call_command('sweep_reservations', '--dry-run', stdout=out)
+        self.assertIn('试运行', out.getvalue())
+        self.assertEqual(Reservation.objects.filter(status='completed').count(), 0)
+
+        call_command('sweep_reservations', '--batch-size', '1', stdout=StringIO())
+        self.assertGreaterEqual(Reservation.objects.filter(status='completed').count(), 3)
+        self.assertFalse(ended_reservations('approved').exists())
+        self.assertEqual(SweepRunner(60).run_once(), {'approved': 0, 'pending': 0})
@@ -13,6 +13,7 @@ urlpatterns = [
     # 预约相关
     path('reserve/<int:lab_id>/', views.make_reservation, name='make_reservation'),
     path('reservation/<int:reservation_id>/cancel/', views.cancel_reservation, name='cancel_reservation'),
+    path('series/<int:series_id>/cancel/', views.cancel_reservation_series, name='cancel_reservation_series'),
     
     # 用户相关
     path('my-reservations/', views.my_reservations, name='my_reservations'),
@@ -23,6 +24,9 @@ urlpatterns = [
     path('admin-panel/reservations/', views.admin_reservations, name='admin_reservations'),
     path('admin-panel/reservation/<int:reservation_id>/approve/', views.approve_reservation, name='approve_reservation'),
     path('admin-panel/reservation/<int:reservation_id>/reject/', views.reject_reservation, name='reject_reservation'),
+    path('admin-panel/reservations/bulk/', views.bulk_review_reservations, name='bulk_review_reservations'),
+    path('admin-panel/reservations/export/', views.export_reservations, name='export_reservations'),
+    path('admin-panel/laboratories/import/', views.import_laboratories, name='import_laboratories'),
     
     # 认证相关
     path('login/', views.user_login, name='login'),
@@ -31,5 +35,10 @@ urlpatterns = [
     
     # AJAX接口
     path('api/check-availability/', views.check_availability, name='check_availability'),
+    path('api/check-availability/batch/', views.check_availability_batch, name='check_availability_batch'),
     path('api/laboratories/', views.laboratory_list_ajax, name='laboratory_list_ajax'),
+    path('api/laboratories/<int:lab_id>/week-grid/', views.laboratory_week_grid, name='laboratory_week_grid'),
+    path('api/laboratories/<int:lab_id>/events/', views.laboratory_events, name='laboratory_events'),
+    path('api/my-reservations/', views.my_reservations_ajax, name='my_reservations_ajax'),
+    path('api/admin-reservations/', views.admin_reservations_ajax, name='admin_reservations_ajax'),
 ]
@@ -3,140 +3,250 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.models import User
 from django.contrib import messages
-from django.http import JsonResponse
-from django.db.models import Q
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition, require_POST
 from django.utils import timezone
-from datetime import datetime, timedelta
-from .models import Laboratory, Reservation, TimeSlot, UserProfile
-from .forms import ReservationForm, UserRegistrationForm, UserProfileForm
-
-
+from django.utils.dateparse import parse_date, parse_time
+import io
+import json
+from .models import Laboratory, Reservation, ReservationSeries, UserProfile
+from .forms import CatalogueImportForm, ReservationForm, UserRegistrationForm, UserProfileForm
+from .availability import get_week_grid, week_grid_stamp
+from .caching import get_version
+from .catalogue import CATALOGUE_NAMESPACE, abrowse_laboratories, browse_catalogue, get_laboratory
+from . import freshness
+from .events import astream_laboratory_events
+from .exports import EXPORT_FORMATS, astream_export, export_queryset, parse_export_filters, stream_export
+from .importing import CatalogueImportError, catalogue_format, import_catalogue, read_catalogue
+from .occupancy import occupancy_index
+from .pagecache import cache_anonymous_page, catalogue_page_key, laboratory_page_key, page_cache_timeout
+from .pagination import get_page_size, keyset_paginate
+from .querybudget import query_budget
+from .schedules import laboratory_schedule
+from .services import BookingConflict, SeriesConflict, book_reservation, book_series, bulk_review, cancel_series, save_reservation
+
+# 批量可用性接口单次允许的最大查询数
+MAX_AVAILABILITY_PROBES = 200
+
+
+@query_budget(6)
+@condition(etag_func=freshness.catalogue_etag, last_modified_func=freshness.catalogue_last_modified)
+@cache_anonymous_page(catalogue_page_key)
 def laboratory_list(request):
     """实验室列表页面"""
-    laboratories = Laboratory.objects.filter(is_active=True)
     search_query = request.GET.get('search', '')
     category_filter = request.GET.get('category', '')
 
-    # 搜索筛选
-    if search_query:
-        laboratories = laboratories.filter(
-            Q(name__icontains=search_query) |
-            Q(location__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(equipment__icontains=search_query)
-        )
-
-    # 分类筛选
-    if category_filter:
-        laboratories = laboratories.filter(category=category_filter)
-
-    # 获取所有分类及其数量
-    all_laboratories = Laboratory.objects.filter(is_active=True)
-    if search_query:
-        all_laboratories = all_laboratories.filter(
-            Q(name__icontains=search_query) |
-            Q(location__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(equipment__icontains=search_query)
-        )
-
-    category_counts = {}
-    for category_code, category_name in Laboratory.CATEGORY_CHOICES:
-        count = all_laboratories.filter(category=category_code).count()
-        if count > 0:
-            # 创建一个临时实验室对象来获取颜色
-            temp_lab = Laboratory(category=category_code)
-            category_counts[category_code] = {
-                'name': category_name,
-                'count': count,
-                'color': temp_lab.get_category_color()
-            }
+    # 搜索、分类筛选及分类统计均基于目录缓存，缓存键与 ETag 共用目录时间戳
+    laboratories, category_counts, total_count = browse_catalogue(
+        search_query, category_filter, freshness.request_catalogue_state(request),
+    )
 
     context = {
         'laboratories': laboratories,
         'search_query': search_query,
         'category_filter': category_filter,
         'category_counts': category_counts,
-        'total_count': all_laboratories.count(),
+        'total_count': total_count,
+        # 实验室卡片的片段缓存键
+        'catalogue_version': get_version(CATALOGUE_NAMESPACE),
+        'cache_timeout': page_cache_timeout(),
     }
     return render(request, 'reservations/laboratory_list.html', context)
 
 
+@query_budget(6)
+@condition(etag_func=freshness.laboratory_etag, last_modified_func=freshness.laboratory_last_modified)
+@cache_anonymous_page(laboratory_page_key)
 def laboratory_detail(request, lab_id):
     """实验室详情页面"""
-    laboratory = get_object_or_404(Laboratory, id=lab_id, is_active=True)
+    # 实验室记录和未来7天的时间段占用表都与 ETag 共用实验室时间戳
+    state = freshness.request_laboratory_state(request, lab_id)
+    laboratory = state and get_laboratory(lab_id, state)
+    if not laboratory:
+        raise Http404('实验室不存在')
 
-    # 获取未来7天的预约情况
-    today = timezone.now().date()
-    future_dates = [today + timedelta(days=i) for i in range(7)]
-
-    # 获取该实验室的时间段
-    time_slots = TimeSlot.objects.filter(laboratory=laboratory, is_available=True)
-
-    # 获取已有预约
-    existing_reservations = Reservation.objects.filter(
-        laboratory=laboratory,
-        date__in=future_dates,
-        status__in=['pending', 'approved']
-    ).values('date', 'start_time', 'end_time')
+    week_grid = get_week_grid(laboratory.id, timezone.now().date(), state=state)
 
     context = {
         'laboratory': laboratory,
-        'time_slots': time_slots,
-        'future_dates': future_dates,
-        'existing_reservations': list(existing_reservations),
+        'week_grid': week_grid,
+        # 实验室信息和占用表的片段缓存键
+        'catalogue_version': get_version(CATALOGUE_NAMESPACE),
+        'week_grid_stamp': state and week_grid_stamp(state),
+        'cache_timeout': page_cache_timeout(),
     }
     return render(request, 'reservations/laboratory_detail.html', context)
 
 
+@query_budget(4)
+def laboratory_week_grid(request, lab_id):
+    """实验室周占用表（AJAX接口）"""
+    state = freshness.request_laboratory_state(request, lab_id)
+    if state is None:
+        return JsonResponse({'error': '实验室不存在'}, status=404)
+
+    start_date = timezone.now().date()
+    if request.GET.get('start'):
+        try:
+            start_date = parse_date(request.GET['start'])
+        except ValueError:
+            start_date = None
+        if start_date is None:
+            return JsonResponse({'error': '日期格式错误'}, status=400)
+
+    return JsonResponse(get_week_grid(lab_id, start_date, state=state))
+
+
+def _event_stream_response(stream):
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # 关闭反向代理（nginx）的响应缓冲，事件才能即时送达
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def laboratory_events(request, lab_id):
+    """实验室占用变化事件流：WSGI 下不提供
+
+    长连接会一直占用一个工作线程，这里直接返回 204，EventSource 收到后不再重连，
+    详情页改为定时轮询 laboratory_week_grid。事件流由 asgi_urls 中的 alaboratory_events 提供。
+    """
+    return HttpResponse(status=204)
+
+
+async def alaboratory_events(request, lab_id):
+    """实验室占用变化事件流（SSE，只在 ASGI 下路由）"""
+    if not await Laboratory.objects.filter(id=lab_id, is_active=True).aexists():
+        raise Http404('实验室不存在')
+    return _event_stream_response(astream_laboratory_events(lab_id, timezone.now().date()))
+
+
+@query_budget(10)
 @login_required
 def make_reservation(request, lab_id):
     """创建预约"""
     laboratory = get_object_or_404(Laboratory, id=lab_id, is_active=True)
 
+    # 教师（工作人员）可以按周重复预约
+    allow_recurring = is_admin(request.user)
     if request.method == 'POST':
-        form = ReservationForm(request.POST)
+        form = ReservationForm(request.POST, laboratory=laboratory, allow_recurring=allow_recurring)
         if form.is_valid():
             reservation = form.save(commit=False)
             reservation.user = request.user
             reservation.laboratory = laboratory
 
-            # 检查预约冲突
-            conflicts = Reservation.objects.filter(
-                laboratory=laboratory,
-                date=reservation.date,
-                status__in=['pending', 'approved'],
-                start_time__lt=reservation.end_time,
-                end_time__gt=reservation.start_time
-            )
+            if form.is_recurring:
+                return _book_series(request, form, reservation)
 
-            if conflicts.exists():
+            # 冲突检查与写入在预约服务的事务内原子完成
+            try:
+                book_reservation(reservation)
+            except BookingConflict:
                 messages.error(request, '该时间段已被预约，请选择其他时间。')
             else:
-                reservation.save()
                 messages.success(request, '预约申请已提交，等待管理员审核。')
                 return redirect('reservations:my_reservations')
     else:
-        form = ReservationForm()
+        form = ReservationForm(laboratory=laboratory, allow_recurring=allow_recurring)
 
     context = {
         'form': form,
         'laboratory': laboratory,
+        'opening_hours': laboratory_schedule(laboratory).weekly_hours(),
     }
     return render(request, 'reservations/make_reservation.html', context)
 
 
+def _book_series(request, form, reservation):
+    """保存重复预约，冲突时返回表单页面并列出冲突日期"""
+    try:
+        reservations, skipped = book_series(
+            form.build_series(reservation), skip_conflicts=form.cleaned_data['skip_conflicts'],
+        )
+    except SeriesConflict as exc:
+        dates = '、'.join(f'{day:%m-%d}' for day in exc.dates)
+        messages.error(request, f'以下日期该时间段已被预约：{dates}。' if dates else '该时间段已被预约，请选择其他时间。')
+        return render(request, 'reservations/make_reservation.html', {
+            'form': form, 'laboratory': reservation.laboratory,
+            'opening_hours': laboratory_schedule(reservation.laboratory).weekly_hours(),
+        })
+    message = f'已提交 {len(reservations)} 次重复预约申请，等待管理员审核。'
+    if skipped:
+        message += f"已跳过被占用的日期：{'、'.join(f'{day:%m-%d}' for day in skipped)}。"
+    messages.success(request, message)
+    return redirect('reservations:my_reservations')
+
+
+def _reservation_data(reservation, include_user=False):
+    """预约记录的 JSON 表示"""
+    data = {
+        'id': reservation.id,
+        'laboratory': {
+            'id': reservation.laboratory.id,
+            'name': reservation.laboratory.name,
+            'location': reservation.laboratory.location,
+        },
+        'date': reservation.date,
+        'start_time': reservation.start_time,
+        'end_time': reservation.end_time,
+        'purpose': reservation.purpose,
+        'status': reservation.status,
+        'status_display': reservation.get_status_display(),
+        'admin_comment': reservation.admin_comment,
+        'created_at': reservation.created_at,
+        'updated_at': reservation.updated_at,
+        'can_cancel': reservation.can_cancel,
+        'series_id': reservation.series_id,
+    }
+    if include_user:
+        data['user'] = {
+            'id': reservation.user.id,
+            'username': reservation.user.username,
+            'first_name': reservation.user.first_name,
+        }
+    return data
+
+
+def _page_json(page, include_user=False):
+    return JsonResponse({
+        'reservations': [_reservation_data(reservation, include_user) for reservation in page],
+        'count': len(page),
+        'next_cursor': page.next_cursor,
+    })
+
+
+def _my_reservations_page(request):
+    reservations = Reservation.objects.filter(user=request.user).select_related('laboratory')
+    return keyset_paginate(
+        reservations, request.GET.get('cursor'), get_page_size(request.GET.get('page_size'))
+    )
+
+
+@query_budget(4)
 @login_required
 def my_reservations(request):
     """用户预约记录"""
-    reservations = Reservation.objects.filter(user=request.user).order_by('-created_at')
+    page = _my_reservations_page(request)
 
     context = {
-        'reservations': reservations,
+        'reservations': page.items,
+        'page': page,
     }
     return render(request, 'reservations/my_reservations.html', context)
 
 
+@query_budget(4)
+@login_required
+def my_reservations_ajax(request):
+    """用户预约记录（AJAX接口，游标分页）"""
+    return _page_json(_my_reservations_page(request))
+
+
+@query_budget(6)
 @login_required
 def cancel_reservation(request, reservation_id):
     """取消预约"""
@@ -152,6 +262,19 @@ def cancel_reservation(request, reservation_id):
     return redirect('reservations:my_reservations')
 
 
+@query_budget(8)
+@login_required
+def cancel_reservation_series(request, series_id):
+    """取消整个重复预约系列中尚未开始的预约"""
+    series = get_object_or_404(ReservationSeries, id=series_id, user=request.user)
+    count = cancel_series(series)
+    if count:
+        messages.success(request, f'已取消该系列的 {count} 次预约。')
+    else:
+        messages.error(request, '该系列没有可以取消的预约。')
+    return redirect('reservations:my_reservations')
+
+
 @login_required
 def user_profile(request):
     """用户资料"""
@@ -181,6 +304,7 @@ def is_admin(user):
     return user.is_staff or user.is_superuser
 
 
+@query_budget(6)
 @user_passes_test(is_admin)
 def admin_panel(request):
     """管理员面板"""
@@ -196,39 +320,180 @@ def admin_panel(request):
     return render(request, 'reservations/admin_panel.html', context)
 
 
+def _admin_reservations_page(request, status_filter):
+    reservations = Reservation.objects.filter(status=status_filter).select_related(
+        'user__userprofile', 'laboratory'
+    )
+    return keyset_paginate(
+        reservations, request.GET.get('cursor'), get_page_size(request.GET.get('page_size'))
+    )
+
+
+@query_budget(4)
 @user_passes_test(is_admin)
 def admin_reservations(request):
     """管理员预约管理"""
     status_filter = request.GET.get('status', 'pending')
-    reservations = Reservation.objects.filter(status=status_filter).order_by('-created_at')
+    page = _admin_reservations_page(request, status_filter)
 
     context = {
-        'reservations': reservations,
+        'reservations': page.items,
+        'page': page,
         'status_filter': status_filter,
     }
     return render(request, 'reservations/admin_reservations.html', context)
 
 
+@query_budget(4)
+@user_passes_test(is_admin)
+def admin_reservations_ajax(request):
+    """管理员预约管理（AJAX接口，游标分页）"""
+    status_filter = request.GET.get('status', 'pending')
+    return _page_json(_admin_reservations_page(request, status_filter), include_user=True)
+
+
+def _export_request(request):
+    """解析导出请求，返回 (格式, 过滤条件)，参数错误时抛出 ValueError"""
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError('不支持的导出格式')
+    return fmt, parse_export_filters(request.GET)
+
+
+def _export_response(stream, fmt):
+    response = StreamingHttpResponse(stream, content_type=EXPORT_FORMATS[fmt])
+    filename = f'reservations-{timezone.localtime():%Y%m%d-%H%M%S}.{fmt}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+@query_budget(2)
+@user_passes_test(is_admin)
+def export_reservations(request):
+    """导出预约记录（流式 CSV / NDJSON，按日期范围、实验室和状态筛选）"""
+    try:
+        fmt, filters = _export_request(request)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return _export_response(stream_export(export_queryset(filters), fmt), fmt)
+
+
+@user_passes_test(is_admin)
+async def aexport_reservations(request):
+    """导出预约记录（ASGI 下的异步实现）"""
+    try:
+        fmt, filters = _export_request(request)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return _export_response(astream_export(export_queryset(filters), fmt), fmt)
+
+
+@query_budget(8)
 @user_passes_test(is_admin)
 def approve_reservation(request, reservation_id):
     """批准预约"""
-    reservation = get_object_or_404(Reservation, id=reservation_id)
+    reservation = get_object_or_404(Reservation.objects.select_related('user'), id=reservation_id)
     reservation.status = 'approved'
-    reservation.save()
-    messages.success(request, f'已批准 {reservation.user.username} 的预约申请。')
+    try:
+        save_reservation(reservation)
+    except BookingConflict:
+        messages.error(request, '该时间段已有其他有效预约，无法批准。')
+    except ValidationError as exc:
+        messages.error(request, f'无法批准：{exc.messages[0]}')
+    else:
+        messages.success(request, f'已批准 {reservation.user.username} 的预约申请。')
     return redirect('reservations:admin_reservations')
 
 
+@query_budget(8)
 @user_passes_test(is_admin)
 def reject_reservation(request, reservation_id):
     """拒绝预约"""
-    reservation = get_object_or_404(Reservation, id=reservation_id)
+    reservation = get_object_or_404(Reservation.objects.select_related('user'), id=reservation_id)
     reservation.status = 'rejected'
-    reservation.save()
-    messages.success(request, f'已拒绝 {reservation.user.username} 的预约申请。')
+    try:
+        save_reservation(reservation)
+    except ValidationError as exc:
+        messages.error(request, f'无法拒绝：{exc.messages[0]}')
+    else:
+        messages.success(request, f'已拒绝 {reservation.user.username} 的预约申请。')
     return redirect('reservations:admin_reservations')
 
 
+@user_passes_test(is_admin)
+@require_POST
+def bulk_review_reservations(request):
+    """批量批准/拒绝预约
+
+    支持表单提交（ids 多值 + action）或 JSON 请求体 {"ids": [...], "action": "approve"}，
+    JSON 请求返回每条预约的处理结果，表单提交汇总为提示信息后返回审核列表。
+    """
+    is_json = request.content_type == 'application/json'
+    if is_json:
+        try:
+            payload = json.loads(request.body)
+            ids, action = payload['ids'], payload['action']
+        except (ValueError, KeyError, TypeError):
+            return JsonResponse({'error': '请求格式错误'}, status=400)
+    else:
+        ids, action = request.POST.getlist('ids'), request.POST.get('action')
+
+    try:
+        results = bulk_review(ids, action)
+    except (ValueError, TypeError):
+        if is_json:
+            return JsonResponse({'error': '请求参数错误'}, status=400)
+        messages.error(request, '请求参数错误。')
+        return redirect('reservations:admin_reservations')
+
+    if is_json:
+        return JsonResponse({'results': results, 'count': len(results)})
+
+    done = sum(result['result'] in ('approved', 'rejected') for result in results)
+    failed = len(results) - done
+    verb = '批准' if action == 'approve' else '拒绝'
+    if done:
+        messages.success(request, f'已{verb} {done} 条预约申请。')
+    if failed:
+        messages.warning(request, f'{failed} 条预约未能{verb}（时间冲突、已过期或状态已变化）。')
+    return redirect('reservations:admin_reservations')
+
+
+@user_passes_test(is_admin)
+def import_laboratories(request):
+    """导入实验室目录（CSV / JSON），显示差异报告"""
+    report = errors = None
+    if request.method == 'POST':
+        form = CatalogueImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                fmt = catalogue_format(upload.name)
+            except ValueError as exc:
+                form.add_error('file', str(exc))
+            else:
+                # 上传文件按行流式解码，不整体读入内存
+                stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+                try:
+                    report = import_catalogue(read_catalogue(stream, fmt), dry_run=form.cleaned_data['dry_run'])
+                except CatalogueImportError as exc:
+                    errors = exc.report.errors
+                    messages.error(request, str(exc))
+                except UnicodeDecodeError:
+                    form.add_error('file', '文件应为 UTF-8 编码')
+                else:
+                    if report.dry_run:
+                        messages.info(request, f'试运行（未保存）：{report.summary()}')
+                    else:
+                        messages.success(request, f'导入完成：{report.summary()}')
+    else:
+        form = CatalogueImportForm()
+    return render(request, 'reservations/admin_import_laboratories.html', {
+        'form': form, 'report': report, 'errors': errors,
+    })
+
+
 def user_login(request):
     """用户登录"""
     if request.method == 'POST':
@@ -270,71 +535,159 @@ def user_register(request):
     return render(request, 'reservations/register.html', context)
 
 
+def _parse_probe(lab_id, date, start_time, end_time):
+    """解析一次可用性查询的参数，返回 (参数元组, 错误信息)"""
+    if not all([lab_id, date, start_time, end_time]):
+        return None, '参数不完整'
+
+    lab_id = str(lab_id)
+    try:
+        date = parse_date(str(date))
+        start_time = parse_time(str(start_time))
+        end_time = parse_time(str(end_time))
+    except ValueError:
+        return None, '参数格式错误'
+    if not all([lab_id.isdigit(), date, start_time, end_time]):
+        return None, '参数格式错误'
+    return (int(lab_id), date, start_time, end_time), None
+
+
+@query_budget(3)
 def check_availability(request):
     """检查预约可用性（AJAX接口）"""
-    lab_id = request.GET.get('lab_id')
-    date = request.GET.get('date')
-    start_time = request.GET.get('start_time')
-    end_time = request.GET.get('end_time')
+    probe, error = _parse_probe(
+        request.GET.get('lab_id'),
+        request.GET.get('date'),
+        request.GET.get('start_time'),
+        request.GET.get('end_time'),
+    )
+    if error:
+        return JsonResponse({'available': False, 'message': error})
+
+    lab_id, date, start_time, end_time = probe
+    if not Laboratory.objects.filter(id=lab_id).exists():
+        return JsonResponse({'available': False, 'message': '实验室不存在'})
 
-    if not all([lab_id, date, start_time, end_time]):
-        return JsonResponse({'available': False, 'message': '参数不完整'})
+    if occupancy_index.is_available(lab_id, date, start_time, end_time):
+        return JsonResponse({'available': True, 'message': '时间段可用'})
+    else:
+        return JsonResponse({'available': False, 'message': '该时间段已被预约'})
+
+
+async def acheck_availability(request):
+    """检查预约可用性（AJAX接口，ASGI 下的异步实现）"""
+    probe, error = _parse_probe(
+        request.GET.get('lab_id'),
+        request.GET.get('date'),
+        request.GET.get('start_time'),
+        request.GET.get('end_time'),
+    )
+    if error:
+        return JsonResponse({'available': False, 'message': error})
+
+    lab_id, date, start_time, end_time = probe
+    if not await Laboratory.objects.filter(id=lab_id).aexists():
+        return JsonResponse({'available': False, 'message': '实验室不存在'})
 
-    try:
-        laboratory = Laboratory.objects.get(id=lab_id)
-        conflicts = Reservation.objects.filter(
-            laboratory=laboratory,
-            date=date,
-            status__in=['pending', 'approved'],
-            start_time__lt=end_time,
-            end_time__gt=start_time
-        )
+    if await occupancy_index.ais_available(lab_id, date, start_time, end_time):
+        return JsonResponse({'available': True, 'message': '时间段可用'})
+    else:
+        return JsonResponse({'available': False, 'message': '该时间段已被预约'})
 
-        if conflicts.exists():
-            return JsonResponse({'available': False, 'message': '该时间段已被预约'})
+
+@query_budget(4)
+@csrf_exempt
+@require_POST
+def check_availability_batch(request):
+    """批量检查预约可用性（AJAX接口）
+
+    请求体为 JSON：{"probes": [{"lab_id", "date", "start_time", "end_time"}, ...]}，
+    按顺序返回每个查询的结果。所有实验室与预约各用一次查询解析。
+    """
+    try:
+        probes = json.loads(request.body)['probes']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': '请求格式错误'}, status=400)
+    if not isinstance(probes, list) or not all(isinstance(probe, dict) for probe in probes):
+        return JsonResponse({'error': '请求格式错误'}, status=400)
+    if len(probes) > MAX_AVAILABILITY_PROBES:
+        return JsonResponse({'error': f'单次最多查询 {MAX_AVAILABILITY_PROBES} 个时间段'}, status=400)
+
+    parsed = [
+        _parse_probe(probe.get('lab_id'), probe.get('date'), probe.get('start_time'), probe.get('end_time'))
+        for probe in probes
+    ]
+    valid = [probe for probe, error in parsed if not error]
+    existing_labs = set(
+        Laboratory.objects.filter(id__in={lab_id for lab_id, *_ in valid}).values_list('id', flat=True)
+    )
+    buckets = occupancy_index.get_many(
+        (lab_id, date) for lab_id, date, *_ in valid if lab_id in existing_labs
+    )
+
+    results = []
+    for raw, (probe, error) in zip(probes, parsed):
+        result = {key: raw.get(key) for key in ('lab_id', 'date', 'start_time', 'end_time')}
+        if error:
+            result.update(available=False, message=error)
+        elif probe[0] not in existing_labs:
+            result.update(available=False, message='实验室不存在')
         else:
-            return JsonResponse({'available': True, 'message': '时间段可用'})
+            lab_id, date, start_time, end_time = probe
+            available = not buckets[(lab_id, date)].overlaps(start_time, end_time)
+            result.update(available=available, message='时间段可用' if available else '该时间段已被预约')
+        results.append(result)
 
-    except Laboratory.DoesNotExist:
-        return JsonResponse({'available': False, 'message': '实验室不存在'})
+    return JsonResponse({
+        'results': results,
+        'count': len(results)
+    })
 
 
+def _laboratory_payload(lab):
+    """实验室列表接口中单个实验室的数据"""
+    return {
+        'id': lab.id,
+        'name': lab.name,
+        'category': lab.get_category_display(),
+        'category_code': lab.category,
+        'location': lab.location,
+        'capacity': lab.capacity,
+        'description': lab.description[:100] + '...' if len(lab.description) > 100 else lab.description,
+        'equipment': lab.equipment[:80] + '...' if len(lab.equipment) > 80 else lab.equipment,
+        'icon': lab.get_category_icon(),
+        'color': lab.get_category_color(),
+    }
+
+
+@query_budget(3)
+@condition(etag_func=freshness.catalogue_api_etag, last_modified_func=freshness.catalogue_last_modified)
 def laboratory_list_ajax(request):
     """AJAX实验室列表接口"""
     search_query = request.GET.get('search', '')
     category_filter = request.GET.get('category', '')
 
-    laboratories = Laboratory.objects.filter(is_active=True)
+    # 搜索和分类筛选基于目录缓存
+    laboratories, _category_counts, _total_count = browse_catalogue(
+        search_query, category_filter, freshness.request_catalogue_state(request),
+    )
 
-    # 搜索筛选
-    if search_query:
-        laboratories = laboratories.filter(
-            Q(name__icontains=search_query) |
-            Q(location__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(equipment__icontains=search_query)
-        )
+    labs_data = [_laboratory_payload(lab) for lab in laboratories]
+
+    return JsonResponse({
+        'laboratories': labs_data,
+        'count': len(labs_data)
+    })
 
-    # 分类筛选
-    if category_filter:
-        laboratories = laboratories.filter(category=category_filter)
-
-    # 构建响应数据
-    labs_data = []
-    for lab in laboratories:
-        labs_data.append({
-            'id': lab.id,
-            'name': lab.name,
-            'category': lab.get_category_display(),
-            'category_code': lab.category,
-            'location': lab.location,
-            'capacity': lab.capacity,
-            'description': lab.description[:100] + '...' if len(lab.description) > 100 else lab.description,
-            'equipment': lab.equipment[:80] + '...' if len(lab.equipment) > 80 else lab.equipment,
-            'icon': lab.get_category_icon(),
-            'color': lab.get_category_color(),
-        })
 
+@freshness.prefetch_catalogue_state
+@condition(etag_func=freshness.catalogue_api_etag, last_modified_func=freshness.catalogue_last_modified)
+async def alaboratory_list_ajax(request):
+    """AJAX实验室列表接口（ASGI 下的异步实现）"""
+    laboratories = await abrowse_laboratories(
+        request.GET.get('search', ''), request.GET.get('category', ''), request._catalogue_state,
+    )
+    labs_data = [_laboratory_payload(lab) for lab in laboratories]
     return JsonResponse({
         'laboratories': labs_data,
         'count': len(labs_data)